@@ -0,0 +1,4 @@
+from mash_diffusion.Demo.noise_bank_builder import demo as demo_build_noise_bank
+
+if __name__ == "__main__":
+    demo_build_noise_bank()
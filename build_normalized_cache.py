@@ -0,0 +1,4 @@
+from mash_diffusion.Demo.normalized_cache import demo as demo_build_normalized_cache
+
+if __name__ == "__main__":
+    demo_build_normalized_cache()
@@ -0,0 +1,4 @@
+from mash_diffusion.Demo.condition_compressor import demo as demo_compress_conditions
+
+if __name__ == "__main__":
+    demo_compress_conditions()
@@ -0,0 +1,4 @@
+from mash_diffusion.Demo.transformer_fitter import demo as demo_fit_transformer
+
+if __name__ == "__main__":
+    demo_fit_transformer()
@@ -3,11 +3,21 @@ import torch
 import pickle
 import random
 import numpy as np
-from typing import Union
+from typing import Callable, Union
 from torch.utils.data import Dataset
 
 from ma_sh.Method.io import loadMashFileParamsTensor
-from ma_sh.Method.transformer import getTransformer
+
+from mash_diffusion.Method.shard import toTorchDType
+from mash_diffusion.Method.condition import padCondition
+from mash_diffusion.Method.transformer import getMashTransformer, toTransformerHash
+from mash_diffusion.Method.validity import loadValidity, filterEmbeddingPathsList
+from mash_diffusion.Module.normalized_cache import NormalizedMashCache
+from mash_diffusion.Module.path_index import PathIndex
+from mash_diffusion.Module.local_disk_cache import LocalDiskCache
+from mash_diffusion.Module.shared_memory_cache import SharedMemoryCache
+from mash_diffusion.Module.embedding_index_cache import EmbeddingIndexCache
+from mash_diffusion.Module.worker_rng import WorkerRNG
 
 
 class EmbeddingDataset(Dataset):
@@ -18,12 +28,30 @@ class EmbeddingDataset(Dataset):
         embedding_key: str,
         split: str = "train",
         dataset_json_file_path: Union[str, None] = None,
+        index_cache_file_path: Union[str, None] = None,
+        normalized_cache_folder_path: Union[str, None] = None,
+        validity_file_path: Union[str, None] = None,
+        permute_anchors: bool = True,
+        embedding_dtype: str = "float32",
+        local_disk_cache: Union[LocalDiskCache, None] = None,
+        shared_memory_cache_size_mb: float = 0.0,
+        view_num: int = 1,
+        condition_token_num: int = 0,
+        transformer_id: Union[str, None] = None,
     ) -> None:
         self.dataset_root_folder_path = dataset_root_folder_path
         self.embedding_key = embedding_key
         self.split = split
+        self.permute_anchors = permute_anchors
+        self.embedding_dtype = embedding_dtype
+        self.local_disk_cache = local_disk_cache
+        self.view_num = view_num
+        self.condition_token_num = condition_token_num
+        self.transformer_id = transformer_id
         self.dataset_json_file_path = dataset_json_file_path
 
+        self.worker_rng = WorkerRNG(split)
+
         self.mash_folder_path = (
             self.dataset_root_folder_path + "Objaverse_82K/manifold_mash/"
         )
@@ -34,129 +62,217 @@ class EmbeddingDataset(Dataset):
         assert os.path.exists(self.mash_folder_path)
         assert os.path.exists(self.embedding_root_folder_path)
 
-        self.transformer = getTransformer("Objaverse_82K")
+        if self.transformer_id is None:
+            self.transformer_id = "Objaverse_82K"
+
+        self.transformer = getMashTransformer(self.transformer_id)
         assert self.transformer is not None
 
+        self.normalized_cache = None
+        if normalized_cache_folder_path is not None:
+            self.normalized_cache = NormalizedMashCache(
+                normalized_cache_folder_path, self.mash_folder_path, self.transformer_id
+            )
+
+        # decoded and normalized mash params shared by all processes on the node
+        self.shared_memory_cache = None
+        if shared_memory_cache_size_mb > 0:
+            self.shared_memory_cache = SharedMemoryCache(
+                "mash_diffusion_" + toTransformerHash(self.transformer)[:16],
+                shared_memory_cache_size_mb,
+            )
+
         self.output_error = False
+        self.max_retry_num = 100
+
+        self.invalid_embedding_file_path_set = set()
 
-        self.invalid_embedding_file_path_list = []
+        self.paths_list = self.loadPathsList(dataset_json_file_path, index_cache_file_path)
 
-        self.paths_list = []
+        if validity_file_path is not None:
+            validity = loadValidity(validity_file_path)
+            if validity is not None:
+                self.paths_list = filterEmbeddingPathsList(self.paths_list, validity)
+
+        self.paths_list = PathIndex(
+            self.paths_list, self.mash_folder_path, self.embedding_root_folder_path
+        )
+        return
+
+    def loadPathsList(
+        self,
+        dataset_json_file_path: Union[str, None] = None,
+        index_cache_file_path: Union[str, None] = None,
+    ) -> list:
+        paths_list = []
 
         if dataset_json_file_path is not None:
             if os.path.exists(dataset_json_file_path):
                 with open(dataset_json_file_path, "rb") as f:
-                    paths_list = pickle.load(f)
+                    rel_paths_list = pickle.load(f)
 
-                    for paths in paths_list:
-                        self.paths_list.append(
+                for paths in rel_paths_list:
+                    paths_list.append(
+                        [
+                            self.mash_folder_path + paths[0],
                             [
-                                self.mash_folder_path + paths[0],
-                                [
-                                    self.embedding_root_folder_path + path
-                                    for path in paths[1]
-                                ],
-                            ]
-                        )
-                    return
-
-        print("[INFO][EmbeddingDataset::__init__]")
+                                self.embedding_root_folder_path + path
+                                for path in paths[1]
+                            ],
+                        ]
+                    )
+                return paths_list
+
+        print("[INFO][EmbeddingDataset::loadPathsList]")
         print("\t start load mash and embedding datasets...")
-        for root, _, files in os.walk(self.embedding_root_folder_path):
-            if len(files) == 0:
-                continue
-
-            rel_folder_path = os.path.relpath(root, self.embedding_root_folder_path)
+        embedding_index_cache = EmbeddingIndexCache(
+            self.embedding_root_folder_path,
+            self.mash_folder_path,
+            index_cache_file_path,
+        )
+        paths_list = embedding_index_cache.load()
+        return paths_list
 
-            mash_file_path = self.mash_folder_path + rel_folder_path + ".npy"
+    def normalize(self, mash_params: torch.Tensor) -> torch.Tensor:
+        return self.transformer.transform(mash_params, False)
 
-            if not os.path.exists(mash_file_path):
-                continue
+    def normalizeInverse(self, mash_params: torch.Tensor) -> torch.Tensor:
+        return self.transformer.inverse_transform(mash_params, False)
 
-            embedding_file_path_list = []
-            for file in files:
-                if not file.endswith(".npy") or file.endswith("_tmp.npy"):
-                    continue
+    def readFile(self, file_path: str, load_func: Callable):
+        if self.local_disk_cache is None:
+            return load_func(file_path)
 
-                embedding_file_path_list.append(root + "/" + file)
+        return self.local_disk_cache.load(file_path, load_func)
 
-            if len(embedding_file_path_list) == 0:
-                continue
+    def loadMashParams(self, mash_file_path: str) -> torch.Tensor:
+        if self.shared_memory_cache is not None:
+            mash_params = self.shared_memory_cache.load(mash_file_path)
+            if mash_params is not None:
+                return mash_params
 
-            embedding_file_path_list.sort()
+        mash_params = self.decodeMashParams(mash_file_path)
 
-            self.paths_list.append([mash_file_path, embedding_file_path_list])
+        if self.shared_memory_cache is not None:
+            self.shared_memory_cache.save(mash_file_path, mash_params)
 
-        self.paths_list.sort(key=lambda x: x[0])
+        return mash_params
 
-        return
+    def decodeMashParams(self, mash_file_path: str) -> torch.Tensor:
+        if self.normalized_cache is not None:
+            mash_params = self.normalized_cache.load(mash_file_path)
+            if mash_params is not None:
+                return mash_params
 
-    def normalize(self, mash_params: torch.Tensor) -> torch.Tensor:
-        return self.transformer.transform(mash_params, False)
+        mash_params = self.readFile(
+            mash_file_path,
+            lambda file_path: loadMashFileParamsTensor(file_path, torch.float32, "cpu"),
+        )
 
-    def normalizeInverse(self, mash_params: torch.Tensor) -> torch.Tensor:
-        return self.transformer.inverse_transform(mash_params, False)
+        return self.normalize(mash_params)
 
     def __len__(self):
         return len(self.paths_list)
 
-    def __getitem__(self, index):
-        index = index % len(self.paths_list)
-
-        if self.split == "train":
-            np.random.seed()
-        else:
-            np.random.seed(1234)
-
-        mash_file_path, embedding_file_path_list = self.paths_list[index]
-
-        if not os.path.exists(mash_file_path):
-            if self.output_error:
-                print("[ERROR][EmbeddingDataset::__getitem__]")
-                print("\t this npy file is not valid!")
-            new_idx = random.randint(0, len(self.paths_list) - 1)
-            return self.__getitem__(new_idx)
-
-        embedding_file_idx = np.random.choice(len(embedding_file_path_list))
-
-        embedding_file_path = embedding_file_path_list[embedding_file_idx]
-
-        if embedding_file_path in self.invalid_embedding_file_path_list:
-            new_idx = random.randint(0, len(self.paths_list) - 1)
-            return self.__getitem__(new_idx)
+    def loadEmbedding(self, embedding_file_path: str) -> Union[torch.Tensor, None]:
+        if embedding_file_path in self.invalid_embedding_file_path_set:
+            return None
 
         try:
-            embedding = np.load(embedding_file_path, allow_pickle=True).item()[
-                self.embedding_key
-            ]
+            embedding = self.readFile(
+                embedding_file_path,
+                lambda file_path: np.load(file_path, allow_pickle=True),
+            ).item()[self.embedding_key]
         except KeyboardInterrupt:
-            print("[INFO][EmbeddingDataset::__getitem__]")
+            print("[INFO][EmbeddingDataset::loadEmbedding]")
             print("\t stopped by the user (Ctrl+C).")
             exit()
         except Exception as e:
             if self.output_error:
-                print("[ERROR][EmbeddingDataset::__getitem__]")
+                print("[ERROR][EmbeddingDataset::loadEmbedding]")
                 print("\t this npy file is not valid!")
                 print("\t embedding_file_path:", embedding_file_path)
                 print("\t error info:", e)
 
-            self.invalid_embedding_file_path_list.append(embedding_file_path)
-            new_idx = random.randint(0, len(self.paths_list) - 1)
-            return self.__getitem__(new_idx)
+            self.invalid_embedding_file_path_set.add(embedding_file_path)
+            return None
+
+        return torch.from_numpy(embedding).to(toTorchDType(self.embedding_dtype))
 
-        embedding = torch.from_numpy(embedding).float()
+    def loadData(self, index: int, rng: np.random.Generator) -> Union[dict, None]:
+        mash_file_path, embedding_file_path_list = self.paths_list[index]
 
-        mash_params = loadMashFileParamsTensor(mash_file_path, torch.float32, "cpu")
+        if not os.path.exists(mash_file_path):
+            if self.output_error:
+                print("[ERROR][EmbeddingDataset::loadData]")
+                print("\t this npy file is not valid!")
+            return None
+
+        if self.view_num > 1:
+            # all views share the mash params loaded below
+            embedding_file_idxs = rng.choice(
+                len(embedding_file_path_list),
+                self.view_num,
+                replace=len(embedding_file_path_list) < self.view_num,
+            )
+        else:
+            embedding_file_idxs = [rng.choice(len(embedding_file_path_list))]
+
+        embedding_list = []
+        condition_mask_list = []
+        for embedding_file_idx in embedding_file_idxs:
+            embedding = self.loadEmbedding(embedding_file_path_list[embedding_file_idx])
+            if embedding is None:
+                return None
+
+            # pruned views can differ in token num
+            if self.condition_token_num > 0:
+                embedding, condition_mask = padCondition(embedding, self.condition_token_num)
+                condition_mask_list.append(condition_mask)
+
+            embedding_list.append(embedding)
+
+        condition_mask = None
+        if self.view_num > 1:
+            embedding = torch.stack(embedding_list, dim=0)
+            if self.condition_token_num > 0:
+                condition_mask = torch.stack(condition_mask_list, dim=0)
+        else:
+            embedding = embedding_list[0]
+            if self.condition_token_num > 0:
+                condition_mask = condition_mask_list[0]
 
-        mash_params = self.normalize(mash_params)
+        mash_params = self.loadMashParams(mash_file_path)
 
-        permute_idxs = np.random.permutation(mash_params.shape[0])
+        if self.permute_anchors:
+            permute_idxs = rng.permutation(mash_params.shape[0])
 
-        mash_params = mash_params[permute_idxs]
+            mash_params = mash_params[permute_idxs]
 
         data = {
             "mash_params": mash_params,
             "embedding": embedding,
         }
 
+        if condition_mask is not None:
+            data["condition_mask"] = condition_mask
+
         return data
+
+    def __getitem__(self, index):
+        index = index % len(self.paths_list)
+
+        rng = self.worker_rng.get()
+
+        for _ in range(self.max_retry_num):
+            data = self.loadData(index, rng)
+            if data is not None:
+                data["object_idx"] = index
+                return data
+
+            index = random.randint(0, len(self.paths_list) - 1)
+
+        print("[ERROR][EmbeddingDataset::__getitem__]")
+        print("\t too many invalid samples, please run the dataset validator first!")
+        print("\t max_retry_num:", self.max_retry_num)
+        exit()
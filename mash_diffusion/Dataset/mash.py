@@ -1,13 +1,19 @@
 import os
 import torch
 import numpy as np
-from tqdm import tqdm
+from typing import Callable, Union
 from torch.utils.data import Dataset
 
 from ma_sh.Method.io import loadMashFileParamsTensor
-from ma_sh.Method.transformer import getTransformer
 
 from mash_diffusion.Config.shapenet import CATEGORY_IDS
+from mash_diffusion.Method.transformer import getMashTransformer, toTransformerHash
+from mash_diffusion.Method.validity import loadValidity, filterMashPathsList
+from mash_diffusion.Module.mash_manifest import MashManifest
+from mash_diffusion.Module.normalized_cache import NormalizedMashCache
+from mash_diffusion.Module.local_disk_cache import LocalDiskCache
+from mash_diffusion.Module.shared_memory_cache import SharedMemoryCache
+from mash_diffusion.Module.worker_rng import WorkerRNG
 
 
 class MashDataset(Dataset):
@@ -15,15 +21,32 @@ class MashDataset(Dataset):
         self,
         dataset_root_folder_path: str,
         split: str = "train",
+        manifest_file_path: Union[str, None] = None,
+        normalized_cache_folder_path: Union[str, None] = None,
+        validity_file_path: Union[str, None] = None,
+        permute_anchors: bool = True,
+        local_disk_cache: Union[LocalDiskCache, None] = None,
+        shared_memory_cache_size_mb: float = 0.0,
+        transformer_id: Union[str, None] = None,
     ) -> None:
         self.dataset_root_folder_path = dataset_root_folder_path
         self.split = split
+        self.permute_anchors = permute_anchors
+
+        self.worker_rng = WorkerRNG(split)
+        self.local_disk_cache = local_disk_cache
+        self.transformer_id = transformer_id
 
         self.mash_folder_path = self.dataset_root_folder_path + "MashV4/"
         assert os.path.exists(self.mash_folder_path)
 
         self.paths_list = []
 
+        mash_manifest = MashManifest(self.mash_folder_path, manifest_file_path)
+
+        rel_folder_path_list = []
+        category_id_list = []
+
         dataset_name_list = os.listdir(self.mash_folder_path)
 
         for dataset_name in dataset_name_list:
@@ -37,24 +60,51 @@ class MashDataset(Dataset):
 
             categories = ["03001627"]
 
-            print("[INFO][MashDataset::__init__]")
-            print("\t start load dataset [" + dataset_name + "]...")
-            for category in tqdm(categories):
-                category_id = CATEGORY_IDS[category]
+            for category in categories:
+                rel_folder_path_list.append(dataset_name + "/" + category + "/")
+                category_id_list.append(CATEGORY_IDS[category])
 
-                class_folder_path = dataset_folder_path + category + "/"
+        print("[INFO][MashDataset::__init__]")
+        print("\t start load dataset folders...")
+        mash_filename_list_list = mash_manifest.load(rel_folder_path_list)
+        assert mash_filename_list_list is not None
 
-                mash_filename_list = os.listdir(class_folder_path)
+        for rel_folder_path, category_id, mash_filename_list in zip(
+            rel_folder_path_list, category_id_list, mash_filename_list_list
+        ):
+            class_folder_path = self.mash_folder_path + rel_folder_path
 
-                for mash_filename in mash_filename_list:
-                    mash_file_path = class_folder_path + mash_filename
+            for mash_filename in mash_filename_list:
+                mash_file_path = class_folder_path + mash_filename
 
-                    self.paths_list.append([mash_file_path, category_id])
+                self.paths_list.append([mash_file_path, category_id])
 
         self.paths_list.sort(key=lambda x: x[0])
 
-        self.transformer = getTransformer('ShapeNet_03001627')
+        if validity_file_path is not None:
+            validity = loadValidity(validity_file_path)
+            if validity is not None:
+                self.paths_list = filterMashPathsList(self.paths_list, validity)
+
+        if self.transformer_id is None:
+            self.transformer_id = 'ShapeNet_03001627'
+
+        self.transformer = getMashTransformer(self.transformer_id)
         assert self.transformer is not None
+
+        self.normalized_cache = None
+        if normalized_cache_folder_path is not None:
+            self.normalized_cache = NormalizedMashCache(
+                normalized_cache_folder_path, self.mash_folder_path, self.transformer_id
+            )
+
+        # decoded and normalized mash params shared by all processes on the node
+        self.shared_memory_cache = None
+        if shared_memory_cache_size_mb > 0:
+            self.shared_memory_cache = SharedMemoryCache(
+                "mash_diffusion_" + toTransformerHash(self.transformer)[:16],
+                shared_memory_cache_size_mb,
+            )
         return
 
     def normalize(self, mash_params: torch.Tensor) -> torch.Tensor:
@@ -63,26 +113,52 @@ class MashDataset(Dataset):
     def normalizeInverse(self, mash_params: torch.Tensor) -> torch.Tensor:
         return self.transformer.inverse_transform(mash_params, False)
 
+    def readFile(self, file_path: str, load_func: Callable):
+        if self.local_disk_cache is None:
+            return load_func(file_path)
+
+        return self.local_disk_cache.load(file_path, load_func)
+
+    def loadMashParams(self, mash_file_path: str) -> torch.Tensor:
+        if self.shared_memory_cache is not None:
+            mash_params = self.shared_memory_cache.load(mash_file_path)
+            if mash_params is not None:
+                return mash_params
+
+        mash_params = self.decodeMashParams(mash_file_path)
+
+        if self.shared_memory_cache is not None:
+            self.shared_memory_cache.save(mash_file_path, mash_params)
+
+        return mash_params
+
+    def decodeMashParams(self, mash_file_path: str) -> torch.Tensor:
+        if self.normalized_cache is not None:
+            mash_params = self.normalized_cache.load(mash_file_path)
+            if mash_params is not None:
+                return mash_params
+
+        mash_params = self.readFile(
+            mash_file_path,
+            lambda file_path: loadMashFileParamsTensor(file_path, torch.float32, 'cpu'),
+        )
+
+        return self.normalize(mash_params)
+
     def __len__(self):
         return len(self.paths_list)
 
     def __getitem__(self, index: int):
         index = index % len(self.paths_list)
 
-        if self.split == "train":
-            np.random.seed()
-        else:
-            np.random.seed(1234)
-
         mash_file_path, category_id = self.paths_list[index]
 
-        mash_params = loadMashFileParamsTensor(mash_file_path, torch.float32, 'cpu')
-
-        mash_params = self.normalize(mash_params)
+        mash_params = self.loadMashParams(mash_file_path)
 
-        permute_idxs = np.random.permutation(mash_params.shape[0])
+        if self.permute_anchors:
+            permute_idxs = self.worker_rng.get().permutation(mash_params.shape[0])
 
-        mash_params = mash_params[permute_idxs]
+            mash_params = mash_params[permute_idxs]
 
         data = {
             'mash_params': mash_params,
@@ -0,0 +1,85 @@
+from torch.utils.data import Dataset, IterableDataset
+
+from mash_diffusion.Module.ot_pair_builder import OTPairBuilder
+
+
+# adds the flow pair of OTPairBuilder to each sample, the OT matching runs in the workers
+class OTPairDataset(Dataset):
+    def __init__(self, dataset: Dataset, ot_pair_builder: OTPairBuilder) -> None:
+        self.dataset = dataset
+        self.ot_pair_builder = ot_pair_builder
+
+        # noise bank couplings refer to the anchors in file order
+        if self.ot_pair_builder.noise_bank is not None:
+            self.ot_pair_builder.permute_anchors = self.dataset.permute_anchors
+            self.dataset.permute_anchors = False
+        return
+
+    @property
+    def paths_list(self):
+        return self.dataset.paths_list
+
+    @paths_list.setter
+    def paths_list(self, paths_list) -> None:
+        self.dataset.paths_list = paths_list
+        return
+
+    def normalize(self, mash_params):
+        return self.dataset.normalize(mash_params)
+
+    def normalizeInverse(self, mash_params):
+        return self.dataset.normalizeInverse(mash_params)
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index: int):
+        data = self.dataset[index]
+
+        # datasets which retry invalid samples report the object they loaded,
+        # single shape datasets repeat one object
+        if "object_idx" in data.keys():
+            object_idx = data["object_idx"]
+        elif hasattr(self.dataset, "paths_list"):
+            object_idx = index % len(self.dataset.paths_list)
+        else:
+            object_idx = 0
+
+        return self.ot_pair_builder(data, object_idx)
+
+
+# the streamed samples carry no object idx, so the noise bank is not used
+class OTPairStreamDataset(IterableDataset):
+    def __init__(self, dataset: IterableDataset, ot_pair_builder: OTPairBuilder) -> None:
+        self.dataset = dataset
+        self.ot_pair_builder = ot_pair_builder
+        return
+
+    @property
+    def paths_list(self):
+        return self.dataset.paths_list
+
+    @paths_list.setter
+    def paths_list(self, paths_list) -> None:
+        self.dataset.paths_list = paths_list
+        return
+
+    def normalize(self, mash_params):
+        return self.dataset.normalize(mash_params)
+
+    def normalizeInverse(self, mash_params):
+        return self.dataset.normalizeInverse(mash_params)
+
+    def set_epoch(self, epoch: int) -> None:
+        self.dataset.set_epoch(epoch)
+        return
+
+    def __len__(self):
+        return len(self.dataset)
+
+    def __getitem__(self, index: int):
+        return self.ot_pair_builder(self.dataset[index])
+
+    def __iter__(self):
+        for data in self.dataset:
+            yield self.ot_pair_builder(data)
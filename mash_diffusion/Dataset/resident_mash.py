@@ -0,0 +1,120 @@
+import torch
+from tqdm import trange
+from torch.utils.data import Dataset, default_collate
+
+from mash_diffusion.Module.anchor_permuter import AnchorPermuter
+
+
+# one [M, N, C] tensor on the device, load it with createResidentDataLoader
+class ResidentMashDataset(Dataset):
+    def __init__(
+        self,
+        dataset: Dataset,
+        split: str = "train",
+        device: str = "cpu",
+        permute_anchors: bool = True,
+    ) -> None:
+        self.dataset = dataset
+        self.split = split
+        self.device = device
+        self.permute_anchors = permute_anchors
+
+        self.anchor_permuter = AnchorPermuter(split)
+
+        # single shape datasets repeat one object
+        if hasattr(self.dataset, "paths_list"):
+            self.object_num = len(self.dataset.paths_list)
+            self.length = self.object_num
+        else:
+            self.object_num = 1
+            self.length = len(self.dataset)
+
+        self.mash_params, self.category_ids = self.loadResidentData()
+        return
+
+    def loadResidentData(self) -> tuple:
+        source_permute_anchors = self.dataset.permute_anchors
+        self.dataset.permute_anchors = False
+
+        mash_params_list = []
+        category_id_list = []
+
+        print("[INFO][ResidentMashDataset::loadResidentData]")
+        print("\t start load", self.object_num, "mash params to", self.device, "...")
+        for i in trange(self.object_num):
+            data = self.dataset[i]
+            mash_params_list.append(data["mash_params"].float())
+            category_id_list.append(int(data["category_id"]))
+
+        self.dataset.permute_anchors = source_permute_anchors
+
+        mash_params = torch.stack(mash_params_list, dim=0).contiguous().to(self.device)
+        category_ids = torch.tensor(category_id_list, dtype=torch.long)
+        return mash_params, category_ids
+
+    @property
+    def paths_list(self):
+        if hasattr(self.dataset, "paths_list"):
+            return self.dataset.paths_list
+
+        return list(range(self.length))
+
+    @paths_list.setter
+    def paths_list(self, paths_list) -> None:
+        self.length = min(self.length, len(paths_list))
+
+        if hasattr(self.dataset, "paths_list"):
+            self.dataset.paths_list = paths_list
+
+            self.object_num = self.length
+            self.mash_params = self.mash_params[: self.object_num]
+            self.category_ids = self.category_ids[: self.object_num]
+        return
+
+    def normalize(self, mash_params: torch.Tensor) -> torch.Tensor:
+        return self.dataset.normalize(mash_params)
+
+    def normalizeInverse(self, mash_params: torch.Tensor) -> torch.Tensor:
+        return self.dataset.normalizeInverse(mash_params)
+
+    def __len__(self):
+        return self.length
+
+    def gatherBatch(self, indices: list) -> tuple:
+        object_idxs = torch.tensor(indices, dtype=torch.long) % self.object_num
+
+        mash_params = self.mash_params[object_idxs.to(self.mash_params.device)]
+
+        if self.permute_anchors:
+            mash_params = self.anchor_permuter.permute(mash_params)
+
+        return mash_params, self.category_ids[object_idxs]
+
+    # the whole batch as one gathered tensor, passed through by collate
+    def __getitems__(self, indices: list):
+        mash_params, category_ids = self.gatherBatch(indices)
+
+        data_dict = {
+            'mash_params': mash_params,
+            'category_id': category_ids,
+        }
+
+        return data_dict
+
+    def __getitem__(self, index: int):
+        mash_params, category_ids = self.gatherBatch([index])
+
+        data = {
+            'mash_params': mash_params[0],
+            'category_id': int(category_ids[0]),
+        }
+
+        return data
+
+    @staticmethod
+    def collate(data):
+        # older torch versions fetch the samples one by one
+        if isinstance(data, list):
+            return default_collate(data)
+
+        return data
@@ -0,0 +1,163 @@
+import torch
+import numpy as np
+from typing import Union
+from torch.utils.data import Dataset
+
+from mash_diffusion.Method.transformer import getMashTransformer
+from mash_diffusion.Method.condition import padCondition
+from mash_diffusion.Method.shard import (
+    loadShardIndex,
+    loadShardMeta,
+    toLoadedTensor,
+    toTorchDType,
+)
+from mash_diffusion.Module.shard_reader import ShardReader
+from mash_diffusion.Module.worker_rng import WorkerRNG
+
+
+class ShardedEmbeddingDataset(Dataset):
+    def __init__(
+        self,
+        shard_folder_path: str,
+        split: str = "train",
+        permute_anchors: bool = True,
+        embedding_dtype: str = "float32",
+        view_num: int = 1,
+        condition_token_num: int = 0,
+        transformer_id: Union[str, None] = None,
+    ) -> None:
+        self.shard_folder_path = shard_folder_path
+        self.split = split
+        self.permute_anchors = permute_anchors
+        self.embedding_dtype = embedding_dtype
+        self.view_num = view_num
+        self.condition_token_num = condition_token_num
+
+        self.worker_rng = WorkerRNG(split)
+
+        self.meta = loadShardMeta(self.shard_folder_path)
+        assert self.meta is not None
+        assert self.meta["dataset_type"] == "embedding"
+
+        index_dict = loadShardIndex(self.shard_folder_path)
+        assert index_dict is not None
+
+        self.object_mash_record_idxs = index_dict["object_mash_record_idxs"]
+        self.object_view_starts = index_dict["object_view_starts"]
+        self.object_view_nums = index_dict["object_view_nums"]
+
+        self.mash_reader = ShardReader(
+            self.shard_folder_path,
+            "mash",
+            index_dict["mash_records"],
+            self.meta["streams"]["mash"]["dtype"],
+            self.meta["streams"]["mash"]["compress"],
+        )
+        self.embedding_reader = ShardReader(
+            self.shard_folder_path,
+            "embedding",
+            index_dict["embedding_records"],
+            self.meta["streams"]["embedding"]["dtype"],
+            self.meta["streams"]["embedding"]["compress"],
+        )
+
+        # object names, kept under this name so that callers can truncate it
+        self.paths_list = index_dict["object_names"]
+
+        # the packed mash params are raw, so any fitted transformer can be used
+        self.transformer_id = transformer_id
+        if self.transformer_id is None:
+            self.transformer_id = self.meta["transformer_id"]
+
+        self.transformer = getMashTransformer(self.transformer_id)
+        assert self.transformer is not None
+        return
+
+    def normalize(self, mash_params: torch.Tensor) -> torch.Tensor:
+        return self.transformer.transform(mash_params, False)
+
+    def normalizeInverse(self, mash_params: torch.Tensor) -> torch.Tensor:
+        return self.transformer.inverse_transform(mash_params, False)
+
+    def toEmbeddingTensor(self, embedding: np.ndarray) -> torch.Tensor:
+        # kept in its stored dtype when it matches, so the read stays zero-copy
+        return toLoadedTensor(
+            embedding, self.meta["streams"]["embedding"]["dtype"]
+        ).to(toTorchDType(self.embedding_dtype))
+
+    def getObjectShardIdxs(self) -> np.ndarray:
+        return self.embedding_reader.records[self.object_view_starts, 0]
+
+    def __len__(self):
+        return len(self.paths_list)
+
+    def __getitem__(self, index):
+        index = index % len(self.paths_list)
+
+        rng = self.worker_rng.get()
+
+        object_view_num = self.object_view_nums[index]
+        object_view_start = self.object_view_starts[index]
+
+        if self.view_num > 1:
+            view_idxs = rng.choice(
+                object_view_num, self.view_num, replace=object_view_num < self.view_num
+            )
+        else:
+            view_idxs = [rng.choice(object_view_num)]
+
+        condition_mask = None
+        if self.view_num > 1 and self.condition_token_num == 0:
+            # the views of one object are one range, only the chosen ones are touched
+            embeddings = self.embedding_reader.readRange(object_view_start, object_view_num)
+            if isinstance(embeddings, list):
+                embeddings = np.stack([embeddings[view_idx] for view_idx in view_idxs], axis=0)
+            else:
+                embeddings = embeddings[view_idxs]
+
+            embedding = self.toEmbeddingTensor(embeddings)
+        else:
+            # pruned views can differ in token num, so they are padded one by one
+            embedding_list = []
+            condition_mask_list = []
+            for view_idx in view_idxs:
+                embedding = self.toEmbeddingTensor(
+                    self.embedding_reader.read(object_view_start + view_idx)
+                )
+
+                if self.condition_token_num > 0:
+                    embedding, condition_mask = padCondition(embedding, self.condition_token_num)
+                    condition_mask_list.append(condition_mask)
+
+                embedding_list.append(embedding)
+
+            if self.view_num > 1:
+                embedding = torch.stack(embedding_list, dim=0)
+                if self.condition_token_num > 0:
+                    condition_mask = torch.stack(condition_mask_list, dim=0)
+            else:
+                embedding = embedding_list[0]
+                if self.condition_token_num > 0:
+                    condition_mask = condition_mask_list[0]
+
+        mash_params = self.mash_reader.read(self.object_mash_record_idxs[index])
+        mash_params = toLoadedTensor(
+            mash_params, self.meta["streams"]["mash"]["dtype"]
+        ).float()
+
+        mash_params = self.normalize(mash_params)
+
+        if self.permute_anchors:
+            permute_idxs = rng.permutation(mash_params.shape[0])
+
+            mash_params = mash_params[permute_idxs]
+
+        data = {
+            "mash_params": mash_params,
+            "embedding": embedding,
+        }
+
+        if condition_mask is not None:
+            data["condition_mask"] = condition_mask
+
+        return data
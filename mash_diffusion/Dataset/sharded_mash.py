@@ -0,0 +1,88 @@
+import torch
+import numpy as np
+from typing import Union
+from torch.utils.data import Dataset
+
+from mash_diffusion.Method.transformer import getMashTransformer
+from mash_diffusion.Method.shard import loadShardIndex, loadShardMeta, toLoadedTensor
+from mash_diffusion.Module.shard_reader import ShardReader
+from mash_diffusion.Module.worker_rng import WorkerRNG
+
+
+class ShardedMashDataset(Dataset):
+    def __init__(
+        self,
+        shard_folder_path: str,
+        split: str = "train",
+        permute_anchors: bool = True,
+        transformer_id: Union[str, None] = None,
+    ) -> None:
+        self.shard_folder_path = shard_folder_path
+        self.split = split
+        self.permute_anchors = permute_anchors
+
+        self.worker_rng = WorkerRNG(split)
+
+        self.meta = loadShardMeta(self.shard_folder_path)
+        assert self.meta is not None
+        assert self.meta["dataset_type"] == "mash"
+
+        index_dict = loadShardIndex(self.shard_folder_path)
+        assert index_dict is not None
+
+        self.object_mash_record_idxs = index_dict["object_mash_record_idxs"]
+        self.category_ids = index_dict["category_ids"]
+
+        self.mash_reader = ShardReader(
+            self.shard_folder_path,
+            "mash",
+            index_dict["mash_records"],
+            self.meta["streams"]["mash"]["dtype"],
+            self.meta["streams"]["mash"]["compress"],
+        )
+
+        # object names, kept under this name so that callers can truncate it
+        self.paths_list = index_dict["object_names"]
+
+        # the packed mash params are raw, so any fitted transformer can be used
+        self.transformer_id = transformer_id
+        if self.transformer_id is None:
+            self.transformer_id = self.meta["transformer_id"]
+
+        self.transformer = getMashTransformer(self.transformer_id)
+        assert self.transformer is not None
+        return
+
+    def normalize(self, mash_params: torch.Tensor) -> torch.Tensor:
+        return self.transformer.transform(mash_params, False)
+
+    def normalizeInverse(self, mash_params: torch.Tensor) -> torch.Tensor:
+        return self.transformer.inverse_transform(mash_params, False)
+
+    def getObjectShardIdxs(self) -> np.ndarray:
+        return self.mash_reader.records[self.object_mash_record_idxs, 0]
+
+    def __len__(self):
+        return len(self.paths_list)
+
+    def __getitem__(self, index: int):
+        index = index % len(self.paths_list)
+
+        mash_params = self.mash_reader.read(self.object_mash_record_idxs[index])
+        mash_params = toLoadedTensor(
+            mash_params, self.meta["streams"]["mash"]["dtype"]
+        ).float()
+
+        mash_params = self.normalize(mash_params)
+
+        if self.permute_anchors:
+            permute_idxs = self.worker_rng.get().permutation(mash_params.shape[0])
+
+            mash_params = mash_params[permute_idxs]
+
+        data = {
+            'mash_params': mash_params,
+            'category_id': int(self.category_ids[index]),
+        }
+
+        return data
@@ -5,14 +5,21 @@ from torch.utils.data import Dataset
 
 from ma_sh.Method.io import loadMashFileParamsTensor
 
+from mash_diffusion.Module.worker_rng import WorkerRNG
+
 
 class SingleShapeDataset(Dataset):
     def __init__(
         self,
         mash_file_path: str,
+        permute_anchors: bool = True,
     ) -> None:
         assert os.path.exists(mash_file_path)
 
+        self.permute_anchors = permute_anchors
+
+        self.worker_rng = WorkerRNG("train")
+
         self.category_id = 0
 
         self.mash_params = loadMashFileParamsTensor(mash_file_path, torch.float32, 'cpu')
@@ -30,10 +37,14 @@ class SingleShapeDataset(Dataset):
         return 10000
 
     def __getitem__(self, index: int):
-        permute_idxs = np.random.permutation(self.mash_params.shape[0])
+        if self.permute_anchors:
+            permute_idxs = self.worker_rng.get().permutation(self.mash_params.shape[0])
+            mash_params = self.mash_params[permute_idxs]
+        else:
+            mash_params = self.mash_params.clone()
 
         data = {
-            'mash_params': self.mash_params[permute_idxs],
+            'mash_params': mash_params,
             'category_id': self.category_id,
         }
 
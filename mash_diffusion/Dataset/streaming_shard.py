@@ -0,0 +1,143 @@
+import numpy as np
+from typing import Union
+from torch.utils.data import IterableDataset, get_worker_info
+
+from mash_diffusion.Method.shard import loadShardMeta
+from mash_diffusion.Method.distributed import getDistributedInfo
+from mash_diffusion.Dataset.sharded_mash import ShardedMashDataset
+from mash_diffusion.Dataset.sharded_embedding import ShardedEmbeddingDataset
+
+
+# disjoint shard ranges per rank and worker, use without a sampler and without shuffle
+class StreamingShardDataset(IterableDataset):
+    def __init__(
+        self,
+        shard_folder_path: str,
+        split: str = "train",
+        shuffle_buffer_size: int = 1024,
+        seed: int = 0,
+        permute_anchors: bool = True,
+        embedding_dtype: str = "float32",
+        view_num: int = 1,
+        condition_token_num: int = 0,
+        transformer_id: Union[str, None] = None,
+    ) -> None:
+        self.shard_folder_path = shard_folder_path
+        self.split = split
+        self.shuffle_buffer_size = shuffle_buffer_size
+        self.seed = seed
+
+        meta = loadShardMeta(self.shard_folder_path)
+        assert meta is not None
+
+        if meta["dataset_type"] == "embedding":
+            self.dataset = ShardedEmbeddingDataset(
+                shard_folder_path,
+                split,
+                permute_anchors,
+                embedding_dtype,
+                view_num,
+                condition_token_num,
+                transformer_id,
+            )
+        else:
+            self.dataset = ShardedMashDataset(
+                shard_folder_path, split, permute_anchors, transformer_id
+            )
+
+        self.epoch = 0
+        self.is_epoch_set = False
+        return
+
+    @property
+    def paths_list(self):
+        return self.dataset.paths_list
+
+    @paths_list.setter
+    def paths_list(self, paths_list) -> None:
+        self.dataset.paths_list = paths_list
+        return
+
+    def normalize(self, mash_params):
+        return self.dataset.normalize(mash_params)
+
+    def normalizeInverse(self, mash_params):
+        return self.dataset.normalizeInverse(mash_params)
+
+    def set_epoch(self, epoch: int) -> None:
+        self.epoch = epoch
+        self.is_epoch_set = True
+        return
+
+    def __len__(self):
+        _, world_size = getDistributedInfo()
+        return len(self.dataset) // world_size
+
+    def __getitem__(self, index: int):
+        return self.dataset[index]
+
+    # object idxs ordered shard by shard, the same on every rank
+    def toObjectIdxs(self, epoch: int) -> np.ndarray:
+        object_num = len(self.dataset)
+        object_shard_idxs = self.dataset.getObjectShardIdxs()[:object_num]
+
+        shard_idxs = np.unique(object_shard_idxs)
+        if self.split == "train":
+            shard_idxs = np.random.default_rng([self.seed, epoch]).permutation(shard_idxs)
+
+        shard_order = np.zeros([int(shard_idxs.max()) + 1], dtype=np.int64)
+        shard_order[shard_idxs] = np.arange(shard_idxs.shape[0])
+
+        return np.argsort(shard_order[object_shard_idxs], kind="stable")
+
+    def toWorkerObjectIdxs(self, object_idxs: np.ndarray) -> tuple:
+        rank, world_size = getDistributedInfo()
+
+        rank_object_num = object_idxs.shape[0] // world_size
+        rank_object_idxs = object_idxs[
+            rank * rank_object_num : (rank + 1) * rank_object_num
+        ]
+
+        worker_info = get_worker_info()
+        if worker_info is None:
+            return rank_object_idxs, [rank]
+
+        worker_object_idxs = np.array_split(rank_object_idxs, worker_info.num_workers)[
+            worker_info.id
+        ]
+        # the worker seed also changes per epoch when workers are re-created
+        return worker_object_idxs, [rank, worker_info.id, worker_info.seed % (1 << 32)]
+
+    def __iter__(self):
+        epoch = self.epoch
+        if not self.is_epoch_set:
+            self.epoch += 1
+
+        object_idxs = self.toObjectIdxs(epoch)
+        worker_object_idxs, worker_seed = self.toWorkerObjectIdxs(object_idxs)
+
+        if self.split != "train" or self.shuffle_buffer_size <= 1:
+            for object_idx in worker_object_idxs:
+                data = self.dataset[int(object_idx)]
+                data["epoch"] = epoch
+                yield data
+            return
+
+        rng = np.random.default_rng([self.seed, epoch] + worker_seed)
+
+        buffer = []
+        for object_idx in worker_object_idxs:
+            data = self.dataset[int(object_idx)]
+            data["epoch"] = epoch
+
+            if len(buffer) < self.shuffle_buffer_size:
+                buffer.append(data)
+                continue
+
+            buffer_idx = rng.integers(len(buffer))
+            yield buffer[buffer_idx]
+            buffer[buffer_idx] = data
+
+        rng.shuffle(buffer)
+        for data in buffer:
+            yield data
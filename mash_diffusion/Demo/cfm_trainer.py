@@ -37,6 +37,35 @@ def demo():
     sample_results_freq = 50
     use_amp = False
     quick_test = False
+    dataset_shard_folder_path_dict = {
+        # "dino": dataset_root_folder_path + "Objaverse_82K/render_dino_shard/",
+    }
+    normalized_cache_folder_path_dict = {}
+    dataset_validity_file_path_dict = {}
+    batch_permute_anchors = False
+    embedding_dtype = "float32"
+    upcast_condition = True
+    streaming_shuffle_buffer_size = 0
+    local_cache_folder_path = None
+    local_cache_size_gb = 100.0
+    resident_dataset = False
+    shared_memory_cache_size_mb = 0.0
+    condition_view_num = 1
+    embedding_folder_name = "Objaverse_82K/render_dino"
+    condition_pca_file_path = None
+    condition_token_num = 0
+    transformer_id_dict = {}
+    worker_ot_pairs = False
+    ot_method = "exact"
+    ot_worker_num = 8
+    ot_pool_type = "thread"
+    noise_bank_folder_path = None
+    noise_bank_refresh_prob = 0.0
+    ot_projection_num = 16
+    ot_refine_iter_num = 0
+    ot_cost_gap_freq = 0
+    draws_per_sample = 1
+    attn_backend = "einsum"
 
     cfm_trainer = CFMTrainer(
         dataset_root_folder_path,
@@ -61,6 +90,33 @@ def demo():
         sample_results_freq,
         use_amp,
         quick_test,
+        dataset_shard_folder_path_dict,
+        normalized_cache_folder_path_dict,
+        dataset_validity_file_path_dict,
+        batch_permute_anchors,
+        embedding_dtype,
+        upcast_condition,
+        streaming_shuffle_buffer_size,
+        local_cache_folder_path,
+        local_cache_size_gb,
+        resident_dataset,
+        shared_memory_cache_size_mb,
+        condition_view_num,
+        embedding_folder_name,
+        condition_pca_file_path,
+        condition_token_num,
+        transformer_id_dict,
+        worker_ot_pairs,
+        ot_method,
+        ot_worker_num,
+        ot_pool_type,
+        noise_bank_folder_path,
+        noise_bank_refresh_prob,
+        ot_projection_num,
+        ot_refine_iter_num,
+        ot_cost_gap_freq,
+        draws_per_sample,
+        attn_backend,
     )
 
     cfm_trainer.train()
@@ -0,0 +1,56 @@
+import sys
+sys.path.append("../ma-sh/")
+
+import random
+
+from ma_sh.Config.custom_path import toDatasetRootPath
+
+from mash_diffusion.Dataset.embedding import EmbeddingDataset
+from mash_diffusion.Module.condition_compressor import ConditionCompressor
+
+
+def demo():
+    dataset_root_folder_path = toDatasetRootPath()
+    assert dataset_root_folder_path is not None
+    print(dataset_root_folder_path)
+
+    dataset_json_file_path = dataset_root_folder_path + "Objaverse_82K/render_dino.pkl"
+    embedding_folder_name = "Objaverse_82K/render_dino"
+    save_embedding_folder_name = "Objaverse_82K/render_dino_pca256"
+    projection_file_path = dataset_root_folder_path + "Objaverse_82K/render_dino_pca256.npz"
+    dim = 1024
+    reduced_dim = 256
+    whiten = False
+    fit_file_num = 20000
+    worker_num = 16
+
+    dataset = EmbeddingDataset(
+        dataset_root_folder_path,
+        embedding_folder_name,
+        "dino",
+        "train",
+        dataset_json_file_path,
+    )
+
+    embedding_file_path_list = []
+    for _, view_file_path_list in dataset.paths_list:
+        embedding_file_path_list += view_file_path_list
+
+    condition_compressor = ConditionCompressor(
+        dataset.embedding_key, dim, reduced_dim, whiten, worker_num
+    )
+
+    fit_file_path_list = embedding_file_path_list
+    if len(fit_file_path_list) > fit_file_num:
+        fit_file_path_list = random.sample(fit_file_path_list, fit_file_num)
+
+    condition_pca = condition_compressor.fit(fit_file_path_list)
+    condition_pca.saveProjection(projection_file_path)
+
+    condition_compressor.compress(
+        projection_file_path,
+        embedding_file_path_list,
+        dataset.embedding_root_folder_path,
+        dataset_root_folder_path + save_embedding_folder_name + "/",
+    )
+    return True
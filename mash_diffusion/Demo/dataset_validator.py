@@ -0,0 +1,46 @@
+import sys
+sys.path.append("../ma-sh/")
+
+from ma_sh.Config.custom_path import toDatasetRootPath
+
+from mash_diffusion.Dataset.mash import MashDataset
+from mash_diffusion.Dataset.embedding import EmbeddingDataset
+from mash_diffusion.Module.dataset_validator import DatasetValidator
+
+
+def demo():
+    dataset_root_folder_path = toDatasetRootPath()
+    assert dataset_root_folder_path is not None
+    print(dataset_root_folder_path)
+
+    dataset_json_file_path = dataset_root_folder_path + "Objaverse_82K/render_dino.pkl"
+    worker_num = 16
+    validate_dino = True
+    validate_category = False
+
+    dataset_validator = DatasetValidator(worker_num)
+
+    if validate_dino:
+        dataset = EmbeddingDataset(
+            dataset_root_folder_path,
+            "Objaverse_82K/render_dino",
+            "dino",
+            "train",
+            dataset_json_file_path,
+        )
+
+        dataset_validator.validateEmbeddingPathsList(
+            dataset.paths_list,
+            dataset.embedding_key,
+            dataset_root_folder_path + "Objaverse_82K/render_dino_validity.npz",
+        )
+
+    if validate_category:
+        dataset = MashDataset(dataset_root_folder_path, "train")
+
+        dataset_validator.validateMashPathsList(
+            dataset.paths_list,
+            dataset_root_folder_path + "MashV4_validity.npz",
+        )
+
+    return True
@@ -37,6 +37,26 @@ def demo():
     sample_results_freq = 50
     use_amp = False
     quick_test = False
+    dataset_shard_folder_path_dict = {
+        # "dino": dataset_root_folder_path + "Objaverse_82K/render_dino_shard/",
+    }
+    normalized_cache_folder_path_dict = {}
+    dataset_validity_file_path_dict = {}
+    batch_permute_anchors = False
+    embedding_dtype = "float32"
+    upcast_condition = True
+    streaming_shuffle_buffer_size = 0
+    local_cache_folder_path = None
+    local_cache_size_gb = 100.0
+    resident_dataset = False
+    shared_memory_cache_size_mb = 0.0
+    condition_view_num = 1
+    embedding_folder_name = "Objaverse_82K/render_dino"
+    condition_pca_file_path = None
+    condition_token_num = 0
+    transformer_id_dict = {}
+    draws_per_sample = 1
+    attn_backend = "einsum"
 
     edm_trainer = EDMTrainer(
         dataset_root_folder_path,
@@ -61,6 +81,24 @@ def demo():
         sample_results_freq,
         use_amp,
         quick_test,
+        dataset_shard_folder_path_dict,
+        normalized_cache_folder_path_dict,
+        dataset_validity_file_path_dict,
+        batch_permute_anchors,
+        embedding_dtype,
+        upcast_condition,
+        streaming_shuffle_buffer_size,
+        local_cache_folder_path,
+        local_cache_size_gb,
+        resident_dataset,
+        shared_memory_cache_size_mb,
+        condition_view_num,
+        embedding_folder_name,
+        condition_pca_file_path,
+        condition_token_num,
+        transformer_id_dict,
+        draws_per_sample,
+        attn_backend,
     )
 
     edm_trainer.train()
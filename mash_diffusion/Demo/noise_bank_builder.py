@@ -0,0 +1,31 @@
+import sys
+sys.path.append("../ma-sh/")
+
+from ma_sh.Config.custom_path import toDatasetRootPath
+
+from mash_diffusion.Dataset.embedding import EmbeddingDataset
+from mash_diffusion.Module.noise_bank_builder import NoiseBankBuilder
+
+
+def demo():
+    dataset_root_folder_path = toDatasetRootPath()
+    assert dataset_root_folder_path is not None
+    print(dataset_root_folder_path)
+
+    dataset_json_file_path = dataset_root_folder_path + "Objaverse_82K/render_dino.pkl"
+    bank_folder_path = dataset_root_folder_path + "Objaverse_82K/noise_bank/"
+    draw_num = 16
+    worker_num = 16
+
+    dataset = EmbeddingDataset(
+        dataset_root_folder_path,
+        "Objaverse_82K/render_dino",
+        "dino",
+        "train",
+        dataset_json_file_path,
+    )
+
+    noise_bank_builder = NoiseBankBuilder(dataset, bank_folder_path, draw_num)
+
+    noise_bank_builder.build(worker_num)
+    return True
@@ -0,0 +1,47 @@
+import sys
+sys.path.append("../ma-sh/")
+
+from ma_sh.Config.custom_path import toDatasetRootPath
+
+from mash_diffusion.Dataset.mash import MashDataset
+from mash_diffusion.Dataset.embedding import EmbeddingDataset
+from mash_diffusion.Module.normalized_cache import NormalizedMashCache
+
+
+def demo():
+    dataset_root_folder_path = toDatasetRootPath()
+    assert dataset_root_folder_path is not None
+    print(dataset_root_folder_path)
+
+    dataset_json_file_path = dataset_root_folder_path + "Objaverse_82K/render_dino.pkl"
+    worker_num = 16
+    cache_dino = True
+    cache_category = False
+
+    if cache_dino:
+        dataset = EmbeddingDataset(
+            dataset_root_folder_path,
+            "Objaverse_82K/render_dino",
+            "dino",
+            "train",
+            dataset_json_file_path,
+        )
+
+        normalized_cache = NormalizedMashCache(
+            dataset_root_folder_path + "Objaverse_82K/manifold_mash_normalized/",
+            dataset.mash_folder_path,
+            "Objaverse_82K",
+        )
+        normalized_cache.build([paths[0] for paths in dataset.paths_list], worker_num)
+
+    if cache_category:
+        dataset = MashDataset(dataset_root_folder_path, "train")
+
+        normalized_cache = NormalizedMashCache(
+            dataset_root_folder_path + "MashV4_normalized/",
+            dataset.mash_folder_path,
+            "ShapeNet_03001627",
+        )
+        normalized_cache.build([paths[0] for paths in dataset.paths_list], worker_num)
+
+    return True
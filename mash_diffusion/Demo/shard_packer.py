@@ -0,0 +1,54 @@
+import sys
+sys.path.append("../ma-sh/")
+
+from ma_sh.Config.custom_path import toDatasetRootPath
+
+from mash_diffusion.Dataset.mash import MashDataset
+from mash_diffusion.Dataset.embedding import EmbeddingDataset
+from mash_diffusion.Module.shard_packer import ShardPacker
+
+
+def demo():
+    dataset_root_folder_path = toDatasetRootPath()
+    assert dataset_root_folder_path is not None
+    print(dataset_root_folder_path)
+
+    dataset_json_file_path = dataset_root_folder_path + "Objaverse_82K/render_dino.pkl"
+    mash_dtype = "float32"
+    embedding_dtype = "float16"
+    compress = False
+    max_shard_size_mb = 1024.0
+    pack_dino = True
+    pack_category = False
+
+    if pack_dino:
+        dataset = EmbeddingDataset(
+            dataset_root_folder_path,
+            "Objaverse_82K/render_dino",
+            "dino",
+            "train",
+            dataset_json_file_path,
+        )
+
+        shard_packer = ShardPacker(
+            dataset_root_folder_path + "Objaverse_82K/render_dino_shard/",
+            mash_dtype,
+            embedding_dtype,
+            compress,
+            max_shard_size_mb,
+        )
+        shard_packer.packEmbeddingDataset(dataset)
+
+    if pack_category:
+        dataset = MashDataset(dataset_root_folder_path, "train")
+
+        shard_packer = ShardPacker(
+            dataset_root_folder_path + "MashV4_shard/ShapeNet_03001627/",
+            mash_dtype,
+            embedding_dtype,
+            compress,
+            max_shard_size_mb,
+        )
+        shard_packer.packMashDataset(dataset)
+
+    return True
@@ -0,0 +1,45 @@
+import sys
+sys.path.append("../ma-sh/")
+
+from ma_sh.Config.custom_path import toDatasetRootPath
+
+from mash_diffusion.Dataset.embedding import EmbeddingDataset
+from mash_diffusion.Module.token_pruner import TokenPruner
+
+
+def demo():
+    dataset_root_folder_path = toDatasetRootPath()
+    assert dataset_root_folder_path is not None
+    print(dataset_root_folder_path)
+
+    dataset_json_file_path = dataset_root_folder_path + "Objaverse_82K/render_dino.pkl"
+    embedding_folder_name = "Objaverse_82K/render_dino"
+    save_embedding_folder_name = "Objaverse_82K/render_dino_top256"
+    keep_num = 256
+    score_type = "background"
+    cls_token_num = 1
+    score_threshold = None
+    worker_num = 16
+
+    dataset = EmbeddingDataset(
+        dataset_root_folder_path,
+        embedding_folder_name,
+        "dino",
+        "train",
+        dataset_json_file_path,
+    )
+
+    embedding_file_path_list = []
+    for _, view_file_path_list in dataset.paths_list:
+        embedding_file_path_list += view_file_path_list
+
+    token_pruner = TokenPruner(keep_num, score_type, cls_token_num, score_threshold)
+
+    token_pruner.pruneFiles(
+        embedding_file_path_list,
+        dataset.embedding_key,
+        dataset.embedding_root_folder_path,
+        dataset_root_folder_path + save_embedding_folder_name + "/",
+        worker_num,
+    )
+    return True
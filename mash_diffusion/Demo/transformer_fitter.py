@@ -0,0 +1,30 @@
+import sys
+sys.path.append("../ma-sh/")
+
+from ma_sh.Config.custom_path import toDatasetRootPath
+
+from mash_diffusion.Dataset.mash import MashDataset
+from mash_diffusion.Module.transformer_fitter import TransformerFitter
+
+
+def demo():
+    dataset_root_folder_path = toDatasetRootPath()
+    assert dataset_root_folder_path is not None
+    print(dataset_root_folder_path)
+
+    save_transformer_file_path = dataset_root_folder_path + "MashV4_transformer/ShapeNet_03001627_quantile.npz"
+    mode = "quantile"
+    bin_num = 4096
+    worker_num = 16
+    chunk_size = 64
+
+    dataset = MashDataset(dataset_root_folder_path, "train")
+
+    mash_file_path_list = [paths[0] for paths in dataset.paths_list]
+
+    transformer_fitter = TransformerFitter(mode, 25, bin_num, worker_num, chunk_size)
+
+    mash_transformer = transformer_fitter.fit(mash_file_path_list)
+
+    mash_transformer.saveTransformer(save_transformer_file_path)
+    return True
@@ -0,0 +1,15 @@
+import torch
+
+
+# [..., T, D] -> [..., token_num, D] and mask [..., token_num], extra tokens are dropped
+def padCondition(embedding: torch.Tensor, token_num: int) -> tuple:
+    valid_token_num = min(embedding.shape[-2], token_num)
+
+    padded_embedding = embedding.new_zeros(
+        embedding.shape[:-2] + (token_num, embedding.shape[-1])
+    )
+    padded_embedding[..., :valid_token_num, :] = embedding[..., :valid_token_num, :]
+
+    mask = torch.zeros(embedding.shape[:-2] + (token_num,), dtype=torch.bool)
+    mask[..., :valid_token_num] = True
+    return padded_embedding, mask
@@ -0,0 +1,49 @@
+from torch.utils.data import DataLoader, Dataset, IterableDataset
+from torch.utils.data.distributed import DistributedSampler
+
+from mash_diffusion.Method.distributed import getDistributedInfo
+
+
+# the map-style dataset an iterable wrapper streams from
+def toMapStyleDataset(dataset: Dataset) -> Dataset:
+    while isinstance(dataset, IterableDataset):
+        dataset = dataset.dataset
+
+    return dataset
+
+
+# the dataset splits its shards per rank and worker, a sampler or shuffle would break that
+def createStreamingDataLoader(
+    dataset: IterableDataset,
+    batch_size: int,
+    num_workers: int,
+) -> DataLoader:
+    return DataLoader(
+        dataset,
+        batch_size=batch_size,
+        shuffle=False,
+        sampler=None,
+        num_workers=num_workers,
+        pin_memory=True,
+    )
+
+
+# the dataset gathers whole batches on the training device in the main process, so
+# there are no workers and no pinning, collate passes the gathered batch through
+def createResidentDataLoader(dataset: Dataset, batch_size: int, split: str) -> tuple:
+    rank, world_size = getDistributedInfo()
+
+    # also with one process, it reshuffles per set_epoch like the other train loaders
+    sampler = DistributedSampler(
+        dataset, num_replicas=world_size, rank=rank, shuffle=split == "train"
+    )
+
+    dataloader = DataLoader(
+        dataset,
+        batch_size=batch_size,
+        sampler=sampler,
+        num_workers=0,
+        collate_fn=dataset.collate,
+        pin_memory=False,
+    )
+    return dataloader, sampler
@@ -0,0 +1,37 @@
+import os
+import torch.distributed as dist
+
+
+def getRank() -> int:
+    return int(os.environ.get("RANK", 0))
+
+
+def getLocalRank() -> int:
+    return int(os.environ.get("LOCAL_RANK", 0))
+
+
+def getWorldSize() -> int:
+    return int(os.environ.get("WORLD_SIZE", 1))
+
+
+# the same for every process of one torchrun launch
+def getJobToken() -> str:
+    if "LOCAL_RANK" not in os.environ:
+        return "pid_" + str(os.getpid())
+
+    return "_".join(
+        [
+            "torchrun",
+            os.environ.get("TORCHELASTIC_RUN_ID", "none"),
+            os.environ.get("MASTER_ADDR", "localhost"),
+            os.environ.get("MASTER_PORT", "0"),
+            str(os.getppid()),
+        ]
+    )
+
+
+def getDistributedInfo() -> tuple:
+    if dist.is_available() and dist.is_initialized():
+        return dist.get_rank(), dist.get_world_size()
+
+    return getRank(), getWorldSize()
@@ -0,0 +1,17 @@
+import torch
+from typing import Union
+
+
+def toBatchPermuteIdxs(
+    batch_size: int,
+    anchor_num: int,
+    generator: Union[torch.Generator, None] = None,
+    device: str = "cpu",
+) -> torch.Tensor:
+    rand_values = torch.rand([batch_size, anchor_num], generator=generator, device=device)
+    return torch.argsort(rand_values, dim=1)
+
+
+def permuteBatchAnchors(mash_params: torch.Tensor, permute_idxs: torch.Tensor) -> torch.Tensor:
+    gather_idxs = permute_idxs.unsqueeze(-1).expand(-1, -1, mash_params.shape[-1])
+    return torch.gather(mash_params, 1, gather_idxs)
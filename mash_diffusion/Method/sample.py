@@ -126,6 +126,11 @@ def edm_sampler(
 
     t_steps = toTSteps(num_steps, sigma_min, sigma_max, rho).to(latents.device)
 
+    # the condition is constant over the solve, its K/V are computed once
+    is_prefilled = condition is not None and hasattr(net, "prefillCondition")
+    if is_prefilled:
+        net.prefillCondition(condition)
+
     # Main sampling loop.
     x_next = randn_like(latents) * t_steps[0]
 
@@ -142,6 +147,9 @@ def edm_sampler(
 
         x_list.append(x_next.detach().clone())
 
+    if is_prefilled:
+        net.clearConditionCache()
+
     return x_list
 
 
@@ -0,0 +1,96 @@
+import os
+import json
+import torch
+import numpy as np
+from typing import Union
+
+
+# record columns: shard_idx, byte_offset, byte_num, ndim, shape[0:4]
+RECORD_SIZE = 8
+SHARD_ALIGN_BYTES = 64
+
+SHARD_META_FILE_NAME = "meta.json"
+SHARD_INDEX_FILE_NAME = "index.npz"
+
+# numpy has no bfloat16, its raw bits are stored as uint16
+NUMPY_DTYPE_DICT = {
+    "float32": np.float32,
+    "float16": np.float16,
+    "bfloat16": np.uint16,
+}
+
+TORCH_DTYPE_DICT = {
+    "float32": torch.float32,
+    "float16": torch.float16,
+    "bfloat16": torch.bfloat16,
+}
+
+
+def toNumpyDType(dtype: str):
+    assert dtype in NUMPY_DTYPE_DICT.keys()
+    return NUMPY_DTYPE_DICT[dtype]
+
+
+def toTorchDType(dtype: str) -> torch.dtype:
+    assert dtype in TORCH_DTYPE_DICT.keys()
+    return TORCH_DTYPE_DICT[dtype]
+
+
+def toStoredArray(array: np.ndarray, dtype: str) -> np.ndarray:
+    if dtype == "bfloat16":
+        tensor = torch.from_numpy(np.ascontiguousarray(array, dtype=np.float32))
+        return tensor.to(torch.bfloat16).view(torch.int16).numpy().view(np.uint16)
+
+    return np.ascontiguousarray(array, dtype=toNumpyDType(dtype))
+
+
+def toLoadedTensor(array: np.ndarray, dtype: str) -> torch.Tensor:
+    if dtype == "bfloat16":
+        return torch.from_numpy(array.view(np.int16)).view(torch.bfloat16)
+
+    return torch.from_numpy(array)
+
+
+def toShardFilePath(shard_folder_path: str, stream_name: str, shard_idx: int) -> str:
+    return shard_folder_path + stream_name + "_" + str(shard_idx).zfill(5) + ".bin"
+
+
+def toRecordShape(record: np.ndarray) -> tuple:
+    ndim = int(record[3])
+    return tuple(int(dim) for dim in record[4 : 4 + ndim])
+
+
+def saveShardMeta(shard_folder_path: str, meta: dict) -> bool:
+    os.makedirs(shard_folder_path, exist_ok=True)
+
+    with open(shard_folder_path + SHARD_META_FILE_NAME, "w") as f:
+        json.dump(meta, f, indent=4)
+    return True
+
+
+def loadShardMeta(shard_folder_path: str) -> Union[dict, None]:
+    meta_file_path = shard_folder_path + SHARD_META_FILE_NAME
+    if not os.path.exists(meta_file_path):
+        print("[ERROR][shard::loadShardMeta]")
+        print("\t meta file not exist!")
+        print("\t meta_file_path:", meta_file_path)
+        return None
+
+    with open(meta_file_path, "r") as f:
+        meta = json.load(f)
+    return meta
+
+
+def loadShardIndex(shard_folder_path: str) -> Union[dict, None]:
+    index_file_path = shard_folder_path + SHARD_INDEX_FILE_NAME
+    if not os.path.exists(index_file_path):
+        print("[ERROR][shard::loadShardIndex]")
+        print("\t index file not exist!")
+        print("\t index_file_path:", index_file_path)
+        return None
+
+    index_dict = {}
+    with np.load(index_file_path) as index_data:
+        for key in index_data.files:
+            index_dict[key] = index_data[key]
+    return index_dict
@@ -0,0 +1,26 @@
+import pickle
+import hashlib
+
+from ma_sh.Method.transformer import getTransformer
+
+from mash_diffusion.Module.moment_transformer import MomentTransformer
+
+
+def toTransformerHash(transformer) -> str:
+    try:
+        transformer_bytes = pickle.dumps(transformer)
+    except Exception:
+        return ""
+
+    return hashlib.md5(transformer_bytes).hexdigest()
+
+
+# transformer_id: a ma_sh transformer id, or the npz file of a fitted MomentTransformer
+def getMashTransformer(transformer_id: str):
+    if transformer_id.endswith(".npz"):
+        transformer = MomentTransformer()
+        if not transformer.loadTransformer(transformer_id):
+            return None
+        return transformer
+
+    return getTransformer(transformer_id)
@@ -0,0 +1,93 @@
+import os
+import hashlib
+import numpy as np
+from typing import Union
+
+
+def toPathsHash(mash_file_path_list: list, view_file_paths_list: Union[list, None] = None) -> str:
+    md5 = hashlib.md5()
+    for i, mash_file_path in enumerate(mash_file_path_list):
+        md5.update(mash_file_path.encode())
+        if view_file_paths_list is not None:
+            for view_file_path in view_file_paths_list[i]:
+                md5.update(b"|" + view_file_path.encode())
+        md5.update(b"\n")
+    return md5.hexdigest()
+
+
+def loadValidity(validity_file_path: str) -> Union[dict, None]:
+    if not os.path.exists(validity_file_path):
+        print("[ERROR][validity::loadValidity]")
+        print("\t validity file not exist!")
+        print("\t validity_file_path:", validity_file_path)
+        return None
+
+    with np.load(validity_file_path) as validity_data:
+        validity = {
+            "paths_hash": str(validity_data["paths_hash"]),
+            "object_valid": np.unpackbits(validity_data["object_valid_bits"])[
+                : int(validity_data["object_num"])
+            ].astype(bool),
+            "view_valid": np.unpackbits(validity_data["view_valid_bits"])[
+                : int(validity_data["view_num"])
+            ].astype(bool),
+            "bad_file_path_set": set(validity_data["bad_file_paths"].tolist()),
+        }
+    return validity
+
+
+def filterMashPathsList(paths_list: list, validity: dict) -> list:
+    mash_file_path_list = [paths[0] for paths in paths_list]
+
+    if validity["paths_hash"] == toPathsHash(mash_file_path_list):
+        object_valid = validity["object_valid"]
+        return [paths for i, paths in enumerate(paths_list) if object_valid[i]]
+
+    bad_file_path_set = validity["bad_file_path_set"]
+    return [paths for paths in paths_list if paths[0] not in bad_file_path_set]
+
+
+def filterEmbeddingPathsList(paths_list: list, validity: dict) -> list:
+    mash_file_path_list = [paths[0] for paths in paths_list]
+    embedding_file_paths_list = [paths[1] for paths in paths_list]
+
+    valid_paths_list = []
+
+    if validity["paths_hash"] == toPathsHash(mash_file_path_list, embedding_file_paths_list):
+        object_valid = validity["object_valid"]
+        view_valid = validity["view_valid"]
+
+        view_start = 0
+        for i, (mash_file_path, embedding_file_path_list) in enumerate(paths_list):
+            view_num = len(embedding_file_path_list)
+            curr_view_valid = view_valid[view_start : view_start + view_num]
+            view_start += view_num
+
+            if not object_valid[i]:
+                continue
+
+            valid_embedding_file_path_list = [
+                embedding_file_path
+                for embedding_file_path, is_valid in zip(embedding_file_path_list, curr_view_valid)
+                if is_valid
+            ]
+            valid_paths_list.append([mash_file_path, valid_embedding_file_path_list])
+
+        return valid_paths_list
+
+    bad_file_path_set = validity["bad_file_path_set"]
+    for mash_file_path, embedding_file_path_list in paths_list:
+        if mash_file_path in bad_file_path_set:
+            continue
+
+        valid_embedding_file_path_list = [
+            embedding_file_path
+            for embedding_file_path in embedding_file_path_list
+            if embedding_file_path not in bad_file_path_set
+        ]
+        if len(valid_embedding_file_path_list) == 0:
+            continue
+
+        valid_paths_list.append([mash_file_path, valid_embedding_file_path_list])
+
+    return valid_paths_list
@@ -17,10 +17,15 @@ class BasicTransformerBlock(nn.Module):
         context_dim=None,
         gated_ff=True,
         checkpoint=True,
+        attn_backend="einsum",
     ):
         super().__init__()
         self.attn1 = CrossAttention(
-            query_dim=dim, heads=n_heads, dim_head=d_head, dropout=dropout
+            query_dim=dim,
+            heads=n_heads,
+            dim_head=d_head,
+            dropout=dropout,
+            attn_backend=attn_backend,
         )  # is a self-attention
         self.ff = FeedForward(dim, dropout=dropout, glu=gated_ff)
         self.attn2 = CrossAttention(
@@ -29,6 +34,7 @@ class BasicTransformerBlock(nn.Module):
             heads=n_heads,
             dim_head=d_head,
             dropout=dropout,
+            attn_backend=attn_backend,
         )  # is self-attn if context is none
         self.norm1 = AdaLayerNorm(dim)
         self.norm2 = AdaLayerNorm(dim)
@@ -53,8 +59,16 @@ class BasicTransformerBlock(nn.Module):
         )
         self.drop_path3 = DropPath(drop_path) if drop_path > 0.0 else nn.Identity()
 
-    def forward(self, x, t, context=None):
+    def prefillContext(self, context):
+        return self.attn2.prefillContext(context)
+
+    def clearContextCache(self):
+        return self.attn2.clearContextCache()
+
+    def forward(self, x, t, context=None, context_mask=None):
         x = self.drop_path1(self.ls1(self.attn1(self.norm1(x, t)))) + x
-        x = self.drop_path2(self.ls2(self.attn2(self.norm2(x, t), context=context))) + x
+        x = self.drop_path2(
+            self.ls2(self.attn2(self.norm2(x, t), context=context, mask=context_mask))
+        ) + x
         x = self.drop_path3(self.ls3(self.ff(self.norm3(x, t)))) + x
         return x
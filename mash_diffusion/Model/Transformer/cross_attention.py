@@ -1,11 +1,35 @@
 import torch
 import torch.nn as nn
+import torch.nn.functional as F
 from einops import rearrange, repeat
 
 
+# scaled_dot_product_attention takes the scale argument since torch 2.1
+def isSDPAScaleSupported() -> bool:
+    version = torch.__version__.split("+")[0].split(".")
+    return (int(version[0]), int(version[1])) >= (2, 1)
+
+
+# both attn backends share the parameters, so checkpoints load with either
 class CrossAttention(nn.Module):
-    def __init__(self, query_dim, context_dim=None, heads=8, dim_head=64, dropout=0.0):
+    def __init__(
+        self,
+        query_dim,
+        context_dim=None,
+        heads=8,
+        dim_head=64,
+        dropout=0.0,
+        attn_backend="einsum",
+    ):
         super().__init__()
+        assert attn_backend in ["einsum", "sdpa"]
+
+        if attn_backend == "sdpa" and not isSDPAScaleSupported():
+            print("[ERROR][CrossAttention::__init__]")
+            print("\t sdpa backend needs torch>=2.1, use einsum instead!")
+            print("\t torch version:", torch.__version__)
+            attn_backend = "einsum"
+
         inner_dim = dim_head * heads
 
         if context_dim is None:
@@ -13,6 +37,7 @@ class CrossAttention(nn.Module):
 
         self.scale = dim_head**-0.5
         self.heads = heads
+        self.attn_backend = attn_backend
 
         self.to_q = nn.Linear(query_dim, inner_dim, bias=False)
         self.to_k = nn.Linear(context_dim, inner_dim, bias=False)
@@ -21,18 +46,78 @@ class CrossAttention(nn.Module):
         self.to_out = nn.Sequential(
             nn.Linear(inner_dim, query_dim), nn.Dropout(dropout)
         )
+
+        self.cached_context = None
+        self.cached_kv = None
+        self.cache_hit_num = 0
+        self.cache_miss_num = 0
         return
 
+    def prefillContext(self, context):
+        self.cached_context = context
+        self.cached_kv = (self.to_k(context), self.to_v(context))
+
+        self.cache_hit_num = 0
+        self.cache_miss_num = 0
+        return True
+
+    def clearContextCache(self):
+        self.cached_context = None
+        self.cached_kv = None
+        return True
+
+    def toKV(self, context):
+        if self.cached_context is not None:
+            if context is self.cached_context:
+                self.cache_hit_num += 1
+                return self.cached_kv
+
+            self.cache_miss_num += 1
+
+        return self.to_k(context), self.to_v(context)
+
     def forward(self, x, context=None, mask=None):
-        h = self.heads
+        # K query rows share one context row, e.g. the draws of one condition.
+        # attention is per query, so they are folded into one longer sequence
+        draw_num = 1
+        if context is not None and context.shape[0] != x.shape[0]:
+            draw_num = x.shape[0] // context.shape[0]
+            x = rearrange(x, "(b k) n c -> b (k n) c", k=draw_num)
 
         q = self.to_q(x)
 
         if context is None:
             context = x
 
-        k = self.to_k(context)
-        v = self.to_v(context)
+        k, v = self.toKV(context)
+
+        if self.attn_backend == "sdpa":
+            out = self.attendSDPA(q, k, v, mask)
+        else:
+            out = self.attendEinsum(q, k, v, mask)
+
+        if draw_num > 1:
+            out = rearrange(out, "b (k n) c -> (b k) n c", k=draw_num)
+
+        out = self.to_out(out)
+
+        return out
+
+    def attendSDPA(self, q, k, v, mask=None):
+        h = self.heads
+
+        q, k, v = map(lambda t: rearrange(t, "b n (h d) -> b h n d", h=h), (q, k, v))
+
+        if mask is not None:
+            # True for the keys to attend to
+            mask = rearrange(mask, "b ... -> b () () (...)")
+
+        out = F.scaled_dot_product_attention(q, k, v, attn_mask=mask, scale=self.scale)
+
+        return rearrange(out, "b h n d -> b n (h d)")
+
+    def attendEinsum(self, q, k, v, mask=None):
+        h = self.heads
 
         q, k, v = map(lambda t: rearrange(t, "b n (h d) -> (b h) n d", h=h), (q, k, v))
 
@@ -50,6 +135,4 @@ class CrossAttention(nn.Module):
         out = torch.einsum("b i j, b j d -> b i d", attn, v)
         out = rearrange(out, "(b h) n d -> b n (h d)", h=h)
 
-        out = self.to_out(out)
-
         return out
@@ -34,6 +34,7 @@ class LatentArrayTransformer(nn.Module):
         dropout=0.0,
         context_dim=None,
         out_channels=None,
+        attn_backend="einsum",
     ):
         super().__init__()
         self.in_channels = in_channels
@@ -46,7 +47,12 @@ class LatentArrayTransformer(nn.Module):
         self.transformer_blocks = nn.ModuleList(
             [
                 BasicTransformerBlock(
-                    inner_dim, n_heads, d_head, dropout=dropout, context_dim=context_dim
+                    inner_dim,
+                    n_heads,
+                    d_head,
+                    dropout=dropout,
+                    context_dim=context_dim,
+                    attn_backend=attn_backend,
                 )
                 for _ in range(depth)
             ]
@@ -70,7 +76,27 @@ class LatentArrayTransformer(nn.Module):
         # self.pos_emb = nn.Embedding(512, inner_dim)
         # ###
 
-    def forward(self, x, t, cond=None):
+    def prefillContext(self, cond):
+        for block in self.transformer_blocks:
+            block.prefillContext(cond)
+        return True
+
+    def clearContextCache(self):
+        for block in self.transformer_blocks:
+            block.clearContextCache()
+        return True
+
+    def toContextCacheStats(self) -> dict:
+        hit_num = sum([block.attn2.cache_hit_num for block in self.transformer_blocks])
+        miss_num = sum([block.attn2.cache_miss_num for block in self.transformer_blocks])
+
+        return {
+            "hit_num": hit_num,
+            "miss_num": miss_num,
+            "hit_rate": hit_num / max(hit_num + miss_num, 1),
+        }
+
+    def forward(self, x, t, cond=None, cond_mask=None):
         t_emb = self.map_noise(t)[:, None]
         t_emb = F.silu(self.map_layer0(t_emb))
         t_emb = F.silu(self.map_layer1(t_emb))
@@ -82,7 +108,7 @@ class LatentArrayTransformer(nn.Module):
         # ###
 
         for block in self.transformer_blocks:
-            x = block(x, t_emb, context=cond)
+            x = block(x, t_emb, context=cond, context_mask=cond_mask)
 
         x = self.norm(x)
 
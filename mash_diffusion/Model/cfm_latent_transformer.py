@@ -1,5 +1,6 @@
 import torch
 import torch.nn as nn
+from typing import Union
 
 from mash_diffusion.Model.Transformer.latent_array import LatentArrayTransformer
 
@@ -14,6 +15,7 @@ class CFMLatentTransformer(torch.nn.Module):
         n_heads=8,
         d_head=64,
         depth=24,
+        attn_backend="einsum",
     ):
         super().__init__()
         self.n_latents = n_latents
@@ -32,19 +34,58 @@ class CFMLatentTransformer(torch.nn.Module):
             d_head=d_head,
             depth=depth,
             context_dim=context_dim,
+            attn_backend=attn_backend,
         )
 
         self.final_linear = True
 
         if self.final_linear:
             self.to_outputs = nn.Linear(self.channels, self.channels)
+
+        self.prefilled_condition = None
+        self.prefilled_context = None
         return
 
     def emb_category(self, class_labels):
         return self.category_emb(class_labels).unsqueeze(1)
 
-    def forwardCondition(self, xt: torch.Tensor, condition: torch.Tensor, t: torch.Tensor) -> dict:
-        vt = self.model(xt, t, cond=condition)
+    def toContext(self, condition: torch.Tensor) -> torch.Tensor:
+        if self.prefilled_condition is not None and condition is self.prefilled_condition:
+            return self.prefilled_context
+
+        if torch.is_floating_point(condition):
+            return condition + 0.0 * self.emb_category(torch.zeros([condition.shape[0]], dtype=torch.long, device=condition.device)).to(condition.dtype)
+
+        return self.emb_category(condition)
+
+    # the cross attention K/V of a condition kept for a whole sampling call
+    def prefillCondition(self, condition: torch.Tensor) -> bool:
+        self.clearConditionCache()
+
+        self.prefilled_context = self.toContext(condition)
+        self.prefilled_condition = condition
+
+        self.model.prefillContext(self.prefilled_context)
+        return True
+
+    def clearConditionCache(self) -> bool:
+        self.prefilled_condition = None
+        self.prefilled_context = None
+
+        self.model.clearContextCache()
+        return True
+
+    def toConditionCacheStats(self) -> dict:
+        return self.model.toContextCacheStats()
+
+    def forwardCondition(
+        self,
+        xt: torch.Tensor,
+        condition: torch.Tensor,
+        t: torch.Tensor,
+        condition_mask: Union[torch.Tensor, None] = None,
+    ) -> dict:
+        vt = self.model(xt, t, cond=condition, cond_mask=condition_mask)
 
         if self.final_linear:
             vt = self.to_outputs(vt)
@@ -55,16 +96,19 @@ class CFMLatentTransformer(torch.nn.Module):
 
         return result_dict
 
-    def forwardData(self, xt: torch.Tensor, condition: torch.Tensor, t: torch.Tensor) -> torch.Tensor:
-        if condition.dtype == torch.float32:
-            condition = condition + 0.0 * self.emb_category(torch.zeros([xt.shape[0]], dtype=torch.long, device=xt.device))
-        else:
-            condition = self.emb_category(condition)
+    def forwardData(
+        self,
+        xt: torch.Tensor,
+        condition: torch.Tensor,
+        t: torch.Tensor,
+        condition_mask: Union[torch.Tensor, None] = None,
+    ) -> torch.Tensor:
+        condition = self.toContext(condition)
 
         if len(t.shape) == 0:
             t = t.unsqueeze(0)
 
-        result_dict = self.forwardCondition(xt, condition, t)
+        result_dict = self.forwardCondition(xt, condition, t, condition_mask)
 
         vt = result_dict['vt']
 
@@ -75,9 +119,11 @@ class CFMLatentTransformer(torch.nn.Module):
         t = data_dict['t']
         condition = data_dict['condition']
         drop_prob = data_dict['drop_prob']
+        condition_mask = data_dict.get('condition_mask')
 
-        if condition.dtype == torch.float32:
-            condition = condition + 0.0 * self.emb_category(torch.zeros([xt.shape[0]], dtype=torch.long, device=xt.device))
+        if torch.is_floating_point(condition):
+            # kept in the condition dtype, so a float16/bfloat16 condition is not upcast here
+            condition = condition + 0.0 * self.emb_category(torch.zeros([condition.shape[0]], dtype=torch.long, device=xt.device)).to(condition.dtype)
         else:
             condition = self.emb_category(condition)
 
@@ -88,7 +134,7 @@ class CFMLatentTransformer(torch.nn.Module):
             drop_mask = torch.rand_like(condition) <= drop_prob
             condition[drop_mask] = 0
 
-        result_dict = self.forwardCondition(xt, condition, t)
+        result_dict = self.forwardCondition(xt, condition, t, condition_mask)
 
         return result_dict
 
@@ -99,10 +145,7 @@ class CFMLatentTransformer(torch.nn.Module):
         t: torch.Tensor,
         fixed_anchor_mask: torch.Tensor,
     ):
-        if condition.dtype == torch.float32:
-            condition = condition + 0.0 * self.emb_category(torch.zeros([xt.shape[0]], dtype=torch.long, device=xt.device))
-        else:
-            condition = self.emb_category(condition)
+        condition = self.toContext(condition)
 
         if len(t.shape) == 0:
             t = t.unsqueeze(0)
@@ -1,5 +1,6 @@
 import torch
 from torch import nn
+from typing import Union
 
 from mash_diffusion.Model.Transformer.latent_array import LatentArrayTransformer
 
@@ -16,6 +17,7 @@ class EDMLatentTransformer(nn.Module):
         sigma_min=0,
         sigma_max=float("inf"),
         sigma_data=1,
+        attn_backend="einsum",
     ):
         super().__init__()
         self.n_latents = n_latents
@@ -33,13 +35,46 @@ class EDMLatentTransformer(nn.Module):
             d_head=d_head,
             depth=depth,
             context_dim=context_dim,
+            attn_backend=attn_backend,
         )
+
+        self.prefilled_condition = None
+        self.prefilled_context = None
         return
 
     def emb_category(self, class_labels):
         return self.category_emb(class_labels).unsqueeze(1)
 
-    def forwardCondition(self, x, sigma, condition):
+    def toContext(self, condition: torch.Tensor) -> torch.Tensor:
+        if self.prefilled_condition is not None and condition is self.prefilled_condition:
+            return self.prefilled_context
+
+        if torch.is_floating_point(condition):
+            return condition + 0.0 * self.emb_category(torch.zeros([condition.shape[0]], dtype=torch.long, device=condition.device)).to(condition.dtype)
+
+        return self.emb_category(condition)
+
+    # the cross attention K/V of a condition kept for a whole sampling call
+    def prefillCondition(self, condition: torch.Tensor) -> bool:
+        self.clearConditionCache()
+
+        self.prefilled_context = self.toContext(condition)
+        self.prefilled_condition = condition
+
+        self.model.prefillContext(self.prefilled_context)
+        return True
+
+    def clearConditionCache(self) -> bool:
+        self.prefilled_condition = None
+        self.prefilled_context = None
+
+        self.model.clearContextCache()
+        return True
+
+    def toConditionCacheStats(self) -> dict:
+        return self.model.toContextCacheStats()
+
+    def forwardCondition(self, x, sigma, condition, condition_mask=None):
         x = x.to(torch.float32)
         sigma = sigma.to(torch.float32).reshape(-1, 1, 1)
         dtype = torch.float32
@@ -49,7 +84,9 @@ class EDMLatentTransformer(nn.Module):
         c_in = 1 / (self.sigma_data**2 + sigma**2).sqrt()
         c_noise = sigma.log() / 4
 
-        F_x = self.model((c_in * x).to(dtype), c_noise.flatten(), cond=condition)
+        F_x = self.model(
+            (c_in * x).to(dtype), c_noise.flatten(), cond=condition, cond_mask=condition_mask
+        )
         assert F_x.dtype == dtype
 
         D_x = c_skip * x + c_out * F_x.to(torch.float32)
@@ -60,13 +97,16 @@ class EDMLatentTransformer(nn.Module):
 
         return result_dict
 
-    def forwardData(self, x: torch.Tensor, sigma: torch.Tensor, condition: torch.Tensor) -> torch.Tensor:
-        if condition.dtype == torch.float32:
-            condition = condition + 0.0 * self.emb_category(torch.zeros([x.shape[0]], dtype=torch.long, device=x.device))
-        else:
-            condition = self.emb_category(condition)
+    def forwardData(
+        self,
+        x: torch.Tensor,
+        sigma: torch.Tensor,
+        condition: torch.Tensor,
+        condition_mask: Union[torch.Tensor, None] = None,
+    ) -> torch.Tensor:
+        condition = self.toContext(condition)
 
-        result_dict = self.forwardCondition(x, sigma, condition)
+        result_dict = self.forwardCondition(x, sigma, condition, condition_mask)
 
         return result_dict['D_x']
 
@@ -76,9 +116,11 @@ class EDMLatentTransformer(nn.Module):
         condition = data_dict['condition']
         drop_prob = data_dict['drop_prob']
         fixed_prob = data_dict['fixed_prob']
+        condition_mask = data_dict.get('condition_mask')
 
-        if condition.dtype == torch.float32:
-            condition = condition + 0.0 * self.emb_category(torch.zeros([x.shape[0]], dtype=torch.long, device=x.device))
+        if torch.is_floating_point(condition):
+            # kept in the condition dtype, so a float16/bfloat16 condition is not upcast here
+            condition = condition + 0.0 * self.emb_category(torch.zeros([condition.shape[0]], dtype=torch.long, device=x.device)).to(condition.dtype)
         else:
             condition = self.emb_category(condition)
 
@@ -93,4 +135,4 @@ class EDMLatentTransformer(nn.Module):
 
             x[fixed_mask] = mash_params[fixed_mask]
 
-        return self.forwardCondition(x, sigma, condition)
+        return self.forwardCondition(x, sigma, condition, condition_mask)
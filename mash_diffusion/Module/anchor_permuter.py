@@ -0,0 +1,60 @@
+import torch
+
+from mash_diffusion.Method.permute import toBatchPermuteIdxs, permuteBatchAnchors
+from mash_diffusion.Method.distributed import getDistributedInfo
+
+
+# train: one generator per process and rank, eval: the same fixed seed for every batch
+class AnchorPermuter(object):
+    def __init__(self, split: str = "train", seed: int = 1234) -> None:
+        self.split = split
+        self.seed = seed
+
+        self.generator_dict = {}
+        return
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["generator_dict"] = {}
+        return state
+
+    def getGenerator(self, device: torch.device) -> torch.Generator:
+        device = torch.device(device)
+
+        if self.split != "train":
+            return torch.Generator(device).manual_seed(self.seed)
+
+        if device not in self.generator_dict.keys():
+            # the ranks may share torch.initial_seed, each needs its own stream
+            rank, world_size = getDistributedInfo()
+            self.generator_dict[device] = torch.Generator(device).manual_seed(
+                (torch.initial_seed() * world_size + rank) % (1 << 63)
+            )
+
+        return self.generator_dict[device]
+
+    def permute(self, mash_params: torch.Tensor) -> torch.Tensor:
+        if mash_params.ndim == 2:
+            return self.permute(mash_params.unsqueeze(0))[0]
+
+        generator = self.getGenerator(mash_params.device)
+
+        permute_idxs = toBatchPermuteIdxs(
+            mash_params.shape[0], mash_params.shape[1], generator, mash_params.device
+        )
+
+        return permuteBatchAnchors(mash_params, permute_idxs)
+
+    # the same permutation for all tensors, e.g. the ends of flow pairs
+    def permuteList(self, mash_params_list: list) -> list:
+        mash_params = mash_params_list[0]
+
+        generator = self.getGenerator(mash_params.device)
+
+        permute_idxs = toBatchPermuteIdxs(
+            mash_params.shape[0], mash_params.shape[1], generator, mash_params.device
+        )
+
+        return [
+            permuteBatchAnchors(mash_params, permute_idxs) for mash_params in mash_params_list
+        ]
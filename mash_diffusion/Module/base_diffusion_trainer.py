@@ -4,6 +4,7 @@ from torch import nn
 from tqdm import trange
 from typing import Union
 from abc import abstractmethod
+from torch.utils.data import DataLoader, IterableDataset
 
 from ma_sh.Model.mash import Mash
 
@@ -12,6 +13,18 @@ from base_trainer.Module.base_trainer import BaseTrainer
 from mash_diffusion.Dataset.mash import MashDataset
 from mash_diffusion.Dataset.embedding import EmbeddingDataset
 from mash_diffusion.Dataset.single_shape import SingleShapeDataset
+from mash_diffusion.Dataset.sharded_mash import ShardedMashDataset
+from mash_diffusion.Dataset.sharded_embedding import ShardedEmbeddingDataset
+from mash_diffusion.Dataset.streaming_shard import StreamingShardDataset
+from mash_diffusion.Dataset.resident_mash import ResidentMashDataset
+from mash_diffusion.Method.dataloader import (
+    toMapStyleDataset,
+    createStreamingDataLoader,
+    createResidentDataLoader,
+)
+from mash_diffusion.Module.anchor_permuter import AnchorPermuter
+from mash_diffusion.Module.condition_pca import ConditionPCA
+from mash_diffusion.Module.local_disk_cache import LocalDiskCache
 
 
 class BaseDiffusionTrainer(BaseTrainer):
@@ -39,10 +52,46 @@ class BaseDiffusionTrainer(BaseTrainer):
         sample_results_freq: int = -1,
         use_amp: bool = False,
         quick_test: bool = False,
+        dataset_shard_folder_path_dict: dict = {},
+        normalized_cache_folder_path_dict: dict = {},
+        dataset_validity_file_path_dict: dict = {},
+        batch_permute_anchors: bool = False,
+        embedding_dtype: str = "float32",
+        upcast_condition: bool = True,
+        streaming_shuffle_buffer_size: int = 0,
+        local_cache_folder_path: Union[str, None] = None,
+        local_cache_size_gb: float = 100.0,
+        resident_dataset: bool = False,
+        shared_memory_cache_size_mb: float = 0.0,
+        condition_view_num: int = 1,
+        embedding_folder_name: str = "Objaverse_82K/render_dino",
+        condition_pca_file_path: Union[str, None] = None,
+        condition_token_num: int = 0,
+        transformer_id_dict: dict = {},
+        draws_per_sample: int = 1,
+        attn_backend: str = "einsum",
     ) -> None:
         self.dataset_root_folder_path = dataset_root_folder_path
         self.dataset_json_file_path_dict = dataset_json_file_path_dict
         self.training_mode = training_mode
+        self.dataset_shard_folder_path_dict = dataset_shard_folder_path_dict
+        self.normalized_cache_folder_path_dict = normalized_cache_folder_path_dict
+        self.dataset_validity_file_path_dict = dataset_validity_file_path_dict
+        self.batch_permute_anchors = batch_permute_anchors
+        self.embedding_dtype = embedding_dtype
+        self.upcast_condition = upcast_condition
+        self.streaming_shuffle_buffer_size = streaming_shuffle_buffer_size
+        self.local_cache_folder_path = local_cache_folder_path
+        self.local_cache_size_gb = local_cache_size_gb
+        self.resident_dataset = resident_dataset
+        self.shared_memory_cache_size_mb = shared_memory_cache_size_mb
+        self.condition_view_num = condition_view_num
+        self.embedding_folder_name = embedding_folder_name
+        self.condition_pca_file_path = condition_pca_file_path
+        self.condition_token_num = condition_token_num
+        self.transformer_id_dict = transformer_id_dict
+        self.draws_per_sample = draws_per_sample
+        self.attn_backend = attn_backend
 
         self.anchor_num = 400
         self.mask_degree = 3
@@ -51,8 +100,38 @@ class BaseDiffusionTrainer(BaseTrainer):
             9 + (2 * self.mask_degree + 1) + ((self.sh_degree + 1) ** 2)
         )
 
+        self.anchor_permuter_dict = {
+            "train": AnchorPermuter("train"),
+            "eval": AnchorPermuter("eval"),
+        }
+
+        self.local_disk_cache = None
+        if self.local_cache_folder_path is not None:
+            self.local_disk_cache = LocalDiskCache(
+                self.dataset_root_folder_path,
+                self.local_cache_folder_path,
+                self.local_cache_size_gb,
+            )
+
+        # raw conditions are projected on the fly, reduced ones are used as they are
+        self.condition_pca = None
+        if self.condition_pca_file_path is not None and self.training_mode in ['dino']:
+            self.condition_pca = ConditionPCA()
+            assert self.condition_pca.loadProjection(self.condition_pca_file_path)
+
+            self.context_dim = self.condition_pca.reduced_dim
+
         self.gt_sample_added_to_logger = False
 
+        # the streaming train dataset gets its own loader after super().__init__
+        self.streaming_dataset = None
+        # the next shard order of the streaming train dataset
+        self.streaming_epoch = 0
+
+        # resident datasets index tensors on the training device in the main process
+        if self.resident_dataset and self.training_mode in ['single_shape', 'category']:
+            num_workers = 0
+
         super().__init__(
             batch_size,
             accum_iter,
@@ -74,60 +153,189 @@ class BaseDiffusionTrainer(BaseTrainer):
             use_amp,
             quick_test,
         )
+
+        if self.streaming_dataset is not None:
+            self.setDataLoader(
+                self.training_mode,
+                self.streaming_dataset,
+                createStreamingDataLoader(self.streaming_dataset, batch_size, num_workers),
+                self.streaming_dataset,
+            )
+
+        if self.resident_dataset and self.training_mode in ['single_shape', 'category']:
+            for name, split in [[self.training_mode, "train"], ["eval", "eval"]]:
+                dataset = self.dataloader_dict[name]["dataset"]
+                if not isinstance(dataset, ResidentMashDataset):
+                    continue
+
+                self.setDataLoader(
+                    name, dataset, *createResidentDataLoader(dataset, batch_size, split)
+                )
         return
 
+    def setDataLoader(self, name: str, dataset, dataloader: DataLoader, sampler) -> bool:
+        dataloader_info = self.dataloader_dict[name]
+        dataloader_info["dataset"] = dataset
+
+        dataloader_key_list = [
+            key for key, value in dataloader_info.items() if isinstance(value, DataLoader)
+        ]
+        if len(dataloader_key_list) == 0:
+            dataloader_key_list = ["dataloader"]
+
+        for key in dataloader_key_list:
+            dataloader_info[key] = dataloader
+
+        # set_epoch is forwarded to whatever reorders the samples of this loader
+        if "sampler" in dataloader_info.keys():
+            dataloader_info["sampler"] = sampler
+        return True
+
+    def createMashDataset(self, split: str):
+        shard_folder_path = self.dataset_shard_folder_path_dict.get("category")
+        if shard_folder_path is not None:
+            if split == "train" and self.streaming_shuffle_buffer_size > 0:
+                return StreamingShardDataset(
+                    shard_folder_path,
+                    split,
+                    self.streaming_shuffle_buffer_size,
+                    permute_anchors=not self.batch_permute_anchors,
+                    transformer_id=self.transformer_id_dict.get("category"),
+                )
+
+            return ShardedMashDataset(
+                shard_folder_path,
+                split,
+                not self.batch_permute_anchors,
+                self.transformer_id_dict.get("category"),
+            )
+
+        return MashDataset(
+            self.dataset_root_folder_path,
+            split,
+            normalized_cache_folder_path=self.normalized_cache_folder_path_dict.get("category"),
+            validity_file_path=self.dataset_validity_file_path_dict.get("category"),
+            permute_anchors=not self.batch_permute_anchors,
+            local_disk_cache=self.local_disk_cache,
+            shared_memory_cache_size_mb=self.shared_memory_cache_size_mb,
+            transformer_id=self.transformer_id_dict.get("category"),
+        )
+
+    def createEmbeddingDataset(self, split: str):
+        view_num = self.condition_view_num if split == "train" else 1
+
+        shard_folder_path = self.dataset_shard_folder_path_dict.get("dino")
+        if shard_folder_path is not None:
+            if split == "train" and self.streaming_shuffle_buffer_size > 0:
+                return StreamingShardDataset(
+                    shard_folder_path,
+                    split,
+                    self.streaming_shuffle_buffer_size,
+                    permute_anchors=not self.batch_permute_anchors,
+                    embedding_dtype=self.embedding_dtype,
+                    view_num=view_num,
+                    condition_token_num=self.condition_token_num,
+                    transformer_id=self.transformer_id_dict.get("dino"),
+                )
+
+            return ShardedEmbeddingDataset(
+                shard_folder_path,
+                split,
+                not self.batch_permute_anchors,
+                self.embedding_dtype,
+                view_num,
+                self.condition_token_num,
+                self.transformer_id_dict.get("dino"),
+            )
+
+        return EmbeddingDataset(
+            self.dataset_root_folder_path,
+            self.embedding_folder_name,
+            "dino",
+            split,
+            self.dataset_json_file_path_dict.get("dino"),
+            normalized_cache_folder_path=self.normalized_cache_folder_path_dict.get("dino"),
+            validity_file_path=self.dataset_validity_file_path_dict.get("dino"),
+            permute_anchors=not self.batch_permute_anchors,
+            embedding_dtype=self.embedding_dtype,
+            local_disk_cache=self.local_disk_cache,
+            shared_memory_cache_size_mb=self.shared_memory_cache_size_mb,
+            view_num=view_num,
+            condition_token_num=self.condition_token_num,
+            transformer_id=self.transformer_id_dict.get("dino"),
+        )
+
     def createDatasets(self) -> bool:
         if self.training_mode == 'single_shape':
             mash_file_path = self.dataset_root_folder_path + \
                 "MashV4/ShapeNet/03636649/583a5a163e59e16da523f74182db8f2.npy"
             self.dataloader_dict["single_shape"] = {
-                "dataset": SingleShapeDataset(mash_file_path),
+                "dataset": SingleShapeDataset(
+                    mash_file_path, not self.batch_permute_anchors
+                ),
                 "repeat_num": 1,
             }
 
         elif self.training_mode == 'category':
             self.dataloader_dict['category'] = {
-                "dataset": MashDataset(self.dataset_root_folder_path, "train"),
+                "dataset": self.createMashDataset("train"),
                 "repeat_num": 1,
             }
 
         elif self.training_mode == 'dino':
             self.dataloader_dict["dino"] = {
-                "dataset": EmbeddingDataset(
-                    self.dataset_root_folder_path,
-                    "Objaverse_82K/render_dino",
-                    "dino",
-                    "train",
-                    self.dataset_json_file_path_dict.get("dino"),
-                ),
+                "dataset": self.createEmbeddingDataset("train"),
                 "repeat_num": 1,
             }
 
         if self.training_mode in ['single_shape', 'category']:
             self.dataloader_dict["eval"] = {
-                "dataset": MashDataset(
-                    self.dataset_root_folder_path,
-                    "eval",
-                ),
+                "dataset": self.createMashDataset("eval"),
             }
 
         elif self.training_mode in ['dino']:
             self.dataloader_dict["eval"] = {
-                "dataset": EmbeddingDataset(
-                    self.dataset_root_folder_path,
-                    "Objaverse_82K/render_dino",
-                    "dino",
-                    "eval",
-                    self.dataset_json_file_path_dict.get("dino"),
-                ),
+                "dataset": self.createEmbeddingDataset("eval"),
             }
 
         self.dataloader_dict["eval"]["dataset"].paths_list = self.dataloader_dict[
             "eval"
         ]["dataset"].paths_list[:64]
 
+        if self.resident_dataset and self.training_mode in ['single_shape', 'category']:
+            for name, split in [[self.training_mode, "train"], ["eval", "eval"]]:
+                self.dataloader_dict[name]["dataset"] = self.toResidentDataset(
+                    self.dataloader_dict[name]["dataset"], split
+                )
+
+        self.dataloader_dict[self.training_mode]["dataset"] = self.toTrainDataset(
+            self.dataloader_dict[self.training_mode]["dataset"]
+        )
+
+        # BaseTrainer builds a sampled loader for every dataset, which fails for an
+        # iterable one, so a map-style view stands in until the streaming loader is set
+        train_dataset = self.dataloader_dict[self.training_mode]["dataset"]
+        if isinstance(train_dataset, IterableDataset):
+            self.streaming_dataset = train_dataset
+            self.dataloader_dict[self.training_mode]["dataset"] = toMapStyleDataset(
+                train_dataset
+            )
         return True
 
+    def toResidentDataset(self, dataset, split: str):
+        if isinstance(dataset, StreamingShardDataset):
+            return dataset
+
+        return ResidentMashDataset(
+            dataset, split, self.device, not self.batch_permute_anchors
+        )
+
+    def toTrainDataset(self, dataset):
+        '''
+        wrap the train dataset, e.g. to move per-sample work into the workers
+        '''
+        return dataset
+
     def getCondition(self, data_dict: dict) -> dict:
         if "category_id" in data_dict.keys():
             data_dict["condition"] = data_dict["category_id"]
@@ -139,7 +347,22 @@ class BaseDiffusionTrainer(BaseTrainer):
             elif embedding.ndim == 4:
                 embedding = torch.squeeze(embedding, dim=1)
 
-            data_dict["condition"] = embedding.to(self.device)
+            embedding = embedding.to(self.device, non_blocking=True)
+
+            if self.condition_pca is not None and embedding.shape[-1] == self.condition_pca.dim:
+                embedding = self.condition_pca.transform(embedding)
+
+            # embeddings may travel through the dataloader in float16/bfloat16
+            if self.upcast_condition:
+                embedding = embedding.float()
+
+            data_dict["condition"] = embedding
+
+            # [B, ..., T] -> [B, T], True for the valid tokens of padded conditions
+            if "condition_mask" in data_dict.keys():
+                condition_mask = data_dict["condition_mask"]
+                condition_mask = condition_mask.reshape(condition_mask.shape[0], -1)
+                data_dict["condition_mask"] = condition_mask.to(self.device, non_blocking=True)
         else:
             print("[ERROR][BaseDiffusionTrainer::toCondition]")
             print("\t valid condition type not found!")
@@ -156,7 +379,70 @@ class BaseDiffusionTrainer(BaseTrainer):
         '''
         pass
 
+    # [B, K, ...] -> [B * K, ...], each mash repeated for its K views
+    def expandConditionViews(self, data_dict: dict) -> dict:
+        embedding = data_dict["embedding"]
+        view_num = embedding.shape[1]
+
+        data_dict["embedding"] = embedding.reshape((-1,) + tuple(embedding.shape[2:]))
+        data_dict["mash_params"] = data_dict["mash_params"].repeat_interleave(view_num, dim=0)
+
+        # flow pairs built in the dataloader workers hold one draw per view
+        for key in ["xt", "ut", "t"]:
+            if key in data_dict.keys():
+                value = data_dict[key]
+                data_dict[key] = value.reshape((-1,) + tuple(value.shape[2:]))
+
+        if "condition_mask" in data_dict.keys():
+            condition_mask = data_dict["condition_mask"]
+            data_dict["condition_mask"] = condition_mask.reshape(
+                (-1,) + tuple(condition_mask.shape[2:])
+            )
+        return data_dict
+
+    # [B, ...] -> [B * K, ...] rows, the conditions stay [B, ...]
+    def expandDraws(self, data_dict: dict) -> dict:
+        mash_params = data_dict["mash_params"]
+        data_dict["mash_params"] = mash_params.repeat_interleave(self.draws_per_sample, dim=0)
+
+        # flow pairs built in the dataloader workers hold one draw per row
+        for key in ["xt", "ut", "t"]:
+            if key in data_dict.keys():
+                value = data_dict[key]
+                if value.shape[0] != data_dict["mash_params"].shape[0]:
+                    data_dict[key] = value.reshape((-1,) + tuple(value.shape[2:]))
+        return data_dict
+
+    def updateStreamingEpoch(self, epoch: int) -> bool:
+        if epoch < self.streaming_epoch:
+            return True
+
+        # non-persistent workers copy the dataset when the next epoch starts
+        self.streaming_epoch = epoch + 1
+        self.dataloader_dict[self.training_mode]["dataset"].set_epoch(self.streaming_epoch)
+        return True
+
     def preProcessData(self, data_dict: dict, is_training: bool = False) -> dict:
+        if is_training and "epoch" in data_dict.keys():
+            self.updateStreamingEpoch(int(data_dict["epoch"].reshape(-1)[0]))
+
+        if is_training and self.condition_view_num > 1 and "embedding" in data_dict.keys():
+            data_dict = self.expandConditionViews(data_dict)
+
+        if is_training and self.draws_per_sample > 1:
+            data_dict = self.expandDraws(data_dict)
+
+        if self.batch_permute_anchors:
+            anchor_permuter = self.anchor_permuter_dict["train" if is_training else "eval"]
+            if "xt" in data_dict.keys():
+                # keep the flow pairs built in the dataloader workers coupled
+                permuted_list = anchor_permuter.permuteList(
+                    [data_dict["mash_params"], data_dict["xt"], data_dict["ut"]]
+                )
+                data_dict["mash_params"], data_dict["xt"], data_dict["ut"] = permuted_list
+            else:
+                data_dict["mash_params"] = anchor_permuter.permute(data_dict["mash_params"])
+
         data_dict = self.getCondition(data_dict)
 
         if is_training:
@@ -188,10 +474,20 @@ class BaseDiffusionTrainer(BaseTrainer):
         model.eval()
 
         data_dict = dataset.__getitem__(0)
+
+        if self.condition_view_num > 1 and "embedding" in data_dict.keys():
+            data_dict["embedding"] = data_dict["embedding"][0]
+            if "condition_mask" in data_dict.keys():
+                data_dict["condition_mask"] = data_dict["condition_mask"][0]
+
         data_dict = self.getCondition(data_dict)
  
         condition = data_dict['condition']
 
+        # sample with the valid tokens only, the samplers take no mask
+        if "condition_mask" in data_dict.keys():
+            condition = condition[:, data_dict["condition_mask"].reshape(-1)]
+
         if isinstance(condition, int):
             condition = torch.ones([sample_num]).long().to(self.device) * condition
         else:
@@ -199,6 +495,11 @@ class BaseDiffusionTrainer(BaseTrainer):
                 *([sample_num] + [1] * (condition.ndim - 1))
             )
 
+        if self.local_disk_cache is not None:
+            cache_stats = self.local_disk_cache.toNodeStats()
+            self.logger.addScalar("Cache/hit_rate", cache_stats["hit_rate"], self.step)
+            self.logger.addScalar("Cache/fetch_gb", cache_stats["fetch_bytes"] / 1024**3, self.step)
+
         print("[INFO][BaseDiffusionTrainer::sampleModelStep]")
         print("\t start diffuse", sample_num, "mashs....")
 
@@ -1,14 +1,45 @@
 import torch
+from time import time
 from typing import Union
 from torchcfm.conditional_flow_matching import pad_t_like_x
 
 from mash_diffusion.Module.target_ot_plan_sampler import TargetOTPlanSampler
+from mash_diffusion.Module.ot_solver_pool import OTSolverPool
 
 
 class BatchExactOptimalTransportConditionalFlowMatcher(object):
-    def __init__(self, sigma: Union[float, int] = 0.0, target_dim: Union[list, None]=None):
+    def __init__(
+        self,
+        sigma: Union[float, int] = 0.0,
+        target_dim: Union[list, None] = None,
+        method: str = "exact",
+        worker_num: int = 1,
+        pool_type: str = "thread",
+        num_threads: Union[int, str] = 1,
+        reg: float = 0.05,
+        sinkhorn_iter_num: int = 100,
+        sinkhorn_tol: Union[float, None] = None,
+        round_assignment: bool = True,
+        projection_num: int = 16,
+        refine_iter_num: int = 0,
+    ):
         self.sigma = sigma
-        self.ot_sampler = TargetOTPlanSampler(method="exact", target_dim=target_dim)
+        self.method = method
+        self.ot_sampler = TargetOTPlanSampler(
+            method=method,
+            reg=reg,
+            num_threads=num_threads,
+            target_dim=target_dim,
+            sinkhorn_iter_num=sinkhorn_iter_num,
+            sinkhorn_tol=sinkhorn_tol,
+            round_assignment=round_assignment,
+            projection_num=projection_num,
+            refine_iter_num=refine_iter_num,
+        )
+        self.ot_solver_pool = OTSolverPool(worker_num, pool_type)
+
+        # seconds spent on the OT plans of the last batch
+        self.solve_time = 0.0
         return
 
     def compute_mu_t(self, x0, x1, t):
@@ -23,15 +54,52 @@ class BatchExactOptimalTransportConditionalFlowMatcher(object):
     def sample_noise_like(self, x):
         return torch.randn_like(x)
 
-    def sample_location_and_conditional_flow(self, x0, x1, t=None):
-        x0_list, x1_list = [], []
-        for i in range(x0.shape[0]):
-            curr_x0, curr_x1 = self.ot_sampler.sample_plan(x0[i], x1[i])
-            x0_list.append(curr_x0)
-            x1_list.append(curr_x1)
+    # True when the plans only reorder x1
+    def isSourceOrderKept(self) -> bool:
+        if self.method in ["assignment", "sliced"]:
+            return True
+
+        return self.method == "batch_sinkhorn" and self.ot_sampler.round_assignment
+
+    def sample_batch_plan(self, x0, x1):
+        start = time()
+
+        if self.method == "batch_sinkhorn":
+            batch_x0, batch_x1 = self.ot_sampler.sample_batch_sinkhorn_plan(x0, x1)
+
+            self.solve_time = time() - start
+            return batch_x0, batch_x1
+
+        if self.method == "sliced":
+            batch_x0, batch_x1 = self.ot_sampler.sample_batch_sliced_plan(x0, x1)
+
+            self.solve_time = time() - start
+            return batch_x0, batch_x1
+
+        if self.method == "assignment":
+            assignments = self.ot_sampler.get_batch_assignments(x0, x1, self.ot_solver_pool)
+            gather_idxs = assignments.unsqueeze(-1).expand(-1, -1, x1.shape[-1])
+
+            self.solve_time = time() - start
+            return x0, torch.gather(x1, 1, gather_idxs)
 
-        batch_x0 = torch.stack(x0_list, dim=0)
-        batch_x1 = torch.stack(x1_list, dim=0)
+        pi_list = self.ot_sampler.get_batch_maps(x0, x1, self.ot_solver_pool)
+
+        batch_x0_list = []
+        batch_x1_list = []
+        for i, pi in enumerate(pi_list):
+            i_idxs, j_idxs = self.ot_sampler.sample_map(pi, x0.shape[1], replace=True)
+            batch_x0_list.append(x0[i][i_idxs])
+            batch_x1_list.append(x1[i][j_idxs])
+
+        batch_x0 = torch.stack(batch_x0_list, dim=0)
+        batch_x1 = torch.stack(batch_x1_list, dim=0)
+
+        self.solve_time = time() - start
+        return batch_x0, batch_x1
+
+    def sample_location_and_conditional_flow(self, x0, x1, t=None):
+        batch_x0, batch_x1 = self.sample_batch_plan(x0, x1)
 
         if t is None:
             t = torch.rand(batch_x0.shape[0]).type_as(batch_x0)
@@ -45,20 +113,39 @@ class BatchExactOptimalTransportConditionalFlowMatcher(object):
     def guided_sample_location_and_conditional_flow(
         self, x0, x1, y0=None, y1=None, t=None
     ):
-        x0_list, x1_list, y0_list, y1_list = [], [], [], []
-        for i in range(x0.shape[0]):
-            curr_x0, curr_x1, curr_y0, curr_y1 = self.ot_sampler.sample_plan_with_labels(
-                x0[i],
-                x1[i],
-                y0[i] if y0 is not None else None,
-                y1[i] if y1 is not None else None)
-            x0_list.append(curr_x0)
-            x1_list.append(curr_x1)
-            y0_list.append(curr_y0)
-            y1_list.append(curr_y1)
-
-        batch_x0 = torch.stack(x0_list, dim=0)
-        batch_x1 = torch.stack(x1_list, dim=0)
+        start = time()
+
+        if self.method == "assignment":
+            assignments = self.ot_sampler.get_batch_assignments(x0, x1, self.ot_solver_pool)
+
+            batch_x0 = x0
+            batch_x1 = torch.gather(x1, 1, assignments.unsqueeze(-1).expand(-1, -1, x1.shape[-1]))
+            if y1 is not None:
+                y1 = torch.stack([y1[i][assignments[i]] for i in range(y1.shape[0])], dim=0)
+        else:
+            pi_list = self.ot_sampler.get_batch_maps(x0, x1, self.ot_solver_pool)
+
+            batch_x0_list = []
+            batch_x1_list = []
+            y0_list = []
+            y1_list = []
+            for i, pi in enumerate(pi_list):
+                i_idxs, j_idxs = self.ot_sampler.sample_map(pi, x0.shape[1], replace=True)
+                batch_x0_list.append(x0[i][i_idxs])
+                batch_x1_list.append(x1[i][j_idxs])
+                if y0 is not None:
+                    y0_list.append(y0[i][i_idxs])
+                if y1 is not None:
+                    y1_list.append(y1[i][j_idxs])
+
+            batch_x0 = torch.stack(batch_x0_list, dim=0)
+            batch_x1 = torch.stack(batch_x1_list, dim=0)
+            if y0 is not None:
+                y0 = torch.stack(y0_list, dim=0)
+            if y1 is not None:
+                y1 = torch.stack(y1_list, dim=0)
+
+        self.solve_time = time() - start
 
         if t is None:
             t = torch.rand(batch_x0.shape[0]).type_as(batch_x0)
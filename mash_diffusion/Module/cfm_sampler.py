@@ -9,6 +9,7 @@ from ma_sh.Module.local_editor import LocalEditor
 
 from mash_diffusion.Model.unet2d import MashUNet
 from mash_diffusion.Model.cfm_latent_transformer import CFMLatentTransformer
+from mash_diffusion.Module.condition_pca import ConditionPCA
 
 
 class CFMSampler(object):
@@ -16,7 +17,9 @@ class CFMSampler(object):
         self,
         model_file_path: Union[str, None] = None,
         use_ema: bool = True,
-        device: str = "cpu"
+        device: str = "cpu",
+        condition_pca_file_path: Union[str, None] = None,
+        attn_backend: str = "einsum",
     ) -> None:
         self.mash_channel = 400
         self.encoded_mash_channel = 25
@@ -27,9 +30,20 @@ class CFMSampler(object):
         self.d_head = 64
         self.depth = 24
 
+        # conditions from the full-size encoder are reduced like in training
+        self.condition_pca = None
+        if condition_pca_file_path is not None:
+            self.condition_pca = ConditionPCA()
+            assert self.condition_pca.loadProjection(condition_pca_file_path)
+
+            self.context_dim = self.condition_pca.reduced_dim
+
         self.use_ema = use_ema
         self.device = device
 
+        # cross attention K/V cache stats of the last sampling call
+        self.condition_cache_stats = {}
+
         model_id = 2
         if model_id == 1:
             self.model = MashUNet(self.context_dim).to(self.device)
@@ -41,7 +55,8 @@ class CFMSampler(object):
                 context_dim=self.context_dim,
                 n_heads=self.n_heads,
                 d_head=self.d_head,
-                depth=self.depth
+                depth=self.depth,
+                attn_backend=attn_backend,
             ).to(self.device)
 
         if model_file_path is not None:
@@ -64,6 +79,15 @@ class CFMSampler(object):
         )
         return mash_model
 
+    def projectCondition(self, condition_tensor: torch.Tensor) -> torch.Tensor:
+        if self.condition_pca is None:
+            return condition_tensor
+
+        if condition_tensor.shape[-1] != self.condition_pca.dim:
+            return condition_tensor
+
+        return self.condition_pca.transform(condition_tensor)
+
     def loadModel(self, model_file_path: str) -> bool:
         if not os.path.exists(model_file_path):
             print("[ERROR][CFMSampler::loadModel]")
@@ -97,6 +121,7 @@ class CFMSampler(object):
         elif isinstance(condition, np.ndarray):
             # condition dim: 1x768
             condition_tensor = torch.from_numpy(condition).type(torch.float32).to(self.device).repeat(sample_num, 1)
+            condition_tensor = self.projectCondition(condition_tensor)
         else:
             print('[ERROR][CFMSampler::sample]')
             print('\t condition type not valid!')
@@ -107,6 +132,9 @@ class CFMSampler(object):
 
         x_init = torch.randn(condition_tensor.shape[0], 400, 25, device=self.device)
 
+        # the condition is constant over the solve, its K/V are computed once
+        self.model.prefillCondition(condition_tensor)
+
         traj = torchdiffeq.odeint(
             lambda t, x: self.model.forwardData(x, condition_tensor, t),
             x_init,
@@ -116,6 +144,9 @@ class CFMSampler(object):
             method="dopri5",
         )
 
+        self.condition_cache_stats = self.model.toConditionCacheStats()
+        self.model.clearConditionCache()
+
         return traj.cpu().numpy()
 
     @torch.no_grad()
@@ -133,6 +164,7 @@ class CFMSampler(object):
         elif isinstance(condition, np.ndarray):
             # condition dim: 1x768
             condition_tensor = torch.from_numpy(condition).type(torch.float32).to(self.device).repeat(sample_num, 1)
+            condition_tensor = self.projectCondition(condition_tensor)
         else:
             print('[ERROR][CFMSampler::sample]')
             print('\t condition type not valid!')
@@ -183,6 +215,8 @@ class CFMSampler(object):
         fixed_anchor_mask = torch.zeros_like(x_init, dtype=torch.bool)
         fixed_anchor_mask[:, :combined_mash.anchor_num, :] = True
 
+        self.model.prefillCondition(condition_tensor)
+
         traj = torchdiffeq.odeint(
             lambda t, x: self.model.forwardWithFixedAnchors(x, condition_tensor, t, fixed_anchor_mask),
             x_init,
@@ -192,4 +226,7 @@ class CFMSampler(object):
             method="dopri5",
         )
 
+        self.condition_cache_stats = self.model.toConditionCacheStats()
+        self.model.clearConditionCache()
+
         return traj.cpu().numpy()
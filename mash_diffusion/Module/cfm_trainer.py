@@ -3,16 +3,22 @@ import torchdiffeq
 import numpy as np
 from torch import nn
 from typing import Union
+from torch.utils.data import IterableDataset
 
 from flow_matching.path.scheduler import CondOTScheduler
 from flow_matching.path import AffineProbPath
 
 from torchcfm.conditional_flow_matching import ExactOptimalTransportConditionalFlowMatcher
 
+from mash_diffusion.Dataset.ot_pair import OTPairDataset, OTPairStreamDataset
+from mash_diffusion.Dataset.resident_mash import ResidentMashDataset
 from mash_diffusion.Model.unet2d import MashUNet
 from mash_diffusion.Model.cfm_latent_transformer import CFMLatentTransformer
 from mash_diffusion.Module.base_diffusion_trainer import BaseDiffusionTrainer
 from mash_diffusion.Module.batch_ot_cfm import BatchExactOptimalTransportConditionalFlowMatcher
+from mash_diffusion.Method.transformer import toTransformerHash
+from mash_diffusion.Module.noise_bank import NoiseBank
+from mash_diffusion.Module.ot_pair_builder import OTPairBuilder
 from mash_diffusion.Module.stacked_random_generator import StackedRandomGenerator
 
 
@@ -41,6 +47,33 @@ class CFMTrainer(BaseDiffusionTrainer):
         sample_results_freq: int = -1,
         use_amp: bool = False,
         quick_test: bool = False,
+        dataset_shard_folder_path_dict: dict = {},
+        normalized_cache_folder_path_dict: dict = {},
+        dataset_validity_file_path_dict: dict = {},
+        batch_permute_anchors: bool = False,
+        embedding_dtype: str = "float32",
+        upcast_condition: bool = True,
+        streaming_shuffle_buffer_size: int = 0,
+        local_cache_folder_path: Union[str, None] = None,
+        local_cache_size_gb: float = 100.0,
+        resident_dataset: bool = False,
+        shared_memory_cache_size_mb: float = 0.0,
+        condition_view_num: int = 1,
+        embedding_folder_name: str = "Objaverse_82K/render_dino",
+        condition_pca_file_path: Union[str, None] = None,
+        condition_token_num: int = 0,
+        transformer_id_dict: dict = {},
+        worker_ot_pairs: bool = False,
+        ot_method: str = "exact",
+        ot_worker_num: int = 1,
+        ot_pool_type: str = "thread",
+        noise_bank_folder_path: Union[str, None] = None,
+        noise_bank_refresh_prob: float = 0.0,
+        ot_projection_num: int = 16,
+        ot_refine_iter_num: int = 0,
+        ot_cost_gap_freq: int = 0,
+        draws_per_sample: int = 1,
+        attn_backend: str = "einsum",
     ) -> None:
         if training_mode in ['single_shape', 'category']:
             self.context_dim = 512
@@ -60,11 +93,22 @@ class CFMTrainer(BaseDiffusionTrainer):
             self.FM = ExactOptimalTransportConditionalFlowMatcher(sigma=0.0)
         elif fm_id == 2:
             self.FM = BatchExactOptimalTransportConditionalFlowMatcher(
-                sigma=0.0, target_dim=None
+                sigma=0.0,
+                target_dim=None,
+                method=ot_method,
+                worker_num=ot_worker_num,
+                pool_type=ot_pool_type,
+                projection_num=ot_projection_num,
+                refine_iter_num=ot_refine_iter_num,
             )
         elif fm_id == 3:
             self.FM = AffineProbPath(scheduler=CondOTScheduler())
 
+        self.worker_ot_pairs = worker_ot_pairs
+        self.noise_bank_folder_path = noise_bank_folder_path
+        self.noise_bank_refresh_prob = noise_bank_refresh_prob
+        self.ot_cost_gap_freq = ot_cost_gap_freq
+
         super().__init__(
             dataset_root_folder_path,
             dataset_json_file_path_dict,
@@ -88,6 +132,24 @@ class CFMTrainer(BaseDiffusionTrainer):
             sample_results_freq,
             use_amp,
             quick_test,
+            dataset_shard_folder_path_dict,
+            normalized_cache_folder_path_dict,
+            dataset_validity_file_path_dict,
+            batch_permute_anchors,
+            embedding_dtype,
+            upcast_condition,
+            streaming_shuffle_buffer_size,
+            local_cache_folder_path,
+            local_cache_size_gb,
+            resident_dataset,
+            shared_memory_cache_size_mb,
+            condition_view_num,
+            embedding_folder_name,
+            condition_pca_file_path,
+            condition_token_num,
+            transformer_id_dict,
+            draws_per_sample,
+            attn_backend,
         )
         return
 
@@ -104,10 +166,58 @@ class CFMTrainer(BaseDiffusionTrainer):
                 n_heads=self.n_heads,
                 d_head=self.d_head,
                 depth=self.depth,
+                attn_backend=self.attn_backend,
             ).to(self.device)
         return True
 
+    def createNoiseBank(self, dataset) -> NoiseBank:
+        noise_bank = NoiseBank(self.noise_bank_folder_path, self.noise_bank_refresh_prob)
+        assert noise_bank.isValid()
+
+        # the couplings are indexed by the object order of the dataset
+        if hasattr(dataset, "paths_list"):
+            assert noise_bank.meta["object_num"] == len(dataset.paths_list)
+
+        if "transformer_hash" in noise_bank.meta.keys() and hasattr(dataset, "transformer"):
+            assert noise_bank.meta["transformer_hash"] == toTransformerHash(dataset.transformer)
+
+        return noise_bank
+
+    def toTrainDataset(self, dataset):
+        if not self.worker_ot_pairs and self.noise_bank_folder_path is None:
+            return dataset
+
+        if not isinstance(self.FM, BatchExactOptimalTransportConditionalFlowMatcher):
+            return dataset
+
+        # resident datasets are indexed in the training process anyway
+        if isinstance(dataset, ResidentMashDataset):
+            return dataset
+
+        draw_num = self.draws_per_sample
+        if self.training_mode in ['dino']:
+            draw_num *= self.condition_view_num
+
+        if isinstance(dataset, IterableDataset):
+            return OTPairStreamDataset(
+                dataset, OTPairBuilder(self.FM, self.fix_params, draw_num)
+            )
+
+        noise_bank = None
+        if self.noise_bank_folder_path is not None:
+            noise_bank = self.createNoiseBank(dataset)
+
+        ot_pair_builder = OTPairBuilder(self.FM, self.fix_params, draw_num, noise_bank)
+
+        return OTPairDataset(dataset, ot_pair_builder)
+
     def preProcessDiffusionData(self, data_dict: dict, is_training: bool = False) -> dict:
+        # flow pairs already built in the dataloader workers
+        if "xt" in data_dict.keys():
+            for key in ["xt", "ut", "t"]:
+                data_dict[key] = data_dict[key].to(self.device, non_blocking=True)
+            return data_dict
+
         mash_params = data_dict["mash_params"]
 
         init_mash_params = torch.randn_like(mash_params)
@@ -128,6 +238,20 @@ class CFMTrainer(BaseDiffusionTrainer):
             t, xt, ut = self.FM.sample_location_and_conditional_flow(
                 init_mash_params, mash_params
             )
+
+            if is_training and self.logger.isValid():
+                self.logger.addScalar("OT/solve_time", self.FM.solve_time, self.step)
+
+                # approximate couplings against the exact cpu assignment
+                if (
+                    self.ot_cost_gap_freq > 0
+                    and self.step % self.ot_cost_gap_freq == 0
+                    and self.FM.isSourceOrderKept()
+                ):
+                    cost_gap = self.FM.ot_sampler.get_cost_gap(
+                        init_mash_params, mash_params, init_mash_params + ut
+                    )
+                    self.logger.addScalar("OT/cost_gap", cost_gap, self.step)
         elif isinstance(self.FM, AffineProbPath):
             t = torch.rand(mash_params.shape[0]).to(self.device)
             t = torch.pow(t, 1.0 / 2.0)
@@ -169,6 +293,9 @@ class CFMTrainer(BaseDiffusionTrainer):
         rnd = StackedRandomGenerator(self.device, batch_seeds)
         x_init = rnd.randn([sample_num, self.anchor_num, self.anchor_channel], device=self.device)
 
+        # the condition is constant over the solve, its K/V are computed once
+        model.prefillCondition(condition)
+
         traj = torchdiffeq.odeint(
             lambda t, x: model.forwardData(x, condition, t),
             x_init,
@@ -178,6 +305,8 @@ class CFMTrainer(BaseDiffusionTrainer):
             method="dopri5",
         )
 
+        model.clearConditionCache()
+
         sampled_array = traj.cpu()[-1]
 
         return sampled_array
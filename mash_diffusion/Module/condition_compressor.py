@@ -0,0 +1,137 @@
+import os
+import numpy as np
+from tqdm import tqdm
+from multiprocessing import Pool
+
+from mash_diffusion.Method.path import createFileFolder
+from mash_diffusion.Module.condition_pca import ConditionPCA
+
+
+worker_condition_pca = None
+
+
+def initCompressWorker(projection_file_path: str) -> None:
+    global worker_condition_pca
+    worker_condition_pca = ConditionPCA()
+    worker_condition_pca.loadProjection(projection_file_path)
+    return
+
+
+def loadEmbeddingFile(embedding_file_path: str, embedding_key: str):
+    try:
+        embedding = np.load(embedding_file_path, allow_pickle=True).item()[embedding_key]
+    except KeyboardInterrupt:
+        raise
+    except Exception:
+        return None
+
+    if not np.all(np.isfinite(embedding)):
+        return None
+
+    return embedding
+
+
+def fitEmbeddingFiles(task: tuple) -> ConditionPCA:
+    embedding_file_path_list, embedding_key, dim = task
+
+    condition_pca = ConditionPCA(dim)
+    for embedding_file_path in embedding_file_path_list:
+        embedding = loadEmbeddingFile(embedding_file_path, embedding_key)
+        if embedding is None:
+            continue
+
+        condition_pca.addTokens(embedding)
+
+    return condition_pca
+
+
+def compressEmbeddingFile(task: tuple) -> bool:
+    embedding_file_path, save_embedding_file_path, embedding_key = task
+
+    if os.path.exists(save_embedding_file_path):
+        return True
+
+    embedding = loadEmbeddingFile(embedding_file_path, embedding_key)
+    if embedding is None:
+        return False
+
+    reduced_embedding = worker_condition_pca.transform(embedding).astype(embedding.dtype)
+
+    createFileFolder(save_embedding_file_path)
+
+    tmp_save_embedding_file_path = save_embedding_file_path[:-4] + "_tmp.npy"
+    np.save(tmp_save_embedding_file_path, {embedding_key: reduced_embedding})
+    os.replace(tmp_save_embedding_file_path, save_embedding_file_path)
+    return True
+
+
+class ConditionCompressor(object):
+    def __init__(
+        self,
+        embedding_key: str = "dino",
+        dim: int = 1024,
+        reduced_dim: int = 256,
+        whiten: bool = False,
+        worker_num: int = 16,
+    ) -> None:
+        self.embedding_key = embedding_key
+        self.dim = dim
+        self.reduced_dim = reduced_dim
+        self.whiten = whiten
+        self.worker_num = worker_num
+        return
+
+    def fit(self, embedding_file_path_list: list, chunk_size: int = 64) -> ConditionPCA:
+        task_list = [
+            [embedding_file_path_list[i : i + chunk_size], self.embedding_key, self.dim]
+            for i in range(0, len(embedding_file_path_list), chunk_size)
+        ]
+
+        condition_pca = ConditionPCA(self.dim, self.reduced_dim, self.whiten)
+
+        print("[INFO][ConditionCompressor::fit]")
+        print("\t start fit condition pca...")
+        with Pool(self.worker_num) as pool:
+            for partial_condition_pca in tqdm(
+                pool.imap_unordered(fitEmbeddingFiles, task_list), total=len(task_list)
+            ):
+                condition_pca.merge(partial_condition_pca)
+
+        condition_pca.fit()
+
+        print("[INFO][ConditionCompressor::fit]")
+        print("\t token num:", condition_pca.token_num)
+        print("\t explained variance:", float(condition_pca.explained_variance_ratio.sum()))
+        return condition_pca
+
+    def compress(
+        self,
+        projection_file_path: str,
+        embedding_file_path_list: list,
+        embedding_root_folder_path: str,
+        save_embedding_root_folder_path: str,
+    ) -> bool:
+        task_list = []
+        for embedding_file_path in embedding_file_path_list:
+            assert embedding_file_path.startswith(embedding_root_folder_path)
+
+            save_embedding_file_path = (
+                save_embedding_root_folder_path
+                + embedding_file_path[len(embedding_root_folder_path) :]
+            )
+            task_list.append(
+                [embedding_file_path, save_embedding_file_path, self.embedding_key]
+            )
+
+        print("[INFO][ConditionCompressor::compress]")
+        print("\t start write reduced embeddings...")
+        with Pool(
+            self.worker_num, initializer=initCompressWorker, initargs=(projection_file_path,)
+        ) as pool:
+            valid_list = list(
+                tqdm(pool.imap(compressEmbeddingFile, task_list, chunksize=64), total=len(task_list))
+            )
+
+        print("[INFO][ConditionCompressor::compress]")
+        print("\t valid file num:", sum(valid_list), "/", len(valid_list))
+        return True
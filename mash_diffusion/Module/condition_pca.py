@@ -0,0 +1,142 @@
+import os
+import torch
+import numpy as np
+from typing import Union
+
+
+# only token count, sum and outer product sum are kept, so partial fits can be merged
+class ConditionPCA(object):
+    def __init__(
+        self,
+        dim: int = 1024,
+        reduced_dim: int = 256,
+        whiten: bool = False,
+    ) -> None:
+        self.dim = dim
+        self.reduced_dim = reduced_dim
+        self.whiten = whiten
+
+        self.token_num = 0
+        self.token_sum = np.zeros([self.dim], dtype=np.float64)
+        self.token_outer_sum = np.zeros([self.dim, self.dim], dtype=np.float64)
+
+        self.mean = None
+        # [dim, reduced_dim], whitening already folded in
+        self.components = None
+        self.explained_variance_ratio = None
+
+        self.tensor_dict = {}
+        return
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["tensor_dict"] = {}
+        return state
+
+    def isValid(self) -> bool:
+        return self.components is not None
+
+    def addTokens(self, tokens: np.ndarray) -> bool:
+        tokens = np.asarray(tokens, dtype=np.float64).reshape(-1, self.dim)
+
+        self.token_num += tokens.shape[0]
+        self.token_sum += tokens.sum(axis=0)
+        self.token_outer_sum += tokens.T @ tokens
+        return True
+
+    def merge(self, other) -> bool:
+        assert other.dim == self.dim
+
+        self.token_num += other.token_num
+        self.token_sum += other.token_sum
+        self.token_outer_sum += other.token_outer_sum
+        return True
+
+    def fit(self, eps: float = 1e-6) -> bool:
+        if self.token_num < 2:
+            print("[ERROR][ConditionPCA::fit]")
+            print("\t not enough tokens!")
+            print("\t token_num:", self.token_num)
+            return False
+
+        mean = self.token_sum / self.token_num
+        cov = (self.token_outer_sum - self.token_num * np.outer(mean, mean)) / (
+            self.token_num - 1
+        )
+
+        eigen_values, eigen_vectors = np.linalg.eigh(cov)
+        eigen_values = np.maximum(eigen_values[::-1], 0.0)
+        eigen_vectors = eigen_vectors[:, ::-1]
+
+        components = eigen_vectors[:, : self.reduced_dim]
+        if self.whiten:
+            components = components / np.sqrt(eigen_values[: self.reduced_dim] + eps)
+
+        self.mean = mean.astype(np.float32)
+        self.components = np.ascontiguousarray(components, dtype=np.float32)
+        self.explained_variance_ratio = eigen_values[: self.reduced_dim] / max(
+            eigen_values.sum(), eps
+        )
+
+        self.tensor_dict = {}
+        return True
+
+    def getTensors(self, device: torch.device) -> tuple:
+        device = torch.device(device)
+
+        if device not in self.tensor_dict.keys():
+            self.tensor_dict[device] = (
+                torch.from_numpy(self.mean).to(device),
+                torch.from_numpy(self.components).to(device),
+            )
+
+        return self.tensor_dict[device]
+
+    def transform(self, tokens: Union[torch.Tensor, np.ndarray]) -> Union[torch.Tensor, np.ndarray]:
+        assert self.isValid()
+
+        if isinstance(tokens, np.ndarray):
+            reduced_tokens = (tokens.astype(np.float32) - self.mean) @ self.components
+            return reduced_tokens
+
+        mean, components = self.getTensors(tokens.device)
+        reduced_tokens = (tokens.float() - mean) @ components
+        return reduced_tokens.to(tokens.dtype)
+
+    def saveProjection(self, save_file_path: str) -> bool:
+        assert self.isValid()
+
+        save_folder_path = os.path.dirname(save_file_path)
+        if save_folder_path != "":
+            os.makedirs(save_folder_path, exist_ok=True)
+
+        np.savez(
+            save_file_path,
+            dim=self.dim,
+            reduced_dim=self.reduced_dim,
+            whiten=self.whiten,
+            token_num=self.token_num,
+            mean=self.mean,
+            components=self.components,
+            explained_variance_ratio=self.explained_variance_ratio,
+        )
+        return True
+
+    def loadProjection(self, projection_file_path: str) -> bool:
+        if not os.path.exists(projection_file_path):
+            print("[ERROR][ConditionPCA::loadProjection]")
+            print("\t projection file not exist!")
+            print("\t projection_file_path:", projection_file_path)
+            return False
+
+        with np.load(projection_file_path) as projection_data:
+            self.dim = int(projection_data["dim"])
+            self.reduced_dim = int(projection_data["reduced_dim"])
+            self.whiten = bool(projection_data["whiten"])
+            self.token_num = int(projection_data["token_num"])
+            self.mean = projection_data["mean"]
+            self.components = projection_data["components"]
+            self.explained_variance_ratio = projection_data["explained_variance_ratio"]
+
+        self.tensor_dict = {}
+        return True
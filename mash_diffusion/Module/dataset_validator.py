@@ -0,0 +1,126 @@
+import torch
+import numpy as np
+from tqdm import tqdm
+from multiprocessing import Pool
+
+from ma_sh.Method.io import loadMashFileParamsTensor
+
+from mash_diffusion.Method.path import createFileFolder
+from mash_diffusion.Method.validity import toPathsHash
+
+
+def checkFile(task: tuple) -> bool:
+    file_type, file_path, embedding_key = task
+
+    try:
+        if file_type == "mash":
+            data = loadMashFileParamsTensor(file_path, torch.float32, "cpu").numpy()
+        else:
+            data = np.load(file_path, allow_pickle=True).item()[embedding_key]
+    except KeyboardInterrupt:
+        raise
+    except Exception:
+        return False
+
+    return bool(np.all(np.isfinite(data)))
+
+
+class DatasetValidator(object):
+    def __init__(self, worker_num: int = 16) -> None:
+        self.worker_num = worker_num
+        return
+
+    def checkTasks(self, task_list: list) -> np.ndarray:
+        with Pool(self.worker_num) as pool:
+            valid_list = list(
+                tqdm(pool.imap(checkFile, task_list, chunksize=64), total=len(task_list))
+            )
+        return np.asarray(valid_list, dtype=bool)
+
+    def saveValidity(
+        self,
+        save_validity_file_path: str,
+        paths_hash: str,
+        object_valid: np.ndarray,
+        view_valid: np.ndarray,
+        bad_file_path_list: list,
+    ) -> bool:
+        createFileFolder(save_validity_file_path)
+
+        np.savez(
+            save_validity_file_path,
+            paths_hash=np.asarray(paths_hash),
+            object_num=np.asarray(object_valid.shape[0]),
+            object_valid_bits=np.packbits(object_valid),
+            view_num=np.asarray(view_valid.shape[0]),
+            view_valid_bits=np.packbits(view_valid),
+            bad_file_paths=np.asarray(bad_file_path_list, dtype=str),
+        )
+
+        with open(save_validity_file_path[:-4] + "_quarantine.txt", "w") as f:
+            for bad_file_path in bad_file_path_list:
+                f.write(bad_file_path + "\n")
+
+        print("[INFO][DatasetValidator::saveValidity]")
+        print("\t valid object num:", int(object_valid.sum()), "/", object_valid.shape[0])
+        print("\t bad file num:", len(bad_file_path_list))
+        print("\t save_validity_file_path:", save_validity_file_path)
+        return True
+
+    def validateMashPathsList(self, paths_list: list, save_validity_file_path: str) -> bool:
+        mash_file_path_list = [paths[0] for paths in paths_list]
+
+        print("[INFO][DatasetValidator::validateMashPathsList]")
+        print("\t start check mash files...")
+        object_valid = self.checkTasks(
+            [["mash", mash_file_path, None] for mash_file_path in mash_file_path_list]
+        )
+
+        bad_file_path_list = [
+            mash_file_path
+            for mash_file_path, is_valid in zip(mash_file_path_list, object_valid)
+            if not is_valid
+        ]
+
+        return self.saveValidity(
+            save_validity_file_path,
+            toPathsHash(mash_file_path_list),
+            object_valid,
+            np.zeros([0], dtype=bool),
+            bad_file_path_list,
+        )
+
+    def validateEmbeddingPathsList(self, paths_list: list, embedding_key: str, save_validity_file_path: str) -> bool:
+        mash_file_path_list = [paths[0] for paths in paths_list]
+        embedding_file_paths_list = [paths[1] for paths in paths_list]
+
+        task_list = [["mash", mash_file_path, None] for mash_file_path in mash_file_path_list]
+        for embedding_file_path_list in embedding_file_paths_list:
+            for embedding_file_path in embedding_file_path_list:
+                task_list.append(["embedding", embedding_file_path, embedding_key])
+
+        print("[INFO][DatasetValidator::validateEmbeddingPathsList]")
+        print("\t start check mash and embedding files...")
+        valid = self.checkTasks(task_list)
+
+        mash_valid = valid[: len(mash_file_path_list)]
+        view_valid = valid[len(mash_file_path_list) :]
+
+        object_valid = np.zeros_like(mash_valid)
+        view_start = 0
+        for i, embedding_file_path_list in enumerate(embedding_file_paths_list):
+            view_num = len(embedding_file_path_list)
+            object_valid[i] = mash_valid[i] and view_valid[view_start : view_start + view_num].any()
+            view_start += view_num
+
+        bad_file_path_list = [
+            task[1] for task, is_valid in zip(task_list, valid) if not is_valid
+        ]
+
+        return self.saveValidity(
+            save_validity_file_path,
+            toPathsHash(mash_file_path_list, embedding_file_paths_list),
+            object_valid,
+            view_valid,
+            bad_file_path_list,
+        )
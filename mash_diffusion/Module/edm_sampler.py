@@ -6,12 +6,13 @@ from tqdm import tqdm
 from typing import Union
 
 from ma_sh.Model.mash import Mash
-from ma_sh.Method.transformer import getTransformer
 from ma_sh.Module.o3d_viewer import O3DViewer
 from ma_sh.Module.local_editor import LocalEditor
 
+from mash_diffusion.Method.transformer import getMashTransformer
 from mash_diffusion.Model.edm_latent_transformer import EDMLatentTransformer
 from mash_diffusion.Method.sample import edm_sampler
+from mash_diffusion.Module.condition_pca import ConditionPCA
 
 
 class EDMSampler(object):
@@ -21,6 +22,8 @@ class EDMSampler(object):
         use_ema: bool = True,
         device: str = "cpu",
         transformer_id: str = 'Objaverse_82K',
+        condition_pca_file_path: Union[str, None] = None,
+        attn_backend: str = "einsum",
     ) -> None:
         self.anchor_num = 400
         self.mask_degree = 3
@@ -30,6 +33,14 @@ class EDMSampler(object):
         self.d_head = 64
         self.depth = 24
 
+        # conditions from the full-size encoder are reduced like in training
+        self.condition_pca = None
+        if condition_pca_file_path is not None:
+            self.condition_pca = ConditionPCA()
+            assert self.condition_pca.loadProjection(condition_pca_file_path)
+
+            self.context_dim = self.condition_pca.reduced_dim
+
         self.use_ema = use_ema
         self.device = device
 
@@ -43,13 +54,17 @@ class EDMSampler(object):
             d_head=self.d_head,
             depth=self.depth,
             context_dim=self.context_dim,
+            attn_backend=attn_backend,
         ).to(self.device)
 
         if model_file_path is not None:
             self.loadModel(model_file_path)
 
-        self.transformer = getTransformer(transformer_id)
+        self.transformer = getMashTransformer(transformer_id)
         assert self.transformer is not None
+
+        # cross attention K/V cache stats of the last sampling call
+        self.condition_cache_stats = {}
         return
 
     def toInitialMashModel(self) -> Mash:
@@ -65,6 +80,15 @@ class EDMSampler(object):
         )
         return mash_model
 
+    def projectCondition(self, condition_tensor: torch.Tensor) -> torch.Tensor:
+        if self.condition_pca is None:
+            return condition_tensor
+
+        if condition_tensor.shape[-1] != self.condition_pca.dim:
+            return condition_tensor
+
+        return self.condition_pca.transform(condition_tensor)
+
     def loadModel(self, model_file_path: str) -> bool:
         if not os.path.exists(model_file_path):
             print("[ERROR][EDMSampler::loadModel]")
@@ -98,6 +122,7 @@ class EDMSampler(object):
         elif isinstance(condition, np.ndarray):
             # condition dim: 1x768
             condition_tensor = torch.from_numpy(condition).type(torch.float32).to(self.device).repeat(sample_num, 1)
+            condition_tensor = self.projectCondition(condition_tensor)
         else:
             print('[ERROR][Sampler::sample]')
             print('\t condition type not valid!')
@@ -112,6 +137,9 @@ class EDMSampler(object):
             num_steps=diffuse_steps,
         )
 
+        # edm_sampler clears the cache, the hit counts are kept
+        self.condition_cache_stats = self.model.toConditionCacheStats()
+
         return sampled_array
 
     @torch.no_grad()
@@ -128,6 +156,7 @@ class EDMSampler(object):
         elif isinstance(condition, np.ndarray):
             # condition dim: 1x768
             condition_tensor = torch.from_numpy(condition).type(torch.float32).to(self.device).repeat(sample_num, 1)
+            condition_tensor = self.projectCondition(condition_tensor)
         else:
             print('[ERROR][Sampler::sample]')
             print('\t condition type not valid!')
@@ -207,6 +236,7 @@ class EDMSampler(object):
         elif isinstance(condition, np.ndarray):
             # condition dim: 1x768
             condition_tensor = torch.from_numpy(condition).type(torch.float32).to(self.device).repeat(sample_num, 1)
+            condition_tensor = self.projectCondition(condition_tensor)
         else:
             print('[ERROR][Sampler::sample]')
             print('\t condition type not valid!')
@@ -36,6 +36,24 @@ class EDMTrainer(BaseDiffusionTrainer):
         sample_results_freq: int = -1,
         use_amp: bool = False,
         quick_test: bool = False,
+        dataset_shard_folder_path_dict: dict = {},
+        normalized_cache_folder_path_dict: dict = {},
+        dataset_validity_file_path_dict: dict = {},
+        batch_permute_anchors: bool = False,
+        embedding_dtype: str = "float32",
+        upcast_condition: bool = True,
+        streaming_shuffle_buffer_size: int = 0,
+        local_cache_folder_path: Union[str, None] = None,
+        local_cache_size_gb: float = 100.0,
+        resident_dataset: bool = False,
+        shared_memory_cache_size_mb: float = 0.0,
+        condition_view_num: int = 1,
+        embedding_folder_name: str = "Objaverse_82K/render_dino",
+        condition_pca_file_path: Union[str, None] = None,
+        condition_token_num: int = 0,
+        transformer_id_dict: dict = {},
+        draws_per_sample: int = 1,
+        attn_backend: str = "einsum",
     ) -> None:
         if training_mode in ['single_shape', 'category']:
             self.context_dim = 512
@@ -75,6 +93,24 @@ class EDMTrainer(BaseDiffusionTrainer):
             sample_results_freq,
             use_amp,
             quick_test,
+            dataset_shard_folder_path_dict,
+            normalized_cache_folder_path_dict,
+            dataset_validity_file_path_dict,
+            batch_permute_anchors,
+            embedding_dtype,
+            upcast_condition,
+            streaming_shuffle_buffer_size,
+            local_cache_folder_path,
+            local_cache_size_gb,
+            resident_dataset,
+            shared_memory_cache_size_mb,
+            condition_view_num,
+            embedding_folder_name,
+            condition_pca_file_path,
+            condition_token_num,
+            transformer_id_dict,
+            draws_per_sample,
+            attn_backend,
         )
         return
 
@@ -90,6 +126,7 @@ class EDMTrainer(BaseDiffusionTrainer):
                 d_head=self.d_head,
                 depth=self.depth,
                 context_dim=self.context_dim,
+                attn_backend=self.attn_backend,
             ).to(self.device)
         return True
 
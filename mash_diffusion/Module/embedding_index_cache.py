@@ -0,0 +1,202 @@
+import os
+import pickle
+import hashlib
+from typing import Union
+
+from mash_diffusion.Method.path import createFileFolder
+from mash_diffusion.Method.distributed import getJobToken
+from mash_diffusion.Module.file_lock import FileLock
+
+
+# a refresh lists again only the folders whose mtime changed
+class EmbeddingIndexCache(object):
+    VERSION = 1
+
+    def __init__(
+        self,
+        embedding_root_folder_path: str,
+        mash_folder_path: str,
+        cache_file_path: Union[str, None] = None,
+    ) -> None:
+        self.embedding_root_folder_path = embedding_root_folder_path
+        self.mash_folder_path = mash_folder_path
+
+        if cache_file_path is None:
+            cache_key = hashlib.md5(
+                (self.embedding_root_folder_path + "|" + self.mash_folder_path).encode()
+            ).hexdigest()
+            cache_file_path = "./output/index_cache/embedding_" + cache_key + ".pkl"
+        self.cache_file_path = cache_file_path
+
+        self.scan_num = 0
+        self.reuse_num = 0
+        return
+
+    def loadCache(self) -> dict:
+        if not os.path.exists(self.cache_file_path):
+            return {}
+
+        try:
+            with open(self.cache_file_path, "rb") as f:
+                cache = pickle.load(f)
+        except Exception as e:
+            print("[WARN][EmbeddingIndexCache::loadCache]")
+            print("\t load cache failed, will rebuild it!")
+            print("\t error info:", e)
+            return {}
+
+        if cache.get("version") != self.VERSION:
+            return {}
+        if cache.get("embedding_root_folder_path") != self.embedding_root_folder_path:
+            return {}
+        if cache.get("mash_folder_path") != self.mash_folder_path:
+            return {}
+
+        return cache
+
+    def saveCache(self, cache: dict) -> bool:
+        createFileFolder(self.cache_file_path)
+
+        tmp_cache_file_path = self.cache_file_path + "." + str(os.getpid()) + ".tmp"
+        with open(tmp_cache_file_path, "wb") as f:
+            pickle.dump(cache, f)
+
+        os.replace(tmp_cache_file_path, self.cache_file_path)
+        return True
+
+    def listFolder(self, folder_path: str, old_folder_dict: dict, rel_folder_path: str) -> tuple:
+        mtime_ns = os.stat(folder_path).st_mtime_ns
+
+        old_folder = old_folder_dict.get(rel_folder_path)
+        if old_folder is not None and old_folder[0] == mtime_ns:
+            self.reuse_num += 1
+            return old_folder
+
+        sub_folder_name_list = []
+        file_name_list = []
+        with os.scandir(folder_path) as entries:
+            for entry in entries:
+                if entry.is_dir():
+                    sub_folder_name_list.append(entry.name)
+                elif entry.name.endswith(".npy"):
+                    file_name_list.append(entry.name)
+
+        self.scan_num += 1
+        return (mtime_ns, sub_folder_name_list, file_name_list)
+
+    def scanEmbeddingFolders(self, old_folder_dict: dict) -> dict:
+        folder_dict = {}
+
+        rel_folder_path_list = [""]
+        while len(rel_folder_path_list) > 0:
+            rel_folder_path = rel_folder_path_list.pop()
+
+            folder = self.listFolder(
+                self.embedding_root_folder_path + rel_folder_path,
+                old_folder_dict,
+                rel_folder_path,
+            )
+            folder_dict[rel_folder_path] = folder
+
+            for sub_folder_name in folder[1]:
+                rel_folder_path_list.append(rel_folder_path + sub_folder_name + "/")
+
+        return folder_dict
+
+    def scanMashFolder(self, rel_folder_path: str, mash_folder_dict: dict, old_mash_folder_dict: dict) -> list:
+        if rel_folder_path not in mash_folder_dict.keys():
+            mash_sub_folder_path = self.mash_folder_path + rel_folder_path
+            if not os.path.exists(mash_sub_folder_path):
+                mash_folder_dict[rel_folder_path] = (0, [], [])
+            else:
+                mash_folder_dict[rel_folder_path] = self.listFolder(
+                    mash_sub_folder_path, old_mash_folder_dict, rel_folder_path
+                )
+
+        return mash_folder_dict[rel_folder_path][2]
+
+    def toPathsList(self, folder_dict: dict, mash_folder_dict: dict, old_mash_folder_dict: dict) -> list:
+        paths_list = []
+        mash_file_name_set_dict = {}
+
+        for rel_folder_path, (_, _, file_name_list) in folder_dict.items():
+            if rel_folder_path == "":
+                continue
+
+            embedding_file_name_list = [
+                file_name
+                for file_name in file_name_list
+                if not file_name.endswith("_tmp.npy")
+            ]
+            if len(embedding_file_name_list) == 0:
+                continue
+
+            rel_object_path = rel_folder_path[:-1]
+            rel_parent_folder_path, object_name = os.path.split(rel_object_path)
+            if rel_parent_folder_path != "":
+                rel_parent_folder_path += "/"
+
+            if rel_parent_folder_path not in mash_file_name_set_dict.keys():
+                mash_file_name_set_dict[rel_parent_folder_path] = set(
+                    self.scanMashFolder(
+                        rel_parent_folder_path, mash_folder_dict, old_mash_folder_dict
+                    )
+                )
+            if object_name + ".npy" not in mash_file_name_set_dict[rel_parent_folder_path]:
+                continue
+
+            embedding_file_name_list.sort()
+
+            root = self.embedding_root_folder_path + rel_object_path
+            paths_list.append(
+                [
+                    self.mash_folder_path + rel_object_path + ".npy",
+                    [root + "/" + file_name for file_name in embedding_file_name_list],
+                ]
+            )
+
+        paths_list.sort(key=lambda x: x[0])
+        return paths_list
+
+    def refresh(self, old_cache: dict) -> dict:
+        self.scan_num = 0
+        self.reuse_num = 0
+
+        old_folder_dict = old_cache.get("folder_dict", {})
+        old_mash_folder_dict = old_cache.get("mash_folder_dict", {})
+
+        folder_dict = self.scanEmbeddingFolders(old_folder_dict)
+
+        # mash folders are stat-ed on demand, and listed only if they changed
+        mash_folder_dict = {}
+        paths_list = self.toPathsList(folder_dict, mash_folder_dict, old_mash_folder_dict)
+
+        cache = {
+            "version": self.VERSION,
+            "embedding_root_folder_path": self.embedding_root_folder_path,
+            "mash_folder_path": self.mash_folder_path,
+            "job_token": getJobToken(),
+            "folder_dict": folder_dict,
+            "mash_folder_dict": mash_folder_dict,
+            "paths_list": paths_list,
+        }
+        return cache
+
+    def load(self) -> list:
+        # the first process of a job refreshes the index, the others only
+        # wait on the lock and then read what it wrote
+        with FileLock(self.cache_file_path + ".lock"):
+            cache = self.loadCache()
+
+            if len(cache) > 0 and cache.get("job_token") == getJobToken():
+                return cache["paths_list"]
+
+            cache = self.refresh(cache)
+            self.saveCache(cache)
+
+        print("[INFO][EmbeddingIndexCache::load]")
+        print("\t index refreshed!")
+        print("\t scanned folder num:", self.scan_num)
+        print("\t reused folder num:", self.reuse_num)
+        print("\t object num:", len(cache["paths_list"]))
+        return cache["paths_list"]
@@ -0,0 +1,50 @@
+import os
+import fcntl
+
+from mash_diffusion.Method.path import createFileFolder
+
+
+class FileLock(object):
+    def __init__(self, lock_file_path: str, shared: bool = False) -> None:
+        self.lock_file_path = lock_file_path
+        self.shared = shared
+
+        self.lock_file = None
+        return
+
+    def acquire(self, blocking: bool = True) -> bool:
+        if self.lock_file is not None:
+            return True
+
+        createFileFolder(self.lock_file_path)
+
+        operation = fcntl.LOCK_SH if self.shared else fcntl.LOCK_EX
+        if not blocking:
+            operation |= fcntl.LOCK_NB
+
+        self.lock_file = open(self.lock_file_path, "a")
+        try:
+            fcntl.flock(self.lock_file.fileno(), operation)
+        except BlockingIOError:
+            self.lock_file.close()
+            self.lock_file = None
+            return False
+
+        return True
+
+    def release(self) -> bool:
+        if self.lock_file is None:
+            return True
+
+        fcntl.flock(self.lock_file.fileno(), fcntl.LOCK_UN)
+        self.lock_file.close()
+        self.lock_file = None
+        return True
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+        return False
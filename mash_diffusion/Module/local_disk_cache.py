@@ -0,0 +1,191 @@
+import os
+import json
+import shutil
+import hashlib
+from typing import Callable, Union
+
+from mash_diffusion.Method.path import createFileFolder
+from mash_diffusion.Method.distributed import getJobToken
+from mash_diffusion.Module.file_lock import FileLock
+
+
+# read-through copy of the source files on a local disk, evicted in LRU order by mtime
+class LocalDiskCache(object):
+    def __init__(
+        self,
+        source_root_folder_path: str,
+        cache_folder_path: str,
+        max_size_gb: float = 100.0,
+        stats_save_freq: int = 1000,
+        job_name: Union[str, None] = None,
+    ) -> None:
+        self.source_root_folder_path = source_root_folder_path
+        self.cache_folder_path = cache_folder_path
+        self.max_size_bytes = int(max_size_gb * 1024 * 1024 * 1024)
+        self.stats_save_freq = stats_save_freq
+
+        # check the cache size again after this many new bytes
+        self.evict_check_bytes = max(self.max_size_bytes // 100, 1)
+
+        self.data_folder_path = self.cache_folder_path + "data/"
+
+        # stats are summed per job, so older runs on this node are not mixed in
+        if job_name is None:
+            job_name = getJobToken()
+        job_key = hashlib.md5(job_name.encode()).hexdigest()[:16]
+        self.stats_folder_path = self.cache_folder_path + "stats/" + job_key + "/"
+
+        self.resetStats()
+        return
+
+    def resetStats(self) -> bool:
+        self.hit_num = 0
+        self.miss_num = 0
+        self.fetch_bytes = 0
+        self.evict_num = 0
+        self.unchecked_bytes = 0
+        return True
+
+    def toStats(self) -> dict:
+        stats = {
+            "hit_num": self.hit_num,
+            "miss_num": self.miss_num,
+            "fetch_bytes": self.fetch_bytes,
+            "evict_num": self.evict_num,
+        }
+        return stats
+
+    def saveStats(self) -> bool:
+        os.makedirs(self.stats_folder_path, exist_ok=True)
+
+        stats_file_path = self.stats_folder_path + str(os.getpid()) + ".json"
+        with open(stats_file_path, "w") as f:
+            json.dump(self.toStats(), f)
+        return True
+
+    def toNodeStats(self) -> dict:
+        node_stats = {
+            "hit_num": 0,
+            "miss_num": 0,
+            "fetch_bytes": 0,
+            "evict_num": 0,
+        }
+
+        if not os.path.exists(self.stats_folder_path):
+            return node_stats
+
+        for stats_file_name in os.listdir(self.stats_folder_path):
+            try:
+                with open(self.stats_folder_path + stats_file_name, "r") as f:
+                    stats = json.load(f)
+            except Exception:
+                continue
+
+            for key in node_stats.keys():
+                node_stats[key] += stats.get(key, 0)
+
+        access_num = node_stats["hit_num"] + node_stats["miss_num"]
+        node_stats["hit_rate"] = node_stats["hit_num"] / max(access_num, 1)
+        return node_stats
+
+    def evict(self) -> bool:
+        with FileLock(self.cache_folder_path + "evict.lock"):
+            file_info_list = []
+            total_bytes = 0
+            for root, _, files in os.walk(self.data_folder_path):
+                for file in files:
+                    if file.endswith(".lock") or file.endswith(".tmp"):
+                        continue
+
+                    file_path = root + "/" + file
+                    try:
+                        stat = os.stat(file_path)
+                    except FileNotFoundError:
+                        continue
+
+                    file_info_list.append([stat.st_mtime, stat.st_size, file_path])
+                    total_bytes += stat.st_size
+
+            if total_bytes <= self.max_size_bytes:
+                return True
+
+            target_bytes = int(self.max_size_bytes * 0.9)
+
+            file_info_list.sort(key=lambda x: x[0])
+            for _, file_size, file_path in file_info_list:
+                if total_bytes <= target_bytes:
+                    break
+
+                # skip the files which are being read or fetched right now
+                file_lock = FileLock(file_path + ".lock")
+                if not file_lock.acquire(False):
+                    continue
+
+                # the lock file is kept, so later fetches and reads lock the same inode
+                try:
+                    os.remove(file_path)
+                except FileNotFoundError:
+                    file_lock.release()
+                    continue
+
+                file_lock.release()
+
+                total_bytes -= file_size
+                self.evict_num += 1
+
+        return True
+
+    def fetch(self, file_path: str, local_file_path: str) -> bool:
+        createFileFolder(local_file_path)
+
+        with FileLock(local_file_path + ".lock"):
+            if os.path.exists(local_file_path):
+                return False
+
+            tmp_local_file_path = local_file_path + "." + str(os.getpid()) + ".tmp"
+            shutil.copyfile(file_path, tmp_local_file_path)
+            os.replace(tmp_local_file_path, local_file_path)
+
+        file_size = os.path.getsize(local_file_path)
+        self.fetch_bytes += file_size
+        self.unchecked_bytes += file_size
+        return True
+
+    def toLocalFilePath(self, file_path: str) -> str:
+        if not file_path.startswith(self.source_root_folder_path):
+            return file_path
+
+        local_file_path = self.data_folder_path + file_path[len(self.source_root_folder_path):]
+
+        if os.path.exists(local_file_path):
+            self.hit_num += 1
+            try:
+                os.utime(local_file_path)
+            except FileNotFoundError:
+                pass
+        else:
+            if self.unchecked_bytes >= self.evict_check_bytes:
+                self.evict()
+                self.unchecked_bytes = 0
+
+            if self.fetch(file_path, local_file_path):
+                self.miss_num += 1
+            else:
+                self.hit_num += 1
+
+        if self.stats_save_freq > 0 and (self.hit_num + self.miss_num) % self.stats_save_freq == 0:
+            self.saveStats()
+
+        return local_file_path
+
+    def load(self, file_path: str, load_func: Callable):
+        local_file_path = self.toLocalFilePath(file_path)
+        if local_file_path == file_path:
+            return load_func(file_path)
+
+        # the shared lock keeps evict() from removing the file while it is read
+        with FileLock(local_file_path + ".lock", shared=True):
+            if not os.path.exists(local_file_path):
+                return load_func(file_path)
+
+            return load_func(local_file_path)
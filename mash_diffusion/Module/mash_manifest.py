@@ -0,0 +1,117 @@
+import os
+import hashlib
+import numpy as np
+from typing import Union
+
+from mash_diffusion.Method.path import createFileFolder
+from mash_diffusion.Module.file_lock import FileLock
+
+
+# a category folder is listed again only if its mtime changed
+class MashManifest(object):
+    def __init__(
+        self,
+        mash_folder_path: str,
+        manifest_file_path: Union[str, None] = None,
+    ) -> None:
+        self.mash_folder_path = mash_folder_path
+
+        if manifest_file_path is None:
+            manifest_key = hashlib.md5(self.mash_folder_path.encode()).hexdigest()
+            manifest_file_path = "./output/index_cache/mash_" + manifest_key + ".npz"
+        self.manifest_file_path = manifest_file_path
+        return
+
+    def loadManifest(self) -> dict:
+        if not os.path.exists(self.manifest_file_path):
+            return {}
+
+        try:
+            with np.load(self.manifest_file_path) as manifest:
+                if str(manifest["mash_folder_path"]) != self.mash_folder_path:
+                    return {}
+
+                folder_keys = manifest["folder_keys"].tolist()
+                folder_mtimes = manifest["folder_mtimes"].tolist()
+                folder_starts = manifest["folder_starts"].tolist()
+                folder_nums = manifest["folder_nums"].tolist()
+                file_names = manifest["file_names"].tolist()
+        except Exception as e:
+            print("[WARN][MashManifest::loadManifest]")
+            print("\t load manifest failed, will rebuild it!")
+            print("\t error info:", e)
+            return {}
+
+        folder_dict = {}
+        for key, mtime_ns, start, num in zip(folder_keys, folder_mtimes, folder_starts, folder_nums):
+            folder_dict[key] = (mtime_ns, file_names[start : start + num])
+        return folder_dict
+
+    def saveManifest(self, folder_dict: dict) -> bool:
+        folder_keys = sorted(folder_dict.keys())
+
+        folder_mtimes = []
+        folder_starts = []
+        folder_nums = []
+        file_names = []
+        for key in folder_keys:
+            mtime_ns, file_name_list = folder_dict[key]
+            folder_mtimes.append(mtime_ns)
+            folder_starts.append(len(file_names))
+            folder_nums.append(len(file_name_list))
+            file_names += file_name_list
+
+        createFileFolder(self.manifest_file_path)
+
+        tmp_manifest_file_path = self.manifest_file_path + "." + str(os.getpid()) + ".tmp.npz"
+        np.savez(
+            tmp_manifest_file_path,
+            mash_folder_path=np.asarray(self.mash_folder_path),
+            folder_keys=np.asarray(folder_keys, dtype=str),
+            folder_mtimes=np.asarray(folder_mtimes, dtype=np.int64),
+            folder_starts=np.asarray(folder_starts, dtype=np.int64),
+            folder_nums=np.asarray(folder_nums, dtype=np.int64),
+            file_names=np.asarray(file_names, dtype=str),
+        )
+        os.replace(tmp_manifest_file_path, self.manifest_file_path)
+        return True
+
+    def listFolder(self, rel_folder_path: str, old_folder_dict: dict) -> Union[tuple, None]:
+        folder_path = self.mash_folder_path + rel_folder_path
+        if not os.path.exists(folder_path):
+            print("[ERROR][MashManifest::listFolder]")
+            print("\t folder not exist!")
+            print("\t folder_path:", folder_path)
+            return None
+
+        mtime_ns = os.stat(folder_path).st_mtime_ns
+
+        old_folder = old_folder_dict.get(rel_folder_path)
+        if old_folder is not None and old_folder[0] == mtime_ns:
+            return old_folder
+
+        file_name_list = sorted(os.listdir(folder_path))
+        return (mtime_ns, file_name_list)
+
+    def load(self, rel_folder_path_list: list) -> Union[list, None]:
+        with FileLock(self.manifest_file_path + ".lock"):
+            folder_dict = self.loadManifest()
+
+            folder_list = []
+            for rel_folder_path in rel_folder_path_list:
+                folder = self.listFolder(rel_folder_path, folder_dict)
+                if folder is None:
+                    return None
+
+                folder_list.append(folder)
+
+            is_changed = False
+            for rel_folder_path, folder in zip(rel_folder_path_list, folder_list):
+                if folder_dict.get(rel_folder_path) != folder:
+                    folder_dict[rel_folder_path] = folder
+                    is_changed = True
+
+            if is_changed:
+                self.saveManifest(folder_dict)
+
+        return [folder[1] for folder in folder_list]
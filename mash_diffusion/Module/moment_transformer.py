@@ -0,0 +1,74 @@
+import os
+import torch
+import numpy as np
+from typing import Union
+
+
+# (x - center) / scale per channel, fitted by TransformerFitter
+class MomentTransformer(object):
+    def __init__(
+        self,
+        center: Union[np.ndarray, None] = None,
+        scale: Union[np.ndarray, None] = None,
+    ) -> None:
+        self.center = center
+        self.scale = scale
+
+        self.tensor_dict = {}
+        return
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["tensor_dict"] = {}
+        return state
+
+    def getTensors(self, device: torch.device) -> tuple:
+        device = torch.device(device)
+
+        if device not in self.tensor_dict.keys():
+            self.tensor_dict[device] = (
+                torch.from_numpy(self.center).to(device),
+                torch.from_numpy(self.scale).to(device),
+            )
+
+        return self.tensor_dict[device]
+
+    def transform(
+        self, data: Union[torch.Tensor, np.ndarray], is_numpy: bool = False
+    ) -> Union[torch.Tensor, np.ndarray]:
+        if isinstance(data, np.ndarray):
+            return ((data - self.center) / self.scale).astype(data.dtype)
+
+        center, scale = self.getTensors(data.device)
+        return ((data - center) / scale).to(data.dtype)
+
+    def inverse_transform(
+        self, data: Union[torch.Tensor, np.ndarray], is_numpy: bool = False
+    ) -> Union[torch.Tensor, np.ndarray]:
+        if isinstance(data, np.ndarray):
+            return (data * self.scale + self.center).astype(data.dtype)
+
+        center, scale = self.getTensors(data.device)
+        return (data * scale + center).to(data.dtype)
+
+    def saveTransformer(self, save_file_path: str) -> bool:
+        save_folder_path = os.path.dirname(save_file_path)
+        if save_folder_path != "":
+            os.makedirs(save_folder_path, exist_ok=True)
+
+        np.savez(save_file_path, center=self.center, scale=self.scale)
+        return True
+
+    def loadTransformer(self, transformer_file_path: str) -> bool:
+        if not os.path.exists(transformer_file_path):
+            print("[ERROR][MomentTransformer::loadTransformer]")
+            print("\t transformer file not exist!")
+            print("\t transformer_file_path:", transformer_file_path)
+            return False
+
+        with np.load(transformer_file_path) as transformer_data:
+            self.center = transformer_data["center"].astype(np.float32)
+            self.scale = transformer_data["scale"].astype(np.float32)
+
+        self.tensor_dict = {}
+        return True
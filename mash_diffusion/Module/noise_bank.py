@@ -0,0 +1,110 @@
+import os
+import json
+import torch
+import numpy as np
+from typing import Union
+
+from mash_diffusion.Module.worker_rng import WorkerRNG
+from mash_diffusion.Module.target_ot_plan_sampler import solveAssignment
+
+
+META_FILE_NAME = "meta.json"
+SEEDS_FILE_NAME = "seeds.npy"
+PERMUTATIONS_FILE_NAME = "permutations.npy"
+
+
+def toNoise(seed: int, anchor_num: int, channel_num: int) -> torch.Tensor:
+    generator = torch.Generator().manual_seed(int(seed))
+    return torch.randn([anchor_num, channel_num], generator=generator)
+
+
+# mash_params[idxs] is matched to noise
+def solveCoupling(noise: torch.Tensor, mash_params: torch.Tensor) -> np.ndarray:
+    M = torch.cdist(noise.float(), mash_params.float()) ** 2
+    return solveAssignment(M.numpy()).astype(np.uint16)
+
+
+# seeds [M, D] and permutations [M, D, N] of exact couplings to the mash in file order,
+# the bank is read-only and refreshed couplings only live in the process that solved them
+class NoiseBank(object):
+    def __init__(self, bank_folder_path: str, refresh_prob: float = 0.0) -> None:
+        self.bank_folder_path = bank_folder_path
+        self.refresh_prob = refresh_prob
+
+        self.meta = self.loadMeta()
+
+        self.worker_rng = WorkerRNG("train")
+
+        self.seeds = None
+        self.permutations = None
+        self.refreshed_dict = {}
+        return
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["seeds"] = None
+        state["permutations"] = None
+        state["refreshed_dict"] = {}
+        return state
+
+    def loadMeta(self) -> Union[dict, None]:
+        meta_file_path = self.bank_folder_path + META_FILE_NAME
+        if not os.path.exists(meta_file_path):
+            print("[ERROR][NoiseBank::loadMeta]")
+            print("\t meta file not exist!")
+            print("\t meta_file_path:", meta_file_path)
+            return None
+
+        with open(meta_file_path, "r") as f:
+            return json.load(f)
+
+    def isValid(self) -> bool:
+        return self.meta is not None
+
+    def open(self) -> bool:
+        if self.seeds is not None:
+            return True
+
+        self.seeds = np.load(self.bank_folder_path + SEEDS_FILE_NAME, mmap_mode="r")
+        self.permutations = np.load(
+            self.bank_folder_path + PERMUTATIONS_FILE_NAME, mmap_mode="r"
+        )
+        return True
+
+    def refresh(self, object_idx: int, draw_idx: int, mash_params: torch.Tensor) -> tuple:
+        seed = int(self.worker_rng.get().integers(0, np.iinfo(np.int64).max))
+
+        noise = toNoise(seed, self.meta["anchor_num"], self.meta["channel_num"])
+        permutation = solveCoupling(noise, mash_params)
+
+        self.refreshed_dict[(object_idx, draw_idx)] = (seed, permutation)
+        return noise, permutation
+
+    def loadCoupling(self, object_idx: int, draw_idx: int) -> tuple:
+        if (object_idx, draw_idx) in self.refreshed_dict.keys():
+            return self.refreshed_dict[(object_idx, draw_idx)]
+
+        return (
+            int(self.seeds[object_idx, draw_idx]),
+            np.array(self.permutations[object_idx, draw_idx]),
+        )
+
+    def drawCoupling(self, object_idx: int, mash_params: torch.Tensor) -> tuple:
+        self.open()
+
+        rng = self.worker_rng.get()
+
+        draw_idx = int(rng.integers(self.meta["draw_num"]))
+
+        if self.refresh_prob > 0 and rng.random() < self.refresh_prob:
+            noise, permutation = self.refresh(object_idx, draw_idx, mash_params)
+        else:
+            seed, permutation = self.loadCoupling(object_idx, draw_idx)
+            noise = toNoise(seed, self.meta["anchor_num"], self.meta["channel_num"])
+
+            if np.bincount(permutation, minlength=permutation.shape[0]).max() != 1:
+                permutation = solveCoupling(noise, mash_params)
+
+        x1 = mash_params[torch.from_numpy(permutation.astype(np.int64))]
+
+        return noise.to(mash_params.dtype), x1
@@ -0,0 +1,120 @@
+import os
+import json
+import numpy as np
+from tqdm import tqdm
+from multiprocessing import Pool
+from torch.utils.data import Dataset
+
+from mash_diffusion.Method.transformer import toTransformerHash
+from mash_diffusion.Module.noise_bank import (
+    META_FILE_NAME,
+    SEEDS_FILE_NAME,
+    PERMUTATIONS_FILE_NAME,
+    toNoise,
+    solveCoupling,
+)
+
+
+worker_dataset = None
+
+
+def initBankWorker(dataset: Dataset) -> None:
+    global worker_dataset
+    worker_dataset = dataset
+    worker_dataset.permute_anchors = False
+    return
+
+
+def buildObjectCouplings(task: tuple) -> tuple:
+    object_idx, seed_list = task
+
+    # skip the condition loading of embedding datasets
+    if hasattr(worker_dataset, "loadMashParams"):
+        mash_params = worker_dataset.loadMashParams(worker_dataset.paths_list[object_idx][0])
+    else:
+        mash_params = worker_dataset[object_idx]["mash_params"]
+
+    mash_params = mash_params.float()
+
+    permutation_list = []
+    for seed in seed_list:
+        noise = toNoise(seed, mash_params.shape[0], mash_params.shape[1])
+        permutation_list.append(solveCoupling(noise, mash_params))
+
+    return object_idx, np.stack(permutation_list, axis=0)
+
+
+class NoiseBankBuilder(object):
+    def __init__(
+        self,
+        dataset: Dataset,
+        bank_folder_path: str,
+        draw_num: int = 16,
+        anchor_num: int = 400,
+        channel_num: int = 25,
+        seed: int = 0,
+    ) -> None:
+        self.dataset = dataset
+        self.bank_folder_path = bank_folder_path
+        self.draw_num = draw_num
+        self.anchor_num = anchor_num
+        self.channel_num = channel_num
+        self.seed = seed
+        return
+
+    def toMeta(self) -> dict:
+        # single shape datasets repeat one object
+        object_num = 1
+        if hasattr(self.dataset, "paths_list"):
+            object_num = len(self.dataset.paths_list)
+
+        meta = {
+            "object_num": object_num,
+            "draw_num": self.draw_num,
+            "anchor_num": self.anchor_num,
+            "channel_num": self.channel_num,
+            "seed": self.seed,
+        }
+
+        if hasattr(self.dataset, "transformer"):
+            meta["transformer_hash"] = toTransformerHash(self.dataset.transformer)
+
+        return meta
+
+    def build(self, worker_num: int = 16) -> bool:
+        os.makedirs(self.bank_folder_path, exist_ok=True)
+
+        meta = self.toMeta()
+        object_num = meta["object_num"]
+
+        seeds = np.random.default_rng(self.seed).integers(
+            0, np.iinfo(np.int64).max, size=[object_num, self.draw_num], dtype=np.int64
+        )
+        np.save(self.bank_folder_path + SEEDS_FILE_NAME, seeds)
+
+        permutations = np.lib.format.open_memmap(
+            self.bank_folder_path + PERMUTATIONS_FILE_NAME,
+            mode="w+",
+            dtype=np.uint16,
+            shape=(object_num, self.draw_num, self.anchor_num),
+        )
+
+        task_list = [[i, seeds[i].tolist()] for i in range(object_num)]
+
+        print("[INFO][NoiseBankBuilder::build]")
+        print("\t start solve", object_num, "x", self.draw_num, "noise couplings...")
+        with Pool(worker_num, initializer=initBankWorker, initargs=(self.dataset,)) as pool:
+            for object_idx, object_permutations in tqdm(
+                pool.imap_unordered(buildObjectCouplings, task_list, chunksize=16),
+                total=len(task_list),
+            ):
+                permutations[object_idx] = object_permutations
+
+        permutations.flush()
+        del permutations
+
+        # the meta is written last and marks a finished bank
+        with open(self.bank_folder_path + META_FILE_NAME, "w") as f:
+            json.dump(meta, f, indent=4)
+
+        return True
@@ -0,0 +1,146 @@
+import os
+import json
+import torch
+import numpy as np
+from tqdm import tqdm
+from typing import Union
+from multiprocessing import Pool
+
+from ma_sh.Method.io import loadMashFileParamsTensor
+
+from mash_diffusion.Method.path import createFileFolder
+from mash_diffusion.Method.transformer import getMashTransformer, toTransformerHash
+
+
+HEADER_FILE_NAME = "header.json"
+
+worker_transformer = None
+
+
+def initCacheWorker(transformer_id: str) -> None:
+    global worker_transformer
+    worker_transformer = getMashTransformer(transformer_id)
+    return
+
+
+def cacheMashFile(file_pair: tuple) -> bool:
+    mash_file_path, cache_file_path = file_pair
+
+    if os.path.exists(cache_file_path):
+        if os.path.getmtime(cache_file_path) >= os.path.getmtime(mash_file_path):
+            return True
+
+    try:
+        mash_params = loadMashFileParamsTensor(mash_file_path, torch.float32, "cpu")
+    except Exception as e:
+        print("[WARN][normalized_cache::cacheMashFile]")
+        print("\t load mash file failed, skipped!")
+        print("\t mash_file_path:", mash_file_path)
+        print("\t error info:", e)
+        return False
+
+    mash_params = worker_transformer.transform(mash_params, False)
+
+    createFileFolder(cache_file_path)
+
+    tmp_cache_file_path = cache_file_path[:-4] + "_tmp.npy"
+    np.save(tmp_cache_file_path, mash_params.numpy().astype(np.float32))
+    os.replace(tmp_cache_file_path, cache_file_path)
+    return True
+
+
+# the header records which transformer produced the cached params
+class NormalizedMashCache(object):
+    def __init__(
+        self,
+        cache_folder_path: str,
+        mash_folder_path: str,
+        transformer_id: str,
+    ) -> None:
+        self.cache_folder_path = cache_folder_path
+        self.mash_folder_path = mash_folder_path
+        self.transformer_id = transformer_id
+
+        self.transformer = getMashTransformer(self.transformer_id)
+        assert self.transformer is not None
+
+        self.transformer_hash = toTransformerHash(self.transformer)
+
+        self.is_valid = self.checkHeader()
+        return
+
+    def toHeader(self) -> dict:
+        header = {
+            "transformer_id": self.transformer_id,
+            "transformer_hash": self.transformer_hash,
+            "dtype": "float32",
+        }
+        return header
+
+    def checkHeader(self) -> bool:
+        header_file_path = self.cache_folder_path + HEADER_FILE_NAME
+        if not os.path.exists(header_file_path):
+            return False
+
+        with open(header_file_path, "r") as f:
+            header = json.load(f)
+
+        return header == self.toHeader()
+
+    def toCacheFilePath(self, mash_file_path: str) -> str:
+        return self.cache_folder_path + os.path.relpath(mash_file_path, self.mash_folder_path)
+
+    def load(self, mash_file_path: str) -> Union[torch.Tensor, None]:
+        if not self.is_valid:
+            return None
+
+        cache_file_path = self.toCacheFilePath(mash_file_path)
+
+        try:
+            if os.path.getmtime(cache_file_path) < os.path.getmtime(mash_file_path):
+                return None
+
+            mash_params = np.load(cache_file_path)
+        except Exception:
+            return None
+
+        return torch.from_numpy(mash_params)
+
+    def build(self, mash_file_path_list: list, worker_num: int = 16) -> bool:
+        os.makedirs(self.cache_folder_path, exist_ok=True)
+
+        header_file_path = self.cache_folder_path + HEADER_FILE_NAME
+        if os.path.exists(header_file_path) and not self.checkHeader():
+            print("[WARN][NormalizedMashCache::build]")
+            print("\t transformer changed, rebuild all cache files!")
+            os.remove(header_file_path)
+            force_rebuild = True
+        else:
+            force_rebuild = False
+
+        file_pair_list = []
+        for mash_file_path in mash_file_path_list:
+            cache_file_path = self.toCacheFilePath(mash_file_path)
+            if force_rebuild and os.path.exists(cache_file_path):
+                os.remove(cache_file_path)
+            file_pair_list.append([mash_file_path, cache_file_path])
+
+        print("[INFO][NormalizedMashCache::build]")
+        print("\t start pre-normalize mash files...")
+        with Pool(worker_num, initializer=initCacheWorker, initargs=(self.transformer_id,)) as pool:
+            result_list = list(
+                tqdm(
+                    pool.imap(cacheMashFile, file_pair_list, chunksize=64),
+                    total=len(file_pair_list),
+                )
+            )
+
+        with open(header_file_path, "w") as f:
+            json.dump(self.toHeader(), f, indent=4)
+
+        self.is_valid = True
+
+        print("[INFO][NormalizedMashCache::build]")
+        print("\t pre-normalize finished!")
+        print("\t valid file num:", sum(result_list), "/", len(result_list))
+        return True
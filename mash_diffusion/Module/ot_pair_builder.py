@@ -0,0 +1,82 @@
+import torch
+from typing import Union
+
+from mash_diffusion.Module.noise_bank import NoiseBank
+
+
+# with a noise bank the dataset keeps the file order, permute_anchors permutes the pair
+class OTPairBuilder(object):
+    def __init__(
+        self,
+        flow_matcher,
+        fix_params: bool = False,
+        draw_num: int = 1,
+        noise_bank: Union[NoiseBank, None] = None,
+        permute_anchors: bool = False,
+    ) -> None:
+        self.flow_matcher = flow_matcher
+        self.fix_params = fix_params
+        self.draw_num = draw_num
+        self.noise_bank = noise_bank
+        self.permute_anchors = permute_anchors
+        return
+
+    def buildBankPair(self, mash_params: torch.Tensor, object_idx: int) -> tuple:
+        x0, x1 = self.noise_bank.drawCoupling(object_idx, mash_params.float())
+
+        if self.permute_anchors:
+            permute_idxs = torch.randperm(x0.shape[0])
+            x0 = x0[permute_idxs]
+            x1 = x1[permute_idxs]
+
+        x0 = x0.unsqueeze(0)
+        x1 = x1.unsqueeze(0)
+
+        if self.fix_params:
+            fixed_prob = 2.0 * torch.rand([]).item() - 1.0
+            fixed_prob = max(fixed_prob, 0.0)
+
+            if fixed_prob > 0:
+                fixed_mask = torch.rand_like(x1) <= fixed_prob
+                x0[fixed_mask] = x1[fixed_mask]
+
+        t = torch.rand([1])
+        eps = self.flow_matcher.sample_noise_like(x0)
+        xt = self.flow_matcher.sample_xt(x0, x1, t, eps)
+        ut = x1 - x0
+
+        return t[0], xt[0], ut[0]
+
+    def buildPair(self, mash_params: torch.Tensor, object_idx: Union[int, None] = None) -> tuple:
+        if self.noise_bank is not None and object_idx is not None:
+            return self.buildBankPair(mash_params, object_idx)
+
+        x1 = mash_params.float().unsqueeze(0)
+
+        x0 = torch.randn_like(x1)
+
+        if self.fix_params:
+            fixed_prob = 2.0 * torch.rand([]).item() - 1.0
+            fixed_prob = max(fixed_prob, 0.0)
+
+            if fixed_prob > 0:
+                fixed_mask = torch.rand_like(x1) <= fixed_prob
+                x0[fixed_mask] = x1[fixed_mask]
+
+        t, xt, ut = self.flow_matcher.sample_location_and_conditional_flow(x0, x1)
+
+        return t[0], xt[0], ut[0]
+
+    def __call__(self, data: dict, object_idx: Union[int, None] = None) -> dict:
+        pair_list = [
+            self.buildPair(data["mash_params"], object_idx) for _ in range(self.draw_num)
+        ]
+
+        if self.draw_num == 1:
+            data["t"], data["xt"], data["ut"] = pair_list[0]
+            return data
+
+        data["t"], data["xt"], data["ut"] = [
+            torch.stack(values, dim=0) for values in zip(*pair_list)
+        ]
+        return data
@@ -0,0 +1,47 @@
+import multiprocessing
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+
+
+# thread for solvers which release the GIL, process for the others
+class OTSolverPool(object):
+    def __init__(self, worker_num: int = 1, pool_type: str = "thread") -> None:
+        assert pool_type in ["thread", "process"]
+
+        self.worker_num = worker_num
+        self.pool_type = pool_type
+
+        self.executor = None
+        return
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["executor"] = None
+        return state
+
+    def getExecutor(self) -> Executor:
+        if self.executor is None:
+            if self.pool_type == "thread":
+                self.executor = ThreadPoolExecutor(self.worker_num)
+            else:
+                # forked workers can not use cuda once the parent has initialised it
+                self.executor = ProcessPoolExecutor(
+                    self.worker_num, mp_context=multiprocessing.get_context("spawn")
+                )
+
+        return self.executor
+
+    def map(self, func, task_list: list) -> list:
+        if self.worker_num <= 1 or len(task_list) <= 1:
+            return [func(task) for task in task_list]
+
+        return list(self.getExecutor().map(func, task_list))
+
+    def close(self) -> bool:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        return True
+
+    def __del__(self) -> None:
+        self.close()
+        return
@@ -0,0 +1,92 @@
+import numpy as np
+from typing import Union
+
+
+# paths in one byte buffer plus offsets, forked workers do not copy its pages
+class PathIndex(object):
+    def __init__(
+        self,
+        paths_list: list = [],
+        mash_prefix: str = "",
+        view_prefix: str = "",
+    ) -> None:
+        self.mash_prefix = mash_prefix
+        self.view_prefix = view_prefix
+
+        self.path_bytes = np.zeros([0], dtype=np.uint8)
+        self.path_starts = np.zeros([1], dtype=np.int64)
+
+        # strings of object i: its mash path, then object_view_nums[i] view paths
+        self.object_starts = np.zeros([0], dtype=np.int64)
+        self.object_view_nums = np.zeros([0], dtype=np.int64)
+
+        if len(paths_list) > 0:
+            self.loadPathsList(paths_list)
+        return
+
+    def toRelPath(self, path: str, prefix: str) -> bytes:
+        assert path.startswith(prefix)
+        return path[len(prefix):].encode()
+
+    def loadPathsList(self, paths_list: list) -> bool:
+        rel_path_list = []
+        object_starts = []
+        object_view_nums = []
+
+        for mash_file_path, view_file_path_list in paths_list:
+            object_starts.append(len(rel_path_list))
+            object_view_nums.append(len(view_file_path_list))
+
+            rel_path_list.append(self.toRelPath(mash_file_path, self.mash_prefix))
+            for view_file_path in view_file_path_list:
+                rel_path_list.append(self.toRelPath(view_file_path, self.view_prefix))
+
+        path_lengths = np.fromiter(
+            (len(rel_path) for rel_path in rel_path_list),
+            dtype=np.int64,
+            count=len(rel_path_list),
+        )
+
+        self.path_bytes = np.frombuffer(b"".join(rel_path_list), dtype=np.uint8)
+        self.path_starts = np.zeros([len(rel_path_list) + 1], dtype=np.int64)
+        np.cumsum(path_lengths, out=self.path_starts[1:])
+
+        self.object_starts = np.asarray(object_starts, dtype=np.int64)
+        self.object_view_nums = np.asarray(object_view_nums, dtype=np.int64)
+        return True
+
+    def toPath(self, path_idx: int) -> str:
+        start = self.path_starts[path_idx]
+        end = self.path_starts[path_idx + 1]
+        return self.path_bytes[start:end].tobytes().decode()
+
+    def toSubIndex(self, object_idxs: Union[slice, np.ndarray]):
+        sub_index = PathIndex(mash_prefix=self.mash_prefix, view_prefix=self.view_prefix)
+        sub_index.path_bytes = self.path_bytes
+        sub_index.path_starts = self.path_starts
+        sub_index.object_starts = self.object_starts[object_idxs]
+        sub_index.object_view_nums = self.object_view_nums[object_idxs]
+        return sub_index
+
+    def getMashFilePath(self, index: int) -> str:
+        return self.mash_prefix + self.toPath(self.object_starts[index])
+
+    def getViewFilePathList(self, index: int) -> list:
+        object_start = self.object_starts[index]
+        return [
+            self.view_prefix + self.toPath(object_start + 1 + i)
+            for i in range(self.object_view_nums[index])
+        ]
+
+    def __len__(self):
+        return self.object_starts.shape[0]
+
+    def __getitem__(self, index):
+        if isinstance(index, (slice, np.ndarray, list)):
+            return self.toSubIndex(index)
+
+        return [self.getMashFilePath(index), self.getViewFilePathList(index)]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
@@ -0,0 +1,186 @@
+import os
+import torch
+import numpy as np
+from tqdm import tqdm
+
+from ma_sh.Method.io import loadMashFileParamsTensor
+
+from mash_diffusion.Dataset.mash import MashDataset
+from mash_diffusion.Dataset.embedding import EmbeddingDataset
+from mash_diffusion.Method.shard import SHARD_INDEX_FILE_NAME, saveShardMeta
+from mash_diffusion.Module.shard_writer import ShardWriter
+
+
+class ShardPacker(object):
+    def __init__(
+        self,
+        save_shard_folder_path: str,
+        mash_dtype: str = "float32",
+        embedding_dtype: str = "float32",
+        compress: bool = False,
+        max_shard_size_mb: float = 1024.0,
+    ) -> None:
+        self.save_shard_folder_path = save_shard_folder_path
+        self.mash_dtype = mash_dtype
+        self.embedding_dtype = embedding_dtype
+        self.compress = compress
+        self.max_shard_size_mb = max_shard_size_mb
+        return
+
+    def createWriter(self, stream_name: str, dtype: str) -> ShardWriter:
+        return ShardWriter(
+            self.save_shard_folder_path,
+            stream_name,
+            dtype,
+            self.compress,
+            max_shard_size_mb=self.max_shard_size_mb,
+        )
+
+    def loadMashParams(self, mash_file_path: str) -> np.ndarray:
+        mash_params = loadMashFileParamsTensor(mash_file_path, torch.float32, "cpu")
+        return mash_params.numpy()
+
+    def loadEmbedding(self, embedding_file_path: str, embedding_key: str) -> np.ndarray:
+        return np.load(embedding_file_path, allow_pickle=True).item()[embedding_key]
+
+    def saveIndex(self, index_dict: dict) -> bool:
+        np.savez(self.save_shard_folder_path + SHARD_INDEX_FILE_NAME, **index_dict)
+        return True
+
+    def packEmbeddingDataset(self, dataset: EmbeddingDataset) -> bool:
+        mash_writer = self.createWriter("mash", self.mash_dtype)
+        embedding_writer = self.createWriter("embedding", self.embedding_dtype)
+
+        object_name_list = []
+        mash_record_idx_list = []
+        view_start_list = []
+        view_num_list = []
+
+        print("[INFO][ShardPacker::packEmbeddingDataset]")
+        print("\t start pack mash and embedding files...")
+        for mash_file_path, embedding_file_path_list in tqdm(dataset.paths_list):
+            if not os.path.exists(mash_file_path):
+                continue
+
+            embedding_list = []
+            for embedding_file_path in embedding_file_path_list:
+                try:
+                    embedding = self.loadEmbedding(
+                        embedding_file_path, dataset.embedding_key
+                    )
+                except KeyboardInterrupt:
+                    print("[INFO][ShardPacker::packEmbeddingDataset]")
+                    print("\t stopped by the user (Ctrl+C).")
+                    exit()
+                except Exception as e:
+                    print("[WARN][ShardPacker::packEmbeddingDataset]")
+                    print("\t this npy file is not valid, skipped!")
+                    print("\t embedding_file_path:", embedding_file_path)
+                    print("\t error info:", e)
+                    continue
+
+                embedding_list.append(embedding)
+
+            if len(embedding_list) == 0:
+                continue
+
+            mash_params = self.loadMashParams(mash_file_path)
+
+            # all views of one object stay contiguous in the same shard
+            view_start = embedding_writer.addArrays(embedding_list)
+            mash_record_idx = mash_writer.addArray(mash_params)
+
+            object_name_list.append(
+                os.path.relpath(mash_file_path, dataset.mash_folder_path)
+            )
+            mash_record_idx_list.append(mash_record_idx)
+            view_start_list.append(view_start)
+            view_num_list.append(len(embedding_list))
+
+        mash_writer.close()
+        embedding_writer.close()
+
+        self.saveIndex(
+            {
+                "object_names": np.asarray(object_name_list, dtype=str),
+                "mash_records": mash_writer.toRecords(),
+                "embedding_records": embedding_writer.toRecords(),
+                "object_mash_record_idxs": np.asarray(mash_record_idx_list, dtype=np.int64),
+                "object_view_starts": np.asarray(view_start_list, dtype=np.int64),
+                "object_view_nums": np.asarray(view_num_list, dtype=np.int64),
+            }
+        )
+
+        meta = {
+            "dataset_type": "embedding",
+            "transformer_id": dataset.transformer_id,
+            "embedding_key": dataset.embedding_key,
+            "object_num": len(object_name_list),
+            "streams": {
+                "mash": mash_writer.toMeta(),
+                "embedding": embedding_writer.toMeta(),
+            },
+        }
+        saveShardMeta(self.save_shard_folder_path, meta)
+
+        print("[INFO][ShardPacker::packEmbeddingDataset]")
+        print("\t pack finished!")
+        print("\t object_num:", len(object_name_list))
+        print("\t save_shard_folder_path:", self.save_shard_folder_path)
+        return True
+
+    def packMashDataset(self, dataset: MashDataset) -> bool:
+        mash_writer = self.createWriter("mash", self.mash_dtype)
+
+        object_name_list = []
+        mash_record_idx_list = []
+        category_id_list = []
+
+        print("[INFO][ShardPacker::packMashDataset]")
+        print("\t start pack mash files...")
+        for mash_file_path, category_id in tqdm(dataset.paths_list):
+            try:
+                mash_params = self.loadMashParams(mash_file_path)
+            except KeyboardInterrupt:
+                print("[INFO][ShardPacker::packMashDataset]")
+                print("\t stopped by the user (Ctrl+C).")
+                exit()
+            except Exception as e:
+                print("[WARN][ShardPacker::packMashDataset]")
+                print("\t this npy file is not valid, skipped!")
+                print("\t mash_file_path:", mash_file_path)
+                print("\t error info:", e)
+                continue
+
+            object_name_list.append(
+                os.path.relpath(mash_file_path, dataset.mash_folder_path)
+            )
+            mash_record_idx_list.append(mash_writer.addArray(mash_params))
+            category_id_list.append(category_id)
+
+        mash_writer.close()
+
+        self.saveIndex(
+            {
+                "object_names": np.asarray(object_name_list, dtype=str),
+                "mash_records": mash_writer.toRecords(),
+                "object_mash_record_idxs": np.asarray(mash_record_idx_list, dtype=np.int64),
+                "category_ids": np.asarray(category_id_list, dtype=np.int64),
+            }
+        )
+
+        meta = {
+            "dataset_type": "mash",
+            "transformer_id": dataset.transformer_id,
+            "object_num": len(object_name_list),
+            "streams": {
+                "mash": mash_writer.toMeta(),
+            },
+        }
+        saveShardMeta(self.save_shard_folder_path, meta)
+
+        print("[INFO][ShardPacker::packMashDataset]")
+        print("\t pack finished!")
+        print("\t object_num:", len(object_name_list))
+        print("\t save_shard_folder_path:", self.save_shard_folder_path)
+        return True
@@ -0,0 +1,100 @@
+import os
+import zlib
+import numpy as np
+from typing import Union
+
+from mash_diffusion.Method.shard import (
+    toNumpyDType,
+    toRecordShape,
+    toShardFilePath,
+)
+
+
+class ShardReader(object):
+    def __init__(
+        self,
+        shard_folder_path: str,
+        stream_name: str,
+        records: np.ndarray,
+        dtype: str = "float32",
+        compress: bool = False,
+    ) -> None:
+        self.shard_folder_path = shard_folder_path
+        self.stream_name = stream_name
+        self.records = records
+        self.dtype = dtype
+        self.compress = compress
+
+        self.np_dtype = toNumpyDType(self.dtype)
+
+        # opened lazily, so each dataloader worker maps the shards by itself
+        self.shard_buffer_dict = {}
+        return
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["shard_buffer_dict"] = {}
+        return state
+
+    def __len__(self) -> int:
+        return self.records.shape[0]
+
+    def getShardBuffer(self, shard_idx: int) -> np.memmap:
+        if shard_idx not in self.shard_buffer_dict.keys():
+            shard_file_path = toShardFilePath(
+                self.shard_folder_path, self.stream_name, shard_idx
+            )
+            assert os.path.exists(shard_file_path)
+
+            # copy-on-write mapping keeps reads zero-copy while handing out
+            # writable arrays, which torch.from_numpy expects
+            self.shard_buffer_dict[shard_idx] = np.memmap(
+                shard_file_path, dtype=np.uint8, mode="c"
+            )
+
+        return self.shard_buffer_dict[shard_idx]
+
+    def read(self, record_idx: int) -> np.ndarray:
+        record = self.records[record_idx]
+
+        shard_idx = int(record[0])
+        byte_offset = int(record[1])
+        byte_num = int(record[2])
+        shape = toRecordShape(record)
+
+        shard_buffer = self.getShardBuffer(shard_idx)
+        data = shard_buffer[byte_offset : byte_offset + byte_num]
+
+        if self.compress:
+            data = np.frombuffer(
+                bytearray(zlib.decompress(data.tobytes())), dtype=np.uint8
+            )
+
+        return data.view(self.np_dtype).reshape(shape)
+
+    # one view when the records are contiguous, a list when their shapes differ
+    def readRange(self, first_record_idx: int, record_num: int) -> Union[np.ndarray, list]:
+        records = self.records[first_record_idx : first_record_idx + record_num]
+
+        is_contiguous = (
+            not self.compress
+            and np.all(records[:, 0] == records[0, 0])
+            and np.all(records[1:, 1] == records[:-1, 1] + records[:-1, 2])
+            and np.all(records[:, 3:] == records[0, 3:])
+        )
+
+        if not is_contiguous:
+            array_list = [self.read(first_record_idx + i) for i in range(record_num)]
+
+            if not np.all(records[:, 3:] == records[0, 3:]):
+                return array_list
+
+            return np.stack(array_list, axis=0)
+
+        shard_buffer = self.getShardBuffer(int(records[0, 0]))
+        byte_offset = int(records[0, 1])
+        byte_num = int(records[:, 2].sum())
+
+        data = shard_buffer[byte_offset : byte_offset + byte_num]
+
+        return data.view(self.np_dtype).reshape((record_num,) + toRecordShape(records[0]))
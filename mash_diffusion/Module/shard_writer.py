@@ -0,0 +1,118 @@
+import os
+import zlib
+import numpy as np
+from typing import Union
+
+from mash_diffusion.Method.shard import (
+    RECORD_SIZE,
+    SHARD_ALIGN_BYTES,
+    toStoredArray,
+    toShardFilePath,
+)
+
+
+class ShardWriter(object):
+    def __init__(
+        self,
+        shard_folder_path: str,
+        stream_name: str,
+        dtype: str = "float32",
+        compress: bool = False,
+        compress_level: int = 6,
+        max_shard_size_mb: float = 1024.0,
+    ) -> None:
+        self.shard_folder_path = shard_folder_path
+        self.stream_name = stream_name
+        self.dtype = dtype
+        self.compress = compress
+        self.compress_level = compress_level
+        self.max_shard_bytes = int(max_shard_size_mb * 1024 * 1024)
+
+        self.shard_idx = -1
+        self.shard_file = None
+        self.shard_bytes = 0
+
+        self.record_list = []
+
+        os.makedirs(self.shard_folder_path, exist_ok=True)
+        return
+
+    def openNextShard(self) -> bool:
+        self.close()
+
+        self.shard_idx += 1
+        shard_file_path = toShardFilePath(
+            self.shard_folder_path, self.stream_name, self.shard_idx
+        )
+        self.shard_file = open(shard_file_path, "wb")
+        self.shard_bytes = 0
+        return True
+
+    def close(self) -> bool:
+        if self.shard_file is not None:
+            self.shard_file.close()
+            self.shard_file = None
+        return True
+
+    def toBytes(self, array: np.ndarray) -> bytes:
+        data = toStoredArray(array, self.dtype).tobytes()
+
+        if self.compress:
+            data = zlib.compress(data, self.compress_level)
+
+        return data
+
+    def writeBytes(self, data: bytes, shape: tuple) -> int:
+        assert len(shape) <= RECORD_SIZE - 4
+
+        pad_bytes = (-self.shard_bytes) % SHARD_ALIGN_BYTES
+        if pad_bytes > 0:
+            self.shard_file.write(b"\0" * pad_bytes)
+            self.shard_bytes += pad_bytes
+
+        record = [self.shard_idx, self.shard_bytes, len(data), len(shape)]
+        record += list(shape) + [0] * (RECORD_SIZE - 4 - len(shape))
+
+        self.shard_file.write(data)
+        self.shard_bytes += len(data)
+
+        self.record_list.append(record)
+        return len(self.record_list) - 1
+
+    # arrays written together stay in one shard and can be read as one range
+    def addArrays(self, array_list: list) -> Union[int, None]:
+        if len(array_list) == 0:
+            return None
+
+        data_list = [self.toBytes(array) for array in array_list]
+        group_bytes = sum(len(data) + SHARD_ALIGN_BYTES for data in data_list)
+
+        if self.shard_file is None or (
+            self.shard_bytes > 0
+            and self.shard_bytes + group_bytes > self.max_shard_bytes
+        ):
+            self.openNextShard()
+
+        first_record_idx = len(self.record_list)
+        for data, array in zip(data_list, array_list):
+            self.writeBytes(data, array.shape)
+
+        return first_record_idx
+
+    def addArray(self, array: np.ndarray) -> int:
+        return self.addArrays([array])
+
+    def toRecords(self) -> np.ndarray:
+        if len(self.record_list) == 0:
+            return np.zeros([0, RECORD_SIZE], dtype=np.int64)
+
+        return np.asarray(self.record_list, dtype=np.int64)
+
+    def toMeta(self) -> dict:
+        meta = {
+            "dtype": self.dtype,
+            "compress": self.compress,
+            "shard_num": self.shard_idx + 1,
+            "record_num": len(self.record_list),
+        }
+        return meta
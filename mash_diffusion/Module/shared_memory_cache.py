@@ -0,0 +1,181 @@
+import os
+import time
+import fcntl
+import torch
+import hashlib
+import numpy as np
+from typing import Union
+
+from mash_diffusion.Module.file_lock import FileLock
+
+
+# set-associative LRU slots in /dev/shm, reads check a per-slot version instead of locking
+class SharedMemoryCache(object):
+    def __init__(
+        self,
+        cache_name: str,
+        max_size_mb: float = 1024.0,
+        way_num: int = 4,
+        shm_folder_path: str = "/dev/shm/",
+    ) -> None:
+        self.cache_name = cache_name
+        self.max_size_bytes = int(max_size_mb * 1024 * 1024)
+        self.way_num = way_num
+        self.shm_folder_path = shm_folder_path
+
+        self.item_shape = None
+        self.set_num = 0
+        self.slot_num = 0
+
+        # opened lazily in each process
+        self.meta = None
+        self.data = None
+        self.lock_fd = None
+
+        self.hit_num = 0
+        self.miss_num = 0
+        return
+
+    def __getstate__(self) -> dict:
+        state = self.__dict__.copy()
+        state["meta"] = None
+        state["data"] = None
+        state["lock_fd"] = None
+        return state
+
+    def toCacheFilePath(self) -> str:
+        shape_str = "x".join([str(dim) for dim in self.item_shape])
+        return self.shm_folder_path + self.cache_name + "_" + shape_str + ".bin"
+
+    def open(self, item_shape: tuple) -> bool:
+        if self.meta is not None:
+            return True
+
+        self.item_shape = tuple(item_shape)
+
+        item_bytes = int(np.prod(self.item_shape)) * 4
+        self.set_num = max(self.max_size_bytes // (item_bytes * self.way_num), 1)
+        self.slot_num = self.set_num * self.way_num
+
+        # versions, tags, stamps
+        meta_bytes = 3 * 8 * self.slot_num
+        file_bytes = meta_bytes + item_bytes * self.slot_num
+
+        cache_file_path = self.toCacheFilePath()
+
+        with FileLock(cache_file_path + ".init.lock"):
+            if not os.path.exists(cache_file_path) or os.path.getsize(cache_file_path) != file_bytes:
+                # tmpfs only allocates the pages that get written
+                tmp_cache_file_path = cache_file_path + "." + str(os.getpid()) + ".tmp"
+                with open(tmp_cache_file_path, "wb") as f:
+                    f.truncate(file_bytes)
+                os.replace(tmp_cache_file_path, cache_file_path)
+
+            self.meta = np.memmap(
+                cache_file_path, dtype=np.int64, mode="r+", shape=(3, self.slot_num)
+            )
+            self.data = np.memmap(
+                cache_file_path,
+                dtype=np.float32,
+                mode="r+",
+                offset=meta_bytes,
+                shape=(self.slot_num,) + self.item_shape,
+            )
+
+        self.lock_fd = os.open(cache_file_path + ".lock", os.O_RDWR | os.O_CREAT)
+        return True
+
+    def clear(self) -> bool:
+        if self.item_shape is None:
+            return True
+
+        cache_file_path = self.toCacheFilePath()
+        for file_path in [cache_file_path, cache_file_path + ".lock", cache_file_path + ".init.lock"]:
+            if os.path.exists(file_path):
+                os.remove(file_path)
+
+        self.meta = None
+        self.data = None
+        self.lock_fd = None
+        return True
+
+    def toKey(self, key_str: str) -> int:
+        # 0 marks an empty slot
+        key = int.from_bytes(hashlib.md5(key_str.encode()).digest()[:8], "little")
+        return key % ((1 << 63) - 1) + 1
+
+    def toStats(self) -> dict:
+        access_num = self.hit_num + self.miss_num
+
+        stats = {
+            "hit_num": self.hit_num,
+            "miss_num": self.miss_num,
+            "hit_rate": self.hit_num / max(access_num, 1),
+        }
+        return stats
+
+    def load(self, key_str: str) -> Union[torch.Tensor, None]:
+        if self.meta is None:
+            self.miss_num += 1
+            return None
+
+        versions, tags, stamps = self.meta
+
+        key = self.toKey(key_str)
+        set_start = (key % self.set_num) * self.way_num
+
+        slot_idxs = np.nonzero(tags[set_start : set_start + self.way_num] == key)[0]
+        for slot_idx in slot_idxs:
+            slot = set_start + int(slot_idx)
+
+            version = versions[slot]
+            if version % 2 == 1:
+                break
+
+            item = np.array(self.data[slot])
+
+            if versions[slot] != version or tags[slot] != key:
+                break
+
+            stamps[slot] = time.monotonic_ns()
+
+            self.hit_num += 1
+            return torch.from_numpy(item)
+
+        self.miss_num += 1
+        return None
+
+    def save(self, key_str: str, item: torch.Tensor) -> bool:
+        self.open(item.shape)
+
+        if tuple(item.shape) != self.item_shape:
+            return False
+
+        versions, tags, stamps = self.meta
+
+        key = self.toKey(key_str)
+        set_idx = key % self.set_num
+        set_start = set_idx * self.way_num
+
+        try:
+            fcntl.lockf(self.lock_fd, fcntl.LOCK_EX | fcntl.LOCK_NB, 1, set_idx)
+        except OSError:
+            return False
+
+        try:
+            set_tags = tags[set_start : set_start + self.way_num]
+            if np.any(set_tags == key):
+                return True
+
+            # empty slots have stamp 0 and are used first
+            slot = set_start + int(np.argmin(stamps[set_start : set_start + self.way_num]))
+
+            versions[slot] += 1
+            tags[slot] = key
+            self.data[slot] = item.detach().cpu().float().numpy()
+            stamps[slot] = time.monotonic_ns()
+            versions[slot] += 1
+        finally:
+            fcntl.lockf(self.lock_fd, fcntl.LOCK_UN, 1, set_idx)
+
+        return True
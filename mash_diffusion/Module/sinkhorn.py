@@ -0,0 +1,91 @@
+import math
+import torch
+from typing import Union
+
+
+# log-domain sinkhorn with uniform marginals on [B, N, M] costs
+class BatchSinkhorn(object):
+    def __init__(
+        self,
+        reg: float = 0.05,
+        iter_num: int = 100,
+        tol: Union[float, None] = None,
+        normalize_cost: bool = True,
+        check_freq: int = 10,
+    ) -> None:
+        self.reg = reg
+        self.iter_num = iter_num
+        self.tol = tol
+        self.normalize_cost = normalize_cost
+        self.check_freq = check_freq
+        return
+
+    @torch.no_grad()
+    def solve(self, M: torch.Tensor) -> torch.Tensor:
+        M = M.float()
+        if self.normalize_cost:
+            M = M / M.amax(dim=(1, 2), keepdim=True).clamp_min(1e-12)
+
+        batch_size, row_num, col_num = M.shape
+
+        log_K = -M / self.reg
+        log_a = -math.log(row_num)
+        log_b = -math.log(col_num)
+
+        u = torch.zeros([batch_size, row_num], dtype=M.dtype, device=M.device)
+        v = torch.zeros([batch_size, col_num], dtype=M.dtype, device=M.device)
+
+        for i in range(self.iter_num):
+            u = log_a - torch.logsumexp(log_K + v.unsqueeze(1), dim=2)
+            v = log_b - torch.logsumexp(log_K + u.unsqueeze(2), dim=1)
+
+            if self.tol is not None and (i + 1) % self.check_freq == 0:
+                # rows are exact after the u update, only the cols drift
+                log_col_sums = torch.logsumexp(log_K + u.unsqueeze(2), dim=1) + v
+                col_error = (log_col_sums.exp() - math.exp(log_b)).abs().sum(dim=1)
+                if col_error.max().item() < self.tol:
+                    break
+
+        return log_K + u.unsqueeze(2) + v.unsqueeze(1)
+
+    # greedy proposal rounds, at most N and only a few for plans close to a permutation
+    @torch.no_grad()
+    def toAssignments(self, log_plan: torch.Tensor) -> torch.Tensor:
+        batch_size, anchor_num, _ = log_plan.shape
+        device = log_plan.device
+
+        row_idxs = torch.arange(anchor_num, device=device).unsqueeze(0).expand(batch_size, -1)
+
+        assignments = torch.full([batch_size, anchor_num], -1, dtype=torch.long, device=device)
+        row_free = torch.ones([batch_size, anchor_num], dtype=torch.bool, device=device)
+        col_free = torch.ones([batch_size, anchor_num], dtype=torch.bool, device=device)
+
+        for _ in range(anchor_num):
+            if not row_free.any():
+                break
+
+            scores = log_plan.masked_fill(~col_free.unsqueeze(1), -torch.inf)
+            best_scores, best_cols = scores.max(dim=2)
+            best_scores = best_scores.masked_fill(~row_free, -torch.inf)
+
+            col_best_scores = torch.full_like(best_scores, -torch.inf).scatter_reduce(
+                1, best_cols, best_scores, "amax"
+            )
+            is_winner = row_free & (best_scores == col_best_scores.gather(1, best_cols))
+
+            # equal proposals for one col go to the lowest row
+            candidate_rows = torch.where(is_winner, row_idxs, anchor_num)
+            col_winner_rows = torch.full_like(candidate_rows, anchor_num).scatter_reduce(
+                1, best_cols, candidate_rows, "amin"
+            )
+            is_winner = is_winner & (col_winner_rows.gather(1, best_cols) == row_idxs)
+
+            assignments[is_winner] = best_cols[is_winner]
+            row_free = row_free & ~is_winner
+
+            col_used = torch.zeros_like(best_cols).scatter_reduce(
+                1, best_cols, is_winner.long(), "amax"
+            )
+            col_free = col_free & (col_used == 0)
+
+        return assignments
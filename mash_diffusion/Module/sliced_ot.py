@@ -0,0 +1,84 @@
+import torch
+from typing import Union
+
+
+# keeps the cheapest of projection_num sorted matchings, then refines it by pair swaps
+class BatchSlicedOT(object):
+    def __init__(
+        self,
+        projection_num: int = 16,
+        refine_iter_num: int = 0,
+    ) -> None:
+        self.projection_num = projection_num
+        self.refine_iter_num = refine_iter_num
+        return
+
+    @torch.no_grad()
+    def toPairCosts(self, x0: torch.Tensor, x1: torch.Tensor, assignments: torch.Tensor) -> torch.Tensor:
+        gather_idxs = assignments.reshape(x1.shape[0], -1, 1).expand(-1, -1, x1.shape[-1])
+        matched_x1 = torch.gather(x1, 1, gather_idxs).reshape(assignments.shape + (x1.shape[-1],))
+
+        x0 = x0.reshape((x0.shape[0],) + (1,) * (assignments.ndim - 2) + tuple(x0.shape[1:]))
+        return ((x0 - matched_x1) ** 2).sum(dim=-1)
+
+    @torch.no_grad()
+    def refine(self, x0: torch.Tensor, x1: torch.Tensor, assignments: torch.Tensor) -> torch.Tensor:
+        batch_size, anchor_num = assignments.shape
+        pair_num = anchor_num // 2
+
+        for _ in range(self.refine_iter_num):
+            row_idxs = torch.argsort(
+                torch.rand([batch_size, anchor_num], device=x0.device), dim=1
+            )
+            a_idxs = row_idxs[:, :pair_num]
+            b_idxs = row_idxs[:, pair_num : 2 * pair_num]
+
+            a_cols = torch.gather(assignments, 1, a_idxs)
+            b_cols = torch.gather(assignments, 1, b_idxs)
+
+            x0_a = torch.gather(x0, 1, a_idxs.unsqueeze(-1).expand(-1, -1, x0.shape[-1]))
+            x0_b = torch.gather(x0, 1, b_idxs.unsqueeze(-1).expand(-1, -1, x0.shape[-1]))
+            x1_a = torch.gather(x1, 1, a_cols.unsqueeze(-1).expand(-1, -1, x1.shape[-1]))
+            x1_b = torch.gather(x1, 1, b_cols.unsqueeze(-1).expand(-1, -1, x1.shape[-1]))
+
+            cost = ((x0_a - x1_a) ** 2).sum(dim=-1) + ((x0_b - x1_b) ** 2).sum(dim=-1)
+            swap_cost = ((x0_a - x1_b) ** 2).sum(dim=-1) + ((x0_b - x1_a) ** 2).sum(dim=-1)
+            is_swap = swap_cost < cost
+
+            assignments = assignments.scatter(1, a_idxs, torch.where(is_swap, b_cols, a_cols))
+            assignments = assignments.scatter(1, b_idxs, torch.where(is_swap, a_cols, b_cols))
+
+        return assignments
+
+    @torch.no_grad()
+    def toAssignments(
+        self,
+        x0: torch.Tensor,
+        x1: torch.Tensor,
+        generator: Union[torch.Generator, None] = None,
+    ) -> torch.Tensor:
+        x0 = x0.float()
+        x1 = x1.float()
+        batch_size, anchor_num, dim = x0.shape
+
+        directions = torch.randn(
+            [batch_size, dim, self.projection_num], generator=generator, device=x0.device
+        )
+        directions = directions / directions.norm(dim=1, keepdim=True).clamp_min(1e-12)
+
+        # [B, L, N]
+        sort_idxs_0 = torch.argsort(torch.bmm(x0, directions).transpose(1, 2), dim=2)
+        sort_idxs_1 = torch.argsort(torch.bmm(x1, directions).transpose(1, 2), dim=2)
+
+        # the i-th smallest of x0 goes to the i-th smallest of x1
+        candidates = torch.empty_like(sort_idxs_0).scatter_(2, sort_idxs_0, sort_idxs_1)
+
+        candidate_costs = self.toPairCosts(x0, x1, candidates).sum(dim=-1)
+        best_idxs = candidate_costs.argmin(dim=1)
+
+        assignments = candidates[torch.arange(batch_size, device=x0.device), best_idxs]
+
+        if self.refine_iter_num > 0:
+            assignments = self.refine(x0, x1, assignments)
+
+        return assignments
@@ -3,9 +3,27 @@ import warnings
 import ot as pot
 import numpy as np
 from typing import Union
+from scipy.optimize import linear_sum_assignment
 
 from torchcfm.optimal_transport import OTPlanSampler
 
+from mash_diffusion.Module.sinkhorn import BatchSinkhorn
+from mash_diffusion.Module.sliced_ot import BatchSlicedOT
+from mash_diffusion.Module.ot_solver_pool import OTSolverPool
+
+
+def solveAssignment(M: np.ndarray) -> np.ndarray:
+    row_idxs, col_idxs = linear_sum_assignment(M)
+
+    assignment = np.zeros([M.shape[0]], dtype=np.int64)
+    assignment[row_idxs] = col_idxs
+    return assignment
+
+
+def solvePlan(task: tuple) -> np.ndarray:
+    ot_fn, M = task
+    return ot_fn(pot.unif(M.shape[0]), pot.unif(M.shape[1]), M)
+
 
 class TargetOTPlanSampler(OTPlanSampler):
     def __init__(
@@ -16,12 +34,150 @@ class TargetOTPlanSampler(OTPlanSampler):
         normalize_cost: bool = False,
         num_threads: Union[int, str] = 1,
         warn: bool = True,
-        target_dim: Union[list, None]=None
+        target_dim: Union[list, None]=None,
+        sinkhorn_iter_num: int = 100,
+        sinkhorn_tol: Union[float, None] = None,
+        round_assignment: bool = True,
+        projection_num: int = 16,
+        refine_iter_num: int = 0,
     ) -> None:
-        super().__init__(method, reg, reg_m, normalize_cost, num_threads, warn)
+        # the torchcfm base only knows the pot methods
+        super().__init__(
+            "exact" if method in ["assignment", "batch_sinkhorn", "sliced"] else method,
+            reg,
+            reg_m,
+            normalize_cost,
+            num_threads,
+            warn,
+        )
+        self.method = method
         self.target_dim = target_dim
+        self.round_assignment = round_assignment
+
+        self.batch_sinkhorn = BatchSinkhorn(reg, sinkhorn_iter_num, sinkhorn_tol)
+        self.batch_sliced_ot = BatchSlicedOT(projection_num, refine_iter_num)
         return
 
+    def toTargetData(self, x: torch.Tensor) -> torch.Tensor:
+        if self.target_dim is not None:
+            x = x[..., self.target_dim]
+
+        return x
+
+    def get_batch_cost(self, x0: torch.Tensor, x1: torch.Tensor) -> torch.Tensor:
+        M = torch.cdist(self.toTargetData(x0).float(), self.toTargetData(x1).float()) ** 2
+        return M.detach()
+
+    def sample_batch_sinkhorn_plan(self, x0: torch.Tensor, x1: torch.Tensor) -> tuple:
+        log_plan = self.batch_sinkhorn.solve(self.get_batch_cost(x0, x1))
+
+        if self.round_assignment:
+            assignments = self.batch_sinkhorn.toAssignments(log_plan)
+            gather_idxs = assignments.unsqueeze(-1).expand(-1, -1, x1.shape[-1])
+            return x0, torch.gather(x1, 1, gather_idxs)
+
+        batch_size, anchor_num, _ = log_plan.shape
+
+        pair_idxs = torch.multinomial(
+            log_plan.reshape(batch_size, -1).softmax(dim=1), anchor_num, replacement=True
+        )
+        x0_idxs = (pair_idxs // anchor_num).unsqueeze(-1).expand(-1, -1, x0.shape[-1])
+        x1_idxs = (pair_idxs % anchor_num).unsqueeze(-1).expand(-1, -1, x1.shape[-1])
+        return torch.gather(x0, 1, x0_idxs), torch.gather(x1, 1, x1_idxs)
+
+    def sample_batch_sliced_plan(self, x0: torch.Tensor, x1: torch.Tensor) -> tuple:
+        assignments = self.batch_sliced_ot.toAssignments(
+            self.toTargetData(x0), self.toTargetData(x1)
+        )
+        gather_idxs = assignments.unsqueeze(-1).expand(-1, -1, x1.shape[-1])
+        return x0, torch.gather(x1, 1, gather_idxs)
+
+    # cost above the exact assignment, solved on the cpu for monitoring only
+    def get_cost_gap(self, x0: torch.Tensor, x1: torch.Tensor, matched_x1: torch.Tensor) -> float:
+        exact_assignments = self.get_batch_assignments(x0, x1)
+        exact_x1 = torch.gather(
+            x1, 1, exact_assignments.unsqueeze(-1).expand(-1, -1, x1.shape[-1])
+        )
+
+        exact_cost = ((self.toTargetData(x0) - self.toTargetData(exact_x1)) ** 2).sum(dim=(1, 2))
+        cost = ((self.toTargetData(x0) - self.toTargetData(matched_x1)) ** 2).sum(dim=(1, 2))
+
+        return float(((cost - exact_cost) / exact_cost.clamp_min(1e-12)).mean())
+
+    # x1[b, idxs[b]] is matched to x0[b]
+    def get_batch_assignments(
+        self,
+        x0: torch.Tensor,
+        x1: torch.Tensor,
+        ot_solver_pool: Union[OTSolverPool, None] = None,
+    ) -> torch.Tensor:
+        M = self.get_batch_cost(x0, x1).cpu().numpy()
+
+        if ot_solver_pool is None:
+            assignment_list = [solveAssignment(M[i]) for i in range(M.shape[0])]
+        else:
+            assignment_list = ot_solver_pool.map(solveAssignment, list(M))
+
+        return torch.from_numpy(np.stack(assignment_list, axis=0)).to(x0.device)
+
+    def get_batch_maps(
+        self,
+        x0: torch.Tensor,
+        x1: torch.Tensor,
+        ot_solver_pool: Union[OTSolverPool, None] = None,
+    ) -> list:
+        # only the numpy costs and the pot function are sent to the pool
+        M = self.get_batch_cost(x0, x1).cpu().numpy()
+        if self.normalize_cost:
+            M = M / M.max(axis=(1, 2), keepdims=True)
+
+        task_list = [[self.ot_fn, M[i]] for i in range(M.shape[0])]
+        if ot_solver_pool is None:
+            p_list = [solvePlan(task) for task in task_list]
+        else:
+            p_list = ot_solver_pool.map(solvePlan, task_list)
+
+        for i in range(len(p_list)):
+            if not np.all(np.isfinite(p_list[i])):
+                print("ERROR: p is not finite")
+                print(p_list[i])
+                print("Cost mean, max", M[i].mean(), M[i].max())
+            if np.abs(p_list[i].sum()) < 1e-8:
+                if self.warn:
+                    warnings.warn("Numerical errors in OT plan, reverting to uniform plan.")
+                p_list[i] = np.ones_like(p_list[i]) / p_list[i].size
+
+        return p_list
+
+    def get_assignment(self, x0: torch.Tensor, x1: torch.Tensor) -> torch.Tensor:
+        return self.get_batch_assignments(x0.unsqueeze(0), x1.unsqueeze(0))[0]
+
+    def sample_plan(self, x0, x1, replace=True):
+        if self.method == "batch_sinkhorn":
+            batch_x0, batch_x1 = self.sample_batch_sinkhorn_plan(x0.unsqueeze(0), x1.unsqueeze(0))
+            return batch_x0[0], batch_x1[0]
+
+        if self.method == "sliced":
+            batch_x0, batch_x1 = self.sample_batch_sliced_plan(x0.unsqueeze(0), x1.unsqueeze(0))
+            return batch_x0[0], batch_x1[0]
+
+        if self.method != "assignment":
+            return super().sample_plan(x0, x1, replace)
+
+        return x0, x1[self.get_assignment(x0, x1)]
+
+    def sample_plan_with_labels(self, x0, x1, y0=None, y1=None, replace=True):
+        if self.method != "assignment":
+            return super().sample_plan_with_labels(x0, x1, y0, y1, replace)
+
+        idxs = self.get_assignment(x0, x1)
+        return (
+            x0,
+            x1[idxs],
+            y0,
+            y1[idxs] if y1 is not None else None,
+        )
+
     def get_map(self, x0, x1):
         a, b = pot.unif(x0.shape[0]), pot.unif(x1.shape[0])
         if x0.dim() > 2:
@@ -0,0 +1,127 @@
+import os
+import numpy as np
+from tqdm import tqdm
+from typing import Union
+from multiprocessing import Pool
+
+from mash_diffusion.Method.path import createFileFolder
+
+
+worker_token_pruner = None
+
+
+def initPruneWorker(token_pruner) -> None:
+    global worker_token_pruner
+    worker_token_pruner = token_pruner
+    return
+
+
+def pruneEmbeddingFile(task: tuple) -> bool:
+    embedding_file_path, save_embedding_file_path, embedding_key = task
+
+    if os.path.exists(save_embedding_file_path):
+        return True
+
+    try:
+        embedding = np.load(embedding_file_path, allow_pickle=True).item()[embedding_key]
+    except KeyboardInterrupt:
+        raise
+    except Exception:
+        return False
+
+    pruned_embedding = worker_token_pruner.prune(embedding)
+
+    createFileFolder(save_embedding_file_path)
+
+    tmp_save_embedding_file_path = save_embedding_file_path[:-4] + "_tmp.npy"
+    np.save(tmp_save_embedding_file_path, {embedding_key: pruned_embedding})
+    os.replace(tmp_save_embedding_file_path, save_embedding_file_path)
+    return True
+
+
+# keeps the cls tokens and the best scored patch tokens in their original order
+class TokenPruner(object):
+    def __init__(
+        self,
+        keep_num: int = 256,
+        score_type: str = "norm",
+        cls_token_num: int = 1,
+        score_threshold: Union[float, None] = None,
+        background_token: Union[np.ndarray, None] = None,
+    ) -> None:
+        assert score_type in ["norm", "background"]
+
+        self.keep_num = keep_num
+        self.score_type = score_type
+        self.cls_token_num = cls_token_num
+        self.score_threshold = score_threshold
+        self.background_token = background_token
+        return
+
+    def scoreTokens(self, patch_tokens: np.ndarray) -> np.ndarray:
+        patch_tokens = patch_tokens.astype(np.float32)
+
+        if self.score_type == "norm":
+            return np.linalg.norm(patch_tokens, axis=-1)
+
+        background_token = self.background_token
+        if background_token is None:
+            background_token = np.median(patch_tokens, axis=0)
+
+        background_token = background_token.astype(np.float32)
+
+        similarity = patch_tokens @ background_token / (
+            np.linalg.norm(patch_tokens, axis=-1) * np.linalg.norm(background_token) + 1e-6
+        )
+        return 1.0 - similarity
+
+    def toKeepIdxs(self, tokens: np.ndarray) -> np.ndarray:
+        patch_tokens = tokens[self.cls_token_num :]
+
+        scores = self.scoreTokens(patch_tokens)
+
+        keep_num = min(self.keep_num, scores.shape[0])
+        patch_idxs = np.argsort(-scores, kind="stable")[:keep_num]
+
+        if self.score_threshold is not None:
+            patch_idxs = patch_idxs[scores[patch_idxs] >= self.score_threshold]
+
+        patch_idxs = np.sort(patch_idxs) + self.cls_token_num
+
+        return np.concatenate([np.arange(self.cls_token_num), patch_idxs])
+
+    def prune(self, embedding: np.ndarray) -> np.ndarray:
+        tokens = embedding.reshape(embedding.shape[-2:])
+
+        pruned_tokens = tokens[self.toKeepIdxs(tokens)]
+
+        return pruned_tokens.reshape(embedding.shape[:-2] + pruned_tokens.shape)
+
+    def pruneFiles(
+        self,
+        embedding_file_path_list: list,
+        embedding_key: str,
+        embedding_root_folder_path: str,
+        save_embedding_root_folder_path: str,
+        worker_num: int = 16,
+    ) -> bool:
+        task_list = []
+        for embedding_file_path in embedding_file_path_list:
+            assert embedding_file_path.startswith(embedding_root_folder_path)
+
+            save_embedding_file_path = (
+                save_embedding_root_folder_path
+                + embedding_file_path[len(embedding_root_folder_path) :]
+            )
+            task_list.append([embedding_file_path, save_embedding_file_path, embedding_key])
+
+        print("[INFO][TokenPruner::pruneFiles]")
+        print("\t start write pruned embeddings...")
+        with Pool(worker_num, initializer=initPruneWorker, initargs=(self,)) as pool:
+            valid_list = list(
+                tqdm(pool.imap(pruneEmbeddingFile, task_list, chunksize=64), total=len(task_list))
+            )
+
+        print("[INFO][TokenPruner::pruneFiles]")
+        print("\t valid file num:", sum(valid_list), "/", len(valid_list))
+        return True
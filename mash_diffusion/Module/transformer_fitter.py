@@ -0,0 +1,196 @@
+import torch
+import numpy as np
+from tqdm import tqdm
+from typing import Union
+from multiprocessing import Pool
+
+from ma_sh.Method.io import loadMashFileParamsTensor
+
+from mash_diffusion.Module.moment_transformer import MomentTransformer
+
+
+# merged with the parallel update of Chan et al.
+class ChannelMoments(object):
+    def __init__(self, channel_num: int) -> None:
+        self.count = 0
+        self.mean = np.zeros([channel_num], dtype=np.float64)
+        self.m2 = np.zeros([channel_num], dtype=np.float64)
+        self.min = np.full([channel_num], np.inf, dtype=np.float64)
+        self.max = np.full([channel_num], -np.inf, dtype=np.float64)
+        return
+
+    def add(self, data: np.ndarray) -> bool:
+        other = ChannelMoments(self.mean.shape[0])
+        other.count = data.shape[0]
+        other.mean = data.mean(axis=0)
+        other.m2 = ((data - other.mean) ** 2).sum(axis=0)
+        other.min = data.min(axis=0)
+        other.max = data.max(axis=0)
+        return self.merge(other)
+
+    def merge(self, other) -> bool:
+        if other.count == 0:
+            return True
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+
+        self.mean = self.mean + delta * other.count / count
+        self.m2 = self.m2 + other.m2 + delta**2 * self.count * other.count / count
+        self.min = np.minimum(self.min, other.min)
+        self.max = np.maximum(self.max, other.max)
+        self.count = count
+        return True
+
+    def toStd(self) -> np.ndarray:
+        return np.sqrt(self.m2 / max(self.count - 1, 1))
+
+
+# values outside [low, high] fall into the edge bins
+class ChannelHistogram(object):
+    def __init__(self, low: np.ndarray, high: np.ndarray, bin_num: int = 4096) -> None:
+        self.low = low
+        self.high = high
+        self.bin_num = bin_num
+        self.counts = np.zeros([low.shape[0], bin_num], dtype=np.int64)
+        return
+
+    def add(self, data: np.ndarray) -> bool:
+        bin_idxs = (data - self.low) / (self.high - self.low) * self.bin_num
+        bin_idxs = np.clip(bin_idxs.astype(np.int64), 0, self.bin_num - 1)
+
+        for i in range(self.counts.shape[0]):
+            self.counts[i] += np.bincount(bin_idxs[:, i], minlength=self.bin_num)
+        return True
+
+    def merge(self, other) -> bool:
+        self.counts += other.counts
+        return True
+
+    def toQuantiles(self, q: float) -> np.ndarray:
+        cdf = np.cumsum(self.counts, axis=1) / np.maximum(self.counts.sum(axis=1, keepdims=True), 1)
+        bin_idxs = np.argmax(cdf >= q, axis=1)
+
+        bin_width = (self.high - self.low) / self.bin_num
+        return self.low + (bin_idxs + 0.5) * bin_width
+
+
+def loadMashData(mash_file_path: str) -> Union[np.ndarray, None]:
+    try:
+        data = loadMashFileParamsTensor(mash_file_path, torch.float32, "cpu").numpy()
+    except KeyboardInterrupt:
+        raise
+    except Exception:
+        return None
+
+    data = data.reshape(-1, data.shape[-1]).astype(np.float64)
+    if not np.all(np.isfinite(data)):
+        return None
+
+    return data
+
+
+def fitMoments(task: tuple) -> ChannelMoments:
+    mash_file_path_list, channel_num = task
+
+    channel_moments = ChannelMoments(channel_num)
+    for mash_file_path in mash_file_path_list:
+        data = loadMashData(mash_file_path)
+        if data is not None:
+            channel_moments.add(data)
+
+    return channel_moments
+
+
+def fitHistogram(task: tuple) -> ChannelHistogram:
+    mash_file_path_list, low, high, bin_num = task
+
+    channel_histogram = ChannelHistogram(low, high, bin_num)
+    for mash_file_path in mash_file_path_list:
+        data = loadMashData(mash_file_path)
+        if data is not None:
+            channel_histogram.add(data)
+
+    return channel_histogram
+
+
+# quantile: center = median, scale = IQR / 1.349
+class TransformerFitter(object):
+    def __init__(
+        self,
+        mode: str = "moment",
+        channel_num: int = 25,
+        bin_num: int = 4096,
+        worker_num: int = 16,
+        chunk_size: int = 64,
+    ) -> None:
+        assert mode in ["moment", "quantile"]
+
+        self.mode = mode
+        self.channel_num = channel_num
+        self.bin_num = bin_num
+        self.worker_num = worker_num
+        self.chunk_size = chunk_size
+        return
+
+    def toChunks(self, mash_file_path_list: list) -> list:
+        return [
+            mash_file_path_list[i : i + self.chunk_size]
+            for i in range(0, len(mash_file_path_list), self.chunk_size)
+        ]
+
+    def fitMoments(self, mash_file_path_list: list) -> ChannelMoments:
+        task_list = [[chunk, self.channel_num] for chunk in self.toChunks(mash_file_path_list)]
+
+        channel_moments = ChannelMoments(self.channel_num)
+
+        print("[INFO][TransformerFitter::fitMoments]")
+        print("\t start fit channel moments...")
+        with Pool(self.worker_num) as pool:
+            for partial_moments in tqdm(pool.imap(fitMoments, task_list), total=len(task_list)):
+                channel_moments.merge(partial_moments)
+
+        return channel_moments
+
+    def fitHistogram(self, mash_file_path_list: list, channel_moments: ChannelMoments) -> ChannelHistogram:
+        std = channel_moments.toStd()
+        low = np.maximum(channel_moments.min, channel_moments.mean - 8.0 * std)
+        high = np.minimum(channel_moments.max, channel_moments.mean + 8.0 * std)
+        high = np.maximum(high, low + 1e-6)
+
+        task_list = [
+            [chunk, low, high, self.bin_num] for chunk in self.toChunks(mash_file_path_list)
+        ]
+
+        channel_histogram = ChannelHistogram(low, high, self.bin_num)
+
+        print("[INFO][TransformerFitter::fitHistogram]")
+        print("\t start fit channel histograms...")
+        with Pool(self.worker_num) as pool:
+            for partial_histogram in tqdm(pool.imap(fitHistogram, task_list), total=len(task_list)):
+                channel_histogram.merge(partial_histogram)
+
+        return channel_histogram
+
+    def fit(self, mash_file_path_list: list, eps: float = 1e-6) -> MomentTransformer:
+        channel_moments = self.fitMoments(mash_file_path_list)
+
+        if self.mode == "moment":
+            center = channel_moments.mean
+            scale = channel_moments.toStd()
+        else:
+            channel_histogram = self.fitHistogram(mash_file_path_list, channel_moments)
+
+            center = channel_histogram.toQuantiles(0.5)
+            scale = (
+                channel_histogram.toQuantiles(0.75) - channel_histogram.toQuantiles(0.25)
+            ) / 1.349
+
+        scale = np.maximum(scale, eps)
+
+        print("[INFO][TransformerFitter::fit]")
+        print("\t anchor num:", channel_moments.count)
+        print("\t center:", center)
+        print("\t scale:", scale)
+
+        return MomentTransformer(center.astype(np.float32), scale.astype(np.float32))
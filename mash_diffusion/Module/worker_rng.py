@@ -0,0 +1,29 @@
+import torch
+import numpy as np
+
+from mash_diffusion.Method.distributed import getDistributedInfo
+
+
+# train: one generator per dataloader worker and rank, eval: the same fixed seed for every sample
+class WorkerRNG(object):
+    def __init__(self, split: str = "train", seed: int = 1234) -> None:
+        self.split = split
+        self.seed = seed
+
+        self.rng = None
+        self.rng_seed = None
+        return
+
+    def get(self) -> np.random.Generator:
+        if self.split != "train":
+            return np.random.default_rng(self.seed)
+
+        # torch.initial_seed differs for every dataloader worker, so forked copies start a new stream
+        seed = torch.initial_seed()
+        if self.rng is None or self.rng_seed != seed:
+            # the ranks may share torch.initial_seed, each needs its own stream
+            rank, world_size = getDistributedInfo()
+            self.rng = np.random.default_rng((seed * world_size + rank) % (1 << 63))
+            self.rng_seed = seed
+
+        return self.rng
@@ -0,0 +1,96 @@
+import torch
+import resource
+from time import time
+
+from mash_diffusion.Model.cfm_latent_transformer import CFMLatentTransformer
+from mash_diffusion.Model.Transformer.cross_attention import CrossAttention
+
+
+def toPeakMemoryMB() -> float:
+    # ru_maxrss is in KB on linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024.0
+
+
+def test():
+    device = 'cpu'
+    torch.manual_seed(0)
+
+    batch_size = 2
+    draw_num = 4
+
+    cross_attention = CrossAttention(query_dim=256, context_dim=512, heads=4, dim_head=64).to(device)
+
+    x = torch.randn([batch_size * draw_num, 400, 256], device=device)
+    context = torch.randn([batch_size, 77, 512], device=device)
+    mask = torch.rand([batch_size, 77], device=device) > 0.3
+
+    # the draws of one condition share it instead of copying it
+    shared_out = cross_attention(x, context=context, mask=mask)
+    copied_out = cross_attention(
+        x,
+        context=context.repeat_interleave(draw_num, dim=0),
+        mask=mask.repeat_interleave(draw_num, dim=0),
+    )
+
+    assert shared_out.shape == x.shape
+    assert torch.allclose(shared_out, copied_out, atol=1e-5)
+
+    # the sdpa backend loads the einsum checkpoints unchanged
+    model_dict = {}
+    for attn_backend in ["einsum", "sdpa"]:
+        model_dict[attn_backend] = CFMLatentTransformer(
+            n_latents=400,
+            mask_degree=3,
+            sh_degree=2,
+            context_dim=1024,
+            n_heads=16,
+            d_head=64,
+            depth=24,
+            attn_backend=attn_backend,
+        ).to(device).eval()
+
+    torch.nn.init.normal_(model_dict["einsum"].model.proj_out.weight, std=0.02)
+    model_dict["sdpa"].load_state_dict(model_dict["einsum"].state_dict())
+
+    xt = torch.randn([2, 400, 25], device=device)
+    t = torch.rand([2], device=device)
+    condition = torch.randn([2, 1397, 1024], device=device)
+    condition_mask = torch.ones([2, 1397], dtype=torch.bool, device=device)
+    condition_mask[1, 700:] = False
+
+    vt_dict = {}
+    # the lower memory backend first, ru_maxrss only grows
+    for attn_backend in ["sdpa", "einsum"]:
+        model = model_dict[attn_backend]
+
+        with torch.no_grad():
+            model.forwardData(xt, condition, t, condition_mask)
+
+            start_memory = toPeakMemoryMB()
+            start = time()
+            for _ in range(3):
+                vt_dict[attn_backend] = model.forwardData(xt, condition, t, condition_mask)
+            forward_time = (time() - start) / 3.0
+
+        print("[INFO][cross_attention::test]")
+        print("\t attn_backend:", attn_backend)
+        print("\t forward time:", forward_time)
+        print("\t peak memory increase MB:", toPeakMemoryMB() - start_memory)
+
+    assert torch.allclose(vt_dict["sdpa"], vt_dict["einsum"], atol=1e-4)
+
+    # prefilled condition K/V are reused by every forwardData of a solve
+    model = model_dict["sdpa"]
+    with torch.no_grad():
+        model.prefillCondition(condition)
+        for _ in range(3):
+            cached_vt = model.forwardData(xt, condition, t, condition_mask)
+
+        condition_cache_stats = model.toConditionCacheStats()
+        model.clearConditionCache()
+
+    assert torch.allclose(cached_vt, vt_dict["sdpa"], atol=1e-5)
+    assert condition_cache_stats["hit_num"] == 3 * 24
+    assert condition_cache_stats["hit_rate"] == 1.0
+
+    return True
@@ -0,0 +1,78 @@
+import os
+import torch
+import numpy as np
+from tempfile import TemporaryDirectory
+
+from ma_sh.Model.mash import Mash
+
+from mash_diffusion.Method.validity import loadValidity, filterEmbeddingPathsList
+from mash_diffusion.Module.dataset_validator import DatasetValidator
+
+
+def test():
+    with TemporaryDirectory() as tmp_folder_path:
+        folder_path = tmp_folder_path + "/"
+
+        mash_model = Mash(400, 3, 2, 20, 800, 0.4, dtype=torch.float64, device="cpu")
+        for i in range(2):
+            mash_model.saveParamsFile(folder_path + "mash_" + str(i) + ".npy", True)
+
+        with open(folder_path + "mash_bad.npy", "wb") as f:
+            f.write(b"not a mash file")
+
+        for name, embedding in [
+            ["embedding_0", np.random.randn(257, 1024)],
+            ["embedding_1", np.random.randn(257, 1024)],
+            ["embedding_nan_0", np.full([257, 1024], np.nan)],
+            ["embedding_nan_1", np.full([257, 1024], np.inf)],
+        ]:
+            np.save(folder_path + name + ".npy", {"dino": embedding})
+
+        paths_list = [
+            [
+                folder_path + "mash_0.npy",
+                [folder_path + "embedding_0.npy", folder_path + "embedding_nan_0.npy"],
+            ],
+            [folder_path + "mash_bad.npy", [folder_path + "embedding_1.npy"]],
+            [folder_path + "mash_1.npy", [folder_path + "embedding_nan_1.npy"]],
+        ]
+
+        validity_file_path = folder_path + "validity.npz"
+        dataset_validator = DatasetValidator(2)
+        assert dataset_validator.validateEmbeddingPathsList(paths_list, "dino", validity_file_path)
+
+        validity = loadValidity(validity_file_path)
+        assert validity["object_valid"].tolist() == [True, False, False]
+        assert validity["view_valid"].tolist() == [True, False, True, False]
+        assert validity["bad_file_path_set"] == set(
+            [
+                folder_path + "mash_bad.npy",
+                folder_path + "embedding_nan_0.npy",
+                folder_path + "embedding_nan_1.npy",
+            ]
+        )
+
+        with open(validity_file_path[:-4] + "_quarantine.txt", "r") as f:
+            assert set(f.read().split()) == validity["bad_file_path_set"]
+
+        # the same paths are filtered by the stored bits
+        valid_paths_list = [
+            [folder_path + "mash_0.npy", [folder_path + "embedding_0.npy"]],
+        ]
+        assert filterEmbeddingPathsList(paths_list, validity) == valid_paths_list
+
+        # changed paths fall back to the quarantine list
+        new_paths_list = paths_list + [
+            [folder_path + "mash_new.npy", [folder_path + "embedding_new.npy"]],
+        ]
+        assert filterEmbeddingPathsList(new_paths_list, validity) == valid_paths_list + [
+            [folder_path + "mash_new.npy", [folder_path + "embedding_new.npy"]],
+        ]
+
+        print("[INFO][dataset_validator::test]")
+        print(
+            "\t bad files:",
+            sorted([os.path.basename(path) for path in validity["bad_file_path_set"]]),
+        )
+
+    return True
@@ -0,0 +1,73 @@
+import os
+import numpy as np
+from tempfile import TemporaryDirectory
+
+from mash_diffusion.Module.embedding_index_cache import EmbeddingIndexCache
+
+
+def touchFolder(folder_path: str) -> bool:
+    # some file systems only keep second-level mtimes
+    mtime_ns = os.stat(folder_path).st_mtime_ns + 2 * 10**9
+    os.utime(folder_path, ns=(mtime_ns, mtime_ns))
+    return True
+
+
+def test():
+    with TemporaryDirectory() as tmp_folder_path:
+        embedding_root_folder_path = tmp_folder_path + "/render_dino/"
+        mash_folder_path = tmp_folder_path + "/mash/"
+        cache_file_path = tmp_folder_path + "/index_cache/embedding.pkl"
+
+        for i in range(4):
+            os.makedirs(embedding_root_folder_path + "000-000/" + str(i))
+            for j in range(2):
+                np.save(
+                    embedding_root_folder_path + "000-000/" + str(i) + "/" + str(j) + ".npy",
+                    np.zeros([1]),
+                )
+
+        os.makedirs(mash_folder_path + "000-000/")
+        for i in range(3):
+            np.save(mash_folder_path + "000-000/" + str(i) + ".npy", np.zeros([1]))
+
+        embedding_index_cache = EmbeddingIndexCache(
+            embedding_root_folder_path, mash_folder_path, cache_file_path
+        )
+        paths_list = embedding_index_cache.load()
+
+        # objects without a mash file are left out
+        assert len(paths_list) == 3
+        assert all([len(paths[1]) == 2 for paths in paths_list])
+        assert embedding_index_cache.reuse_num == 0
+
+        # unchanged folders are reused from the cache
+        cache = embedding_index_cache.refresh(embedding_index_cache.loadCache())
+        assert cache["paths_list"] == paths_list
+        assert embedding_index_cache.scan_num == 0
+
+        # a new view and a new mash file change two folder mtimes
+        object_folder_path = embedding_root_folder_path + "000-000/0/"
+        np.save(object_folder_path + "2.npy", np.zeros([1]))
+        touchFolder(object_folder_path)
+
+        np.save(mash_folder_path + "000-000/3.npy", np.zeros([1]))
+        touchFolder(mash_folder_path + "000-000/")
+
+        cache = embedding_index_cache.refresh(embedding_index_cache.loadCache())
+        assert embedding_index_cache.scan_num == 2
+        assert len(cache["paths_list"]) == 4
+        assert len(cache["paths_list"][0][1]) == 3
+
+        # the same job reads the saved index, a later job refreshes it
+        embedding_index_cache.saveCache(cache)
+        assert embedding_index_cache.load() == cache["paths_list"]
+
+        cache["job_token"] = "finished_job"
+        embedding_index_cache.saveCache(cache)
+        assert embedding_index_cache.load() == cache["paths_list"]
+        assert embedding_index_cache.scan_num == 0
+
+        print("[INFO][embedding_index_cache::test]")
+        print("\t object num:", len(cache["paths_list"]))
+
+    return True
@@ -0,0 +1,147 @@
+import torch
+import numpy as np
+from types import SimpleNamespace
+from tempfile import TemporaryDirectory
+
+from mash_diffusion.Dataset.sharded_embedding import ShardedEmbeddingDataset
+from mash_diffusion.Method.shard import SHARD_INDEX_FILE_NAME, saveShardMeta
+from mash_diffusion.Model.cfm_latent_transformer import CFMLatentTransformer
+from mash_diffusion.Module.shard_writer import ShardWriter
+from mash_diffusion.Module.base_diffusion_trainer import BaseDiffusionTrainer
+
+
+def writeEmbeddingShards(
+    shard_folder_path: str,
+    mash_params: np.ndarray,
+    embedding: np.ndarray,
+    embedding_dtype: str,
+) -> bool:
+    mash_writer = ShardWriter(shard_folder_path, "mash", "float32")
+    embedding_writer = ShardWriter(shard_folder_path, "embedding", embedding_dtype)
+
+    mash_record_idx = mash_writer.addArray(mash_params)
+    view_start = embedding_writer.addArrays([embedding])
+
+    mash_writer.close()
+    embedding_writer.close()
+
+    np.savez(
+        shard_folder_path + SHARD_INDEX_FILE_NAME,
+        object_names=np.asarray(["0"], dtype=str),
+        mash_records=mash_writer.toRecords(),
+        embedding_records=embedding_writer.toRecords(),
+        object_mash_record_idxs=np.asarray([mash_record_idx], dtype=np.int64),
+        object_view_starts=np.asarray([view_start], dtype=np.int64),
+        object_view_nums=np.asarray([1], dtype=np.int64),
+    )
+
+    meta = {
+        "dataset_type": "embedding",
+        "transformer_id": "ShapeNet_03001627",
+        "embedding_key": "dino",
+        "object_num": 1,
+        "streams": {
+            "mash": mash_writer.toMeta(),
+            "embedding": embedding_writer.toMeta(),
+        },
+    }
+    saveShardMeta(shard_folder_path, meta)
+    return True
+
+
+def test():
+    device = 'cpu'
+    torch.manual_seed(0)
+
+    model = CFMLatentTransformer(
+        n_latents=400,
+        mask_degree=3,
+        sh_degree=2,
+        context_dim=1024,
+        n_heads=4,
+        d_head=64,
+        depth=2,
+    ).to(device)
+
+    # give proj_out non-zero weights, otherwise every loss is the same
+    torch.nn.init.normal_(model.model.proj_out.weight, std=0.02)
+
+    # the dtype of the condition the transformer receives
+    cond_dtype_list = []
+    model.model.register_forward_pre_hook(
+        lambda module, args, kwargs: cond_dtype_list.append(kwargs['cond'].dtype),
+        with_kwargs=True,
+    )
+
+    mash_params = np.random.randn(400, 25).astype(np.float32)
+    embedding = np.random.randn(257, 1024).astype(np.float32)
+    xt = torch.randn([1, 400, 25], device=device)
+    ut = torch.randn([1, 400, 25], device=device)
+    t = torch.rand([1], device=device)
+
+    loss_dict = {}
+    with TemporaryDirectory() as tmp_folder_path:
+        for embedding_dtype in ["float32", "float16", "bfloat16"]:
+            shard_folder_path = tmp_folder_path + "/" + embedding_dtype + "/"
+            writeEmbeddingShards(shard_folder_path, mash_params, embedding, embedding_dtype)
+
+            dataset = ShardedEmbeddingDataset(
+                shard_folder_path,
+                split="eval",
+                permute_anchors=False,
+                embedding_dtype=embedding_dtype,
+            )
+            loaded_embedding = dataset[0]["embedding"]
+            assert loaded_embedding.dtype == getattr(torch, embedding_dtype)
+
+            # the tensor handed to the dataloader still points into the shard mapping
+            shard_buffer = dataset.embedding_reader.getShardBuffer(0)
+            shard_start = shard_buffer.ctypes.data
+            assert shard_start <= loaded_embedding.data_ptr() < shard_start + shard_buffer.nbytes
+
+            # bfloat16 is stored as its raw uint16 bits
+            if embedding_dtype == "bfloat16":
+                stored_bits = dataset.embedding_reader.read(0)
+                assert stored_bits.dtype == np.uint16
+                assert torch.equal(
+                    torch.from_numpy(stored_bits.view(np.int16)),
+                    torch.from_numpy(embedding).to(torch.bfloat16).view(torch.int16),
+                )
+
+            for upcast_condition in [True, False]:
+                trainer = SimpleNamespace(
+                    device=device,
+                    condition_pca=None,
+                    upcast_condition=upcast_condition,
+                )
+                data_dict = BaseDiffusionTrainer.getCondition(
+                    trainer, {'embedding': loaded_embedding.unsqueeze(0)}
+                )
+
+                data_dict.update({
+                    'xt': xt,
+                    't': t,
+                    'drop_prob': 0.0,
+                })
+
+                with torch.no_grad(), torch.autocast(
+                    device, dtype=torch.bfloat16, enabled=not upcast_condition
+                ):
+                    vt = model(data_dict)['vt']
+
+                # without upcasting, the condition reaches the transformer in its loaded dtype
+                expected_dtype = torch.float32 if upcast_condition else loaded_embedding.dtype
+                assert cond_dtype_list[-1] == expected_dtype
+
+                loss_dict[embedding_dtype + "_" + str(upcast_condition)] = (
+                    torch.pow(vt.float() - ut, 2).mean().item()
+                )
+
+    print(loss_dict)
+
+    float32_loss = loss_dict["float32_True"]
+    assert abs(loss_dict["float16_True"] - float32_loss) / float32_loss < 1e-3
+    assert abs(loss_dict["bfloat16_True"] - float32_loss) / float32_loss < 1e-2
+    assert abs(loss_dict["bfloat16_False"] - float32_loss) / float32_loss < 5e-2
+
+    return True
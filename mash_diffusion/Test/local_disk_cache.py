@@ -0,0 +1,85 @@
+import os
+import numpy as np
+from tempfile import TemporaryDirectory
+from multiprocessing import Process
+
+from mash_diffusion.Module.file_lock import FileLock
+from mash_diffusion.Module.local_disk_cache import LocalDiskCache
+
+
+def readFiles(source_root_folder_path: str, cache_folder_path: str, file_path_list: list) -> bool:
+    local_disk_cache = LocalDiskCache(
+        source_root_folder_path, cache_folder_path, stats_save_freq=1, job_name="test"
+    )
+
+    for _ in range(8):
+        for file_path in file_path_list:
+            data = local_disk_cache.load(file_path, np.load)
+            assert data.shape == (1024,)
+    return True
+
+
+def test():
+    file_num = 4
+
+    with TemporaryDirectory() as tmp_folder_path:
+        source_root_folder_path = tmp_folder_path + "/source/"
+        cache_folder_path = tmp_folder_path + "/cache/"
+        os.makedirs(source_root_folder_path)
+
+        file_path_list = []
+        for i in range(file_num):
+            file_path = source_root_folder_path + str(i) + ".npy"
+            np.save(file_path, np.random.randn(1024))
+            file_path_list.append(file_path)
+
+        file_bytes = sum([os.path.getsize(file_path) for file_path in file_path_list])
+
+        # concurrent readers fetch every file exactly once
+        process_list = [
+            Process(
+                target=readFiles,
+                args=(source_root_folder_path, cache_folder_path, file_path_list),
+            )
+            for _ in range(8)
+        ]
+        for process in process_list:
+            process.start()
+        for process in process_list:
+            process.join()
+            assert process.exitcode == 0
+
+        local_disk_cache = LocalDiskCache(
+            source_root_folder_path, cache_folder_path, job_name="test"
+        )
+        node_stats = local_disk_cache.toNodeStats()
+        assert node_stats["miss_num"] == file_num
+        assert node_stats["hit_num"] == 8 * 8 * file_num - file_num
+        assert node_stats["fetch_bytes"] == file_bytes
+
+        # a file which is being read survives eviction, the others are removed
+        local_file_path_list = [
+            local_disk_cache.toLocalFilePath(file_path) for file_path in file_path_list
+        ]
+        local_disk_cache.max_size_bytes = 1
+
+        with FileLock(local_file_path_list[0] + ".lock", shared=True):
+            assert local_disk_cache.evict()
+            assert os.path.exists(local_file_path_list[0])
+            for local_file_path in local_file_path_list[1:]:
+                assert not os.path.exists(local_file_path)
+
+        assert local_disk_cache.evict()
+        assert not os.path.exists(local_file_path_list[0])
+
+        # the lock files are kept for the next fetch of the same path
+        for local_file_path in local_file_path_list:
+            assert os.path.exists(local_file_path + ".lock")
+
+        assert local_disk_cache.load(file_path_list[0], np.load).shape == (1024,)
+        assert os.path.exists(local_file_path_list[0])
+
+        print("[INFO][local_disk_cache::test]")
+        print("\t node stats:", node_stats)
+
+    return True
@@ -0,0 +1,108 @@
+import torch
+import hashlib
+import numpy as np
+from tempfile import TemporaryDirectory
+from torch.utils.data import Dataset
+
+from mash_diffusion.Module.noise_bank import (
+    SEEDS_FILE_NAME,
+    PERMUTATIONS_FILE_NAME,
+    NoiseBank,
+    toNoise,
+    solveCoupling,
+)
+from mash_diffusion.Module.noise_bank_builder import NoiseBankBuilder
+
+
+class RandomMashDataset(Dataset):
+    def __init__(self, object_num: int, anchor_num: int, channel_num: int) -> None:
+        self.permute_anchors = False
+        self.paths_list = [str(i) for i in range(object_num)]
+        self.mash_params = torch.randn([object_num, anchor_num, channel_num])
+        return
+
+    def __len__(self):
+        return len(self.paths_list)
+
+    def __getitem__(self, index: int):
+        return {"mash_params": self.mash_params[index]}
+
+
+def toCouplingCost(noise: torch.Tensor, x1: torch.Tensor) -> float:
+    return float(((noise - x1) ** 2).sum())
+
+
+def toFileMD5(file_path: str) -> str:
+    with open(file_path, "rb") as f:
+        return hashlib.md5(f.read()).hexdigest()
+
+
+def test():
+    object_num = 4
+    draw_num = 3
+    anchor_num = 64
+    channel_num = 25
+
+    dataset = RandomMashDataset(object_num, anchor_num, channel_num)
+
+    with TemporaryDirectory() as tmp_folder_path:
+        bank_folder_path = tmp_folder_path + "/"
+
+        noise_bank_builder = NoiseBankBuilder(
+            dataset, bank_folder_path, draw_num, anchor_num, channel_num
+        )
+        assert noise_bank_builder.build(2)
+
+        noise_bank = NoiseBank(bank_folder_path)
+        assert noise_bank.isValid()
+        assert noise_bank.open()
+
+        for object_idx in range(object_num):
+            mash_params = dataset[object_idx]["mash_params"]
+
+            for draw_idx in range(draw_num):
+                seed, permutation = noise_bank.loadCoupling(object_idx, draw_idx)
+
+                # every anchor is used exactly once
+                assert np.all(np.sort(permutation) == np.arange(anchor_num))
+
+                # the stored coupling reaches the optimum of a fresh solve
+                noise = toNoise(seed, anchor_num, channel_num)
+                bank_cost = toCouplingCost(noise, mash_params[permutation.astype(np.int64)])
+                exact_cost = toCouplingCost(
+                    noise, mash_params[solveCoupling(noise, mash_params).astype(np.int64)]
+                )
+                random_cost = toCouplingCost(noise, mash_params[torch.randperm(anchor_num)])
+                assert abs(bank_cost - exact_cost) <= 1e-4 * exact_cost
+                assert bank_cost <= random_cost
+
+            noise, x1 = noise_bank.drawCoupling(object_idx, mash_params)
+            assert noise.shape == mash_params.shape
+            assert torch.allclose(
+                torch.sort(x1.sum(dim=-1))[0], torch.sort(mash_params.sum(dim=-1))[0]
+            )
+
+        # refreshed couplings stay in this process, the bank files are never written
+        md5_list = [
+            toFileMD5(bank_folder_path + file_name)
+            for file_name in [SEEDS_FILE_NAME, PERMUTATIONS_FILE_NAME]
+        ]
+
+        refresh_noise_bank = NoiseBank(bank_folder_path, 1.0)
+        for object_idx in range(object_num):
+            refresh_noise_bank.drawCoupling(object_idx, dataset[object_idx]["mash_params"])
+
+        assert len(refresh_noise_bank.refreshed_dict) == object_num
+        for (object_idx, draw_idx), (seed, permutation) in refresh_noise_bank.refreshed_dict.items():
+            assert np.all(np.sort(permutation) == np.arange(anchor_num))
+            assert refresh_noise_bank.loadCoupling(object_idx, draw_idx)[0] == seed
+
+        assert md5_list == [
+            toFileMD5(bank_folder_path + file_name)
+            for file_name in [SEEDS_FILE_NAME, PERMUTATIONS_FILE_NAME]
+        ]
+
+    print("[INFO][noise_bank::test]")
+    print("\t", object_num * draw_num, "bank couplings are valid and optimal")
+
+    return True
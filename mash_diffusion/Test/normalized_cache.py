@@ -0,0 +1,62 @@
+import os
+import json
+import torch
+import numpy as np
+from tempfile import TemporaryDirectory
+
+from mash_diffusion.Module.normalized_cache import HEADER_FILE_NAME, NormalizedMashCache
+
+
+def test():
+    with TemporaryDirectory() as tmp_folder_path:
+        mash_folder_path = tmp_folder_path + "/mash/"
+        cache_folder_path = tmp_folder_path + "/normalized/"
+
+        mash_file_path = mash_folder_path + "ShapeNet/03001627/0.npy"
+        os.makedirs(os.path.dirname(mash_file_path))
+        np.save(mash_file_path, np.zeros([1]))
+
+        normalized_cache = NormalizedMashCache(
+            cache_folder_path, mash_folder_path, "ShapeNet_03001627"
+        )
+
+        # nothing is read before the header exists
+        assert not normalized_cache.is_valid
+        assert normalized_cache.load(mash_file_path) is None
+
+        os.makedirs(cache_folder_path)
+        with open(cache_folder_path + HEADER_FILE_NAME, "w") as f:
+            json.dump(normalized_cache.toHeader(), f)
+
+        mash_params = np.random.randn(400, 25).astype(np.float32)
+        cache_file_path = normalized_cache.toCacheFilePath(mash_file_path)
+        os.makedirs(os.path.dirname(cache_file_path))
+        np.save(cache_file_path, mash_params)
+
+        normalized_cache = NormalizedMashCache(
+            cache_folder_path, mash_folder_path, "ShapeNet_03001627"
+        )
+        assert normalized_cache.is_valid
+        assert torch.equal(normalized_cache.load(mash_file_path), torch.from_numpy(mash_params))
+
+        # a mash file newer than its cached copy is loaded from the source again
+        cache_mtime = os.path.getmtime(cache_file_path)
+        os.utime(mash_file_path, (cache_mtime + 2, cache_mtime + 2))
+        assert normalized_cache.load(mash_file_path) is None
+
+        os.utime(cache_file_path, (cache_mtime + 4, cache_mtime + 4))
+        assert normalized_cache.load(mash_file_path) is not None
+
+        # another transformer invalidates the whole cache
+        header = normalized_cache.toHeader()
+        header["transformer_hash"] = "changed"
+        with open(cache_folder_path + HEADER_FILE_NAME, "w") as f:
+            json.dump(header, f)
+
+        normalized_cache = NormalizedMashCache(
+            cache_folder_path, mash_folder_path, "ShapeNet_03001627"
+        )
+        assert not normalized_cache.is_valid
+        assert normalized_cache.load(mash_file_path) is None
+
+    return True
@@ -0,0 +1,123 @@
+import torch
+import ot as pot
+from time import time
+
+from mash_diffusion.Module.target_ot_plan_sampler import TargetOTPlanSampler
+from mash_diffusion.Module.sinkhorn import BatchSinkhorn
+from mash_diffusion.Module.ot_solver_pool import OTSolverPool
+from mash_diffusion.Module.batch_ot_cfm import BatchExactOptimalTransportConditionalFlowMatcher
+
+
+def toMatchCost(x0: torch.Tensor, x1: torch.Tensor) -> float:
+    return float(((x0 - x1) ** 2).sum(dim=-1).mean())
+
+
+def test():
+    batch_size = 4
+    channel_num = 25
+
+    exact_sampler = TargetOTPlanSampler("exact")
+    assignment_sampler = TargetOTPlanSampler("assignment")
+
+    for anchor_num in [100, 400, 1024, 2048, 4096]:
+        x0 = torch.randn([batch_size, anchor_num, channel_num])
+        x1 = torch.randn([batch_size, anchor_num, channel_num])
+
+        start = time()
+        exact_cost = 0.0
+        for i in range(batch_size):
+            M = (torch.cdist(x0[i], x1[i]) ** 2).numpy()
+            p = pot.emd(pot.unif(anchor_num), pot.unif(anchor_num), M, numItermax=10000000)
+            exact_cost += float((p * M).sum()) / batch_size
+        exact_time = time() - start
+
+        start = time()
+        exact_x0, exact_x1 = exact_sampler.sample_plan(x0[0], x1[0])
+        sample_time = time() - start
+
+        start = time()
+        assignments = assignment_sampler.get_batch_assignments(x0, x1)
+        assignment_time = time() - start
+
+        matched_x1 = torch.gather(x1, 1, assignments.unsqueeze(-1).expand(-1, -1, channel_num))
+        assignment_cost = toMatchCost(x0, matched_x1)
+
+        # every anchor is used exactly once
+        assert torch.all(torch.sort(assignments, dim=1)[0] == torch.arange(anchor_num))
+        # the uniform exact plan is a permutation, both reach the same optimum
+        assert abs(assignment_cost - exact_cost) <= 1e-3 * exact_cost
+
+        print("[INFO][ot_assignment::test]")
+        print("\t anchor_num:", anchor_num)
+        print("\t pot emd time per batch:", exact_time)
+        print("\t pot sample_plan time per sample:", sample_time)
+        print("\t assignment time per batch:", assignment_time)
+        print("\t pot cost:", exact_cost, "assignment cost:", assignment_cost)
+        print("\t sample_plan cost:", toMatchCost(exact_x0, exact_x1))
+
+    # the pooled solves keep the batch order
+    x0 = torch.randn([16, 400, channel_num])
+    x1 = torch.randn([16, 400, channel_num])
+
+    ot_solver_pool = OTSolverPool(8, "thread")
+    assert torch.all(
+        assignment_sampler.get_batch_assignments(x0, x1)
+        == assignment_sampler.get_batch_assignments(x0, x1, ot_solver_pool)
+    )
+    ot_solver_pool.close()
+
+    # the rounded sinkhorn plan is a permutation close to the exact optimum
+    exact_assignments = assignment_sampler.get_batch_assignments(x0, x1)
+    exact_cost = toMatchCost(
+        x0, torch.gather(x1, 1, exact_assignments.unsqueeze(-1).expand(-1, -1, channel_num))
+    )
+
+    batch_sinkhorn = BatchSinkhorn(0.01, 1000, 1e-4)
+    sinkhorn_assignments = batch_sinkhorn.toAssignments(
+        batch_sinkhorn.solve(assignment_sampler.get_batch_cost(x0, x1))
+    )
+    assert torch.all(torch.sort(sinkhorn_assignments, dim=1)[0] == torch.arange(400))
+
+    sinkhorn_cost = toMatchCost(
+        x0, torch.gather(x1, 1, sinkhorn_assignments.unsqueeze(-1).expand(-1, -1, channel_num))
+    )
+
+    print("[INFO][ot_assignment::test]")
+    print("\t exact cost:", exact_cost, "rounded sinkhorn cost:", sinkhorn_cost)
+
+    # sliced OT cost gap against the exact assignment
+    for anchor_num in [400, 4096]:
+        x0 = torch.randn([4, anchor_num, channel_num])
+        x1 = torch.randn([4, anchor_num, channel_num])
+
+        for refine_iter_num in [0, 32]:
+            sliced_sampler = TargetOTPlanSampler(
+                "sliced", projection_num=16, refine_iter_num=refine_iter_num
+            )
+
+            start = time()
+            _, matched_x1 = sliced_sampler.sample_batch_sliced_plan(x0, x1)
+            sliced_time = time() - start
+
+            # every anchor of x1 is used exactly once
+            assert torch.allclose(
+                torch.sort(matched_x1.sum(dim=-1), dim=1)[0],
+                torch.sort(x1.sum(dim=-1), dim=1)[0],
+            )
+
+            print("[INFO][ot_assignment::test]")
+            print("\t anchor_num:", anchor_num, "refine_iter_num:", refine_iter_num)
+            print("\t sliced time per batch:", sliced_time)
+            print("\t sliced cost gap:", sliced_sampler.get_cost_gap(x0, x1, matched_x1))
+
+    x0 = torch.randn([16, 400, channel_num])
+    x1 = torch.randn([16, 400, channel_num])
+
+    for worker_num in [1, 8]:
+        batch_ot_cfm = BatchExactOptimalTransportConditionalFlowMatcher(worker_num=worker_num)
+        batch_ot_cfm.sample_location_and_conditional_flow(x0, x1)
+
+        print("[INFO][ot_assignment::test]")
+        print("\t exact batch solve time with", worker_num, "workers:", batch_ot_cfm.solve_time)
+
+    return True
@@ -0,0 +1,48 @@
+import pickle
+import numpy as np
+
+from mash_diffusion.Module.path_index import PathIndex
+
+
+def test():
+    mash_prefix = "/data/MashV4/Objaverse_82K/"
+    view_prefix = "/data/Objaverse_82K/render_dino/"
+
+    paths_list = []
+    for i in range(32):
+        rel_object_path = "000-" + str(i % 3).zfill(3) + "/" + str(i) * (i % 5 + 1)
+        paths_list.append(
+            [
+                mash_prefix + rel_object_path + ".npy",
+                [view_prefix + rel_object_path + "/" + str(j) + ".npy" for j in range(i % 4)],
+            ]
+        )
+
+    path_index = PathIndex(paths_list, mash_prefix, view_prefix)
+
+    # integer lookup matches the list form
+    assert len(path_index) == len(paths_list)
+    for i in range(len(paths_list)):
+        assert path_index[i] == paths_list[i]
+    assert list(path_index) == paths_list
+
+    # slicing and index arrays keep the list semantics
+    for object_idxs in [slice(3, 17), slice(None, 8), slice(1, None, 3), slice(None, None, -2)]:
+        assert list(path_index[object_idxs]) == paths_list[object_idxs]
+
+    object_idxs = np.array([5, 0, 31, 5])
+    assert list(path_index[object_idxs]) == [paths_list[i] for i in object_idxs]
+
+    # the trainer truncates the eval paths in place
+    assert list(path_index[:64]) == paths_list[:64]
+    assert list(path_index[:4][1:3]) == paths_list[:4][1:3]
+
+    # workers receive it pickled
+    loaded_path_index = pickle.loads(pickle.dumps(path_index))
+    assert list(loaded_path_index) == paths_list
+
+    print("[INFO][path_index::test]")
+    print("\t path bytes:", path_index.path_bytes.nbytes)
+    print("\t list bytes:", len(pickle.dumps(paths_list)))
+
+    return True
@@ -0,0 +1,56 @@
+import torch
+from torch.utils.data import Dataset
+
+from mash_diffusion.Method.dataloader import createResidentDataLoader
+from mash_diffusion.Dataset.resident_mash import ResidentMashDataset
+
+
+class RandomMashDataset(Dataset):
+    def __init__(self, object_num: int) -> None:
+        self.permute_anchors = False
+        self.paths_list = [str(i) for i in range(object_num)]
+        self.mash_params = torch.randn([object_num, 400, 25])
+        return
+
+    def __len__(self):
+        return len(self.paths_list)
+
+    def __getitem__(self, index: int):
+        data = {
+            'mash_params': self.mash_params[index],
+            'category_id': index,
+        }
+        return data
+
+
+def test():
+    device = 'cuda:0' if torch.cuda.is_available() else 'cpu'
+    batch_size = 8
+
+    source_dataset = RandomMashDataset(32)
+    dataset = ResidentMashDataset(source_dataset, "train", device, True)
+
+    dataloader, sampler = createResidentDataLoader(dataset, batch_size, "train")
+    sampler.set_epoch(0)
+
+    data_dict = next(iter(dataloader))
+
+    # one gathered [B, N, C] tensor on the device, not a list of samples
+    mash_params = data_dict['mash_params']
+    assert isinstance(mash_params, torch.Tensor)
+    assert mash_params.shape == (batch_size, 400, 25)
+    assert mash_params.device == torch.device(device)
+    assert data_dict['category_id'].shape == (batch_size,)
+
+    # the anchors of each object are only permuted
+    gt_mash_params = source_dataset.mash_params[data_dict['category_id']].to(device)
+    assert torch.allclose(
+        torch.sort(mash_params.sum(dim=-1), dim=-1)[0],
+        torch.sort(gt_mash_params.sum(dim=-1), dim=-1)[0],
+        atol=1e-5,
+    )
+
+    print("[INFO][resident_mash::test]")
+    print("\t batch:", mash_params.shape, mash_params.device)
+
+    return True
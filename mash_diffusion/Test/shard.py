@@ -0,0 +1,59 @@
+import os
+import numpy as np
+from tempfile import TemporaryDirectory
+
+from mash_diffusion.Module.shard_writer import ShardWriter
+from mash_diffusion.Module.shard_reader import ShardReader
+
+
+def test():
+    with TemporaryDirectory() as tmp_folder_path:
+        shard_folder_path = tmp_folder_path + "/"
+
+        for compress in [False, True]:
+            stream_name = "compress" if compress else "raw"
+
+            shard_writer = ShardWriter(
+                shard_folder_path, stream_name, "float16", compress, max_shard_size_mb=0.01
+            )
+
+            array_list = [np.random.randn(3, 17, 32).astype(np.float32) for _ in range(16)]
+            first_record_idx = shard_writer.addArrays(array_list[:4])
+            for array in array_list[4:]:
+                shard_writer.addArray(array)
+            shard_writer.close()
+
+            assert first_record_idx == 0
+            assert shard_writer.toMeta()["shard_num"] > 1
+
+            shard_reader = ShardReader(
+                shard_folder_path, stream_name, shard_writer.toRecords(), "float16", compress
+            )
+
+            for i, array in enumerate(array_list):
+                loaded_array = shard_reader.read(i)
+                assert loaded_array.shape == array.shape
+                assert np.allclose(loaded_array, array.astype(np.float16))
+
+            loaded_arrays = shard_reader.readRange(first_record_idx, 4)
+            assert loaded_arrays.shape == (4, 3, 17, 32)
+            assert np.allclose(loaded_arrays, np.stack(array_list[:4]).astype(np.float16))
+
+        # views of one object may differ in token num after pruning
+        shard_writer = ShardWriter(shard_folder_path, "pruned", "float32", True)
+        array_list = [np.random.randn(17 - i, 32).astype(np.float32) for i in range(4)]
+        first_record_idx = shard_writer.addArrays(array_list)
+        shard_writer.close()
+
+        shard_reader = ShardReader(
+            shard_folder_path, "pruned", shard_writer.toRecords(), "float32", True
+        )
+
+        loaded_array_list = shard_reader.readRange(first_record_idx, 4)
+        assert isinstance(loaded_array_list, list)
+        for loaded_array, array in zip(loaded_array_list, array_list):
+            assert np.allclose(loaded_array, array)
+
+        print(os.listdir(shard_folder_path))
+
+    return True
@@ -0,0 +1,93 @@
+import time
+import torch
+import numpy as np
+from tempfile import TemporaryDirectory
+from multiprocessing import Process, Event
+
+from mash_diffusion.Module.shared_memory_cache import SharedMemoryCache
+
+
+ITEM_SHAPE = (400, 25)
+
+
+# every write goes to the only slot, with all values equal to the key idx
+def writeItems(shm_folder_path: str, stop_event) -> bool:
+    writer = SharedMemoryCache("test", 0.0, 1, shm_folder_path)
+
+    i = 0
+    while not stop_event.is_set():
+        writer.save(str(i % 16), torch.full(ITEM_SHAPE, float(i % 16)))
+        i += 1
+    return True
+
+
+class VersionBumpingArray(object):
+    def __init__(self, data: np.ndarray, versions: np.ndarray) -> None:
+        self.data = data
+        self.versions = versions
+        return
+
+    # a writer finishes while the reader copies the slot
+    def __getitem__(self, slot: int):
+        item = np.array(self.data[slot])
+        self.versions[slot] += 2
+        return item
+
+
+def test():
+    with TemporaryDirectory() as tmp_folder_path:
+        shm_folder_path = tmp_folder_path + "/"
+
+        writer = SharedMemoryCache("test", 1.0, 4, shm_folder_path)
+        reader = SharedMemoryCache("test", 1.0, 4, shm_folder_path)
+
+        item = torch.randn(ITEM_SHAPE)
+        assert writer.save("a", item)
+
+        assert reader.open(ITEM_SHAPE)
+        assert torch.equal(reader.load("a"), item)
+        assert reader.load("b") is None
+
+        versions = writer.meta[0]
+        slot = int(np.nonzero(writer.meta[1] == writer.toKey("a"))[0][0])
+
+        # an odd version marks a write in progress
+        versions[slot] += 1
+        assert reader.load("a") is None
+        versions[slot] += 1
+        assert torch.equal(reader.load("a"), item)
+
+        # a version change during the copy drops the read
+        reader_data = reader.data
+        reader.data = VersionBumpingArray(reader_data, reader.meta[0])
+        assert reader.load("a") is None
+        reader.data = reader_data
+        assert torch.equal(reader.load("a"), item)
+
+        writer.clear()
+
+        # one slot rewritten by another process, no hit may mix two items
+        stop_event = Event()
+        writer_process = Process(target=writeItems, args=(shm_folder_path, stop_event))
+        writer_process.start()
+
+        reader = SharedMemoryCache("test", 0.0, 1, shm_folder_path)
+        assert reader.open(ITEM_SHAPE)
+
+        start = time.time()
+        while time.time() - start < 2.0:
+            for i in range(16):
+                loaded_item = reader.load(str(i))
+                if loaded_item is not None:
+                    assert torch.all(loaded_item == float(i))
+
+        stop_event.set()
+        writer_process.join()
+        assert writer_process.exitcode == 0
+
+        print("[INFO][shared_memory_cache::test]")
+        print("\t concurrent read stats:", reader.toStats())
+
+        reader.clear()
+
+    return True
@@ -0,0 +1,103 @@
+import os
+import numpy as np
+from tempfile import TemporaryDirectory
+
+from mash_diffusion.Method.shard import SHARD_INDEX_FILE_NAME, saveShardMeta
+from mash_diffusion.Method.dataloader import createStreamingDataLoader
+from mash_diffusion.Module.shard_writer import ShardWriter
+from mash_diffusion.Dataset.streaming_shard import StreamingShardDataset
+
+
+def writeMashShards(shard_folder_path: str, object_num: int) -> bool:
+    mash_writer = ShardWriter(shard_folder_path, "mash", "float32", max_shard_size_mb=0.1)
+
+    mash_record_idx_list = [
+        mash_writer.addArray(np.random.randn(400, 25).astype(np.float32))
+        for _ in range(object_num)
+    ]
+    mash_writer.close()
+
+    # the category ids tell the streamed objects apart
+    np.savez(
+        shard_folder_path + SHARD_INDEX_FILE_NAME,
+        object_names=np.asarray([str(i) for i in range(object_num)], dtype=str),
+        mash_records=mash_writer.toRecords(),
+        object_mash_record_idxs=np.asarray(mash_record_idx_list, dtype=np.int64),
+        category_ids=np.arange(object_num, dtype=np.int64),
+    )
+
+    meta = {
+        "dataset_type": "mash",
+        "transformer_id": "ShapeNet_03001627",
+        "object_num": object_num,
+        "streams": {
+            "mash": mash_writer.toMeta(),
+        },
+    }
+    saveShardMeta(shard_folder_path, meta)
+    return mash_writer.toMeta()["shard_num"] > 1
+
+
+def streamObjectIdxs(shard_folder_path: str, rank: int, world_size: int, epoch: int) -> list:
+    os.environ["RANK"] = str(rank)
+    os.environ["WORLD_SIZE"] = str(world_size)
+
+    dataset = StreamingShardDataset(shard_folder_path, "train", 4, permute_anchors=False)
+    dataset.set_epoch(epoch)
+
+    dataloader = createStreamingDataLoader(dataset, 4, 2)
+
+    object_idx_list = []
+    for data in dataloader:
+        object_idx_list += data["category_id"].tolist()
+    return object_idx_list
+
+
+def test():
+    object_num = 32
+    world_size = 2
+
+    source_env_dict = {key: os.environ.get(key) for key in ["RANK", "WORLD_SIZE"]}
+
+    with TemporaryDirectory() as tmp_folder_path:
+        shard_folder_path = tmp_folder_path + "/"
+        assert writeMashShards(shard_folder_path, object_num)
+
+        epoch_object_idxs_list = []
+        for epoch in range(2):
+            rank_object_idxs_list = [
+                streamObjectIdxs(shard_folder_path, rank, world_size, epoch)
+                for rank in range(world_size)
+            ]
+
+            # every object once per epoch, no overlap between ranks or workers
+            object_idxs = sum(rank_object_idxs_list, [])
+            assert len(object_idxs) == len(set(object_idxs))
+            assert len(object_idxs) == object_num // world_size * world_size
+
+            epoch_object_idxs_list.append(rank_object_idxs_list)
+
+        # the shard order and the shuffle buffer change with the epoch
+        for rank in range(world_size):
+            assert epoch_object_idxs_list[0][rank] != epoch_object_idxs_list[1][rank]
+
+        # without set_epoch, each new iteration advances the epoch by itself
+        os.environ["RANK"] = "0"
+        os.environ["WORLD_SIZE"] = "1"
+        dataset = StreamingShardDataset(shard_folder_path, "train", 4, permute_anchors=False)
+        first_object_idxs = [int(data["category_id"]) for data in dataset]
+        second_object_idxs = [int(data["category_id"]) for data in dataset]
+        assert sorted(first_object_idxs) == sorted(second_object_idxs)
+        assert first_object_idxs != second_object_idxs
+
+    for key, value in source_env_dict.items():
+        if value is None:
+            os.environ.pop(key, None)
+        else:
+            os.environ[key] = value
+
+    print("[INFO][streaming_shard::test]")
+    print("\t epoch 0 order on rank 0:", epoch_object_idxs_list[0][0])
+    print("\t epoch 1 order on rank 0:", epoch_object_idxs_list[1][0])
+
+    return True
@@ -0,0 +1,51 @@
+import numpy as np
+from tempfile import TemporaryDirectory
+
+from mash_diffusion.Module.moment_transformer import MomentTransformer
+from mash_diffusion.Module.transformer_fitter import ChannelMoments, ChannelHistogram
+
+
+def test():
+    data_list = [np.random.randn(400 * (i + 1), 25) * (i + 1) + i for i in range(8)]
+    full_data = np.concatenate(data_list, axis=0)
+
+    channel_moments = ChannelMoments(25)
+    for data in data_list:
+        partial_moments = ChannelMoments(25)
+        partial_moments.add(data)
+        channel_moments.merge(partial_moments)
+
+    assert channel_moments.count == full_data.shape[0]
+    assert np.allclose(channel_moments.mean, full_data.mean(axis=0))
+    assert np.allclose(channel_moments.toStd(), full_data.std(axis=0, ddof=1))
+    assert np.allclose(channel_moments.min, full_data.min(axis=0))
+    assert np.allclose(channel_moments.max, full_data.max(axis=0))
+
+    channel_histogram = ChannelHistogram(channel_moments.min, channel_moments.max, 4096)
+    for data in data_list:
+        partial_histogram = ChannelHistogram(channel_moments.min, channel_moments.max, 4096)
+        partial_histogram.add(data)
+        channel_histogram.merge(partial_histogram)
+
+    bin_width = (channel_moments.max - channel_moments.min) / 4096
+    median = channel_histogram.toQuantiles(0.5)
+    assert np.all(np.abs(median - np.median(full_data, axis=0)) <= bin_width)
+
+    moment_transformer = MomentTransformer(
+        channel_moments.mean.astype(np.float32), channel_moments.toStd().astype(np.float32)
+    )
+    normalized_data = moment_transformer.transform(full_data.astype(np.float32))
+    assert np.allclose(normalized_data.mean(axis=0), 0.0, atol=1e-3)
+    assert np.allclose(normalized_data.std(axis=0, ddof=1), 1.0, atol=1e-3)
+
+    with TemporaryDirectory() as tmp_folder_path:
+        transformer_file_path = tmp_folder_path + "/transformer.npz"
+        moment_transformer.saveTransformer(transformer_file_path)
+
+        loaded_transformer = MomentTransformer()
+        assert loaded_transformer.loadTransformer(transformer_file_path)
+
+    recon_data = loaded_transformer.inverse_transform(normalized_data)
+    assert np.allclose(recon_data, full_data, atol=1e-3)
+
+    return True
@@ -0,0 +1,4 @@
+from mash_diffusion.Demo.shard_packer import demo as demo_pack_shards
+
+if __name__ == "__main__":
+    demo_pack_shards()
@@ -0,0 +1,4 @@
+from mash_diffusion.Demo.token_pruner import demo as demo_prune_conditions
+
+if __name__ == "__main__":
+    demo_prune_conditions()
@@ -2,9 +2,37 @@ from mash_diffusion.Test.fid import test as test_fid
 from mash_diffusion.Test.batch_ot_cfm import test as test_batch_ot_cfm
 from mash_diffusion.Test.fm import test as test_flow_matching
 from mash_diffusion.Test.model import test as test_model
+from mash_diffusion.Test.shard import test as test_shard
+from mash_diffusion.Test.embedding_index_cache import test as test_embedding_index_cache
+from mash_diffusion.Test.normalized_cache import test as test_normalized_cache
+from mash_diffusion.Test.dataset_validator import test as test_dataset_validator
+from mash_diffusion.Test.embedding_precision import test as test_embedding_precision
+from mash_diffusion.Test.streaming_shard import test as test_streaming_shard
+from mash_diffusion.Test.local_disk_cache import test as test_local_disk_cache
+from mash_diffusion.Test.resident_mash import test as test_resident_mash
+from mash_diffusion.Test.path_index import test as test_path_index
+from mash_diffusion.Test.shared_memory_cache import test as test_shared_memory_cache
+from mash_diffusion.Test.transformer_fitter import test as test_transformer_fitter
+from mash_diffusion.Test.ot_assignment import test as test_ot_assignment
+from mash_diffusion.Test.noise_bank import test as test_noise_bank
+from mash_diffusion.Test.cross_attention import test as test_cross_attention
 
 if __name__ == "__main__":
     # test_fid()
     # test_batch_ot_cfm()
     # test_flow_matching()
     test_model()
+    # test_shard()
+    # test_embedding_index_cache()
+    # test_normalized_cache()
+    # test_dataset_validator()
+    # test_embedding_precision()
+    # test_streaming_shard()
+    # test_local_disk_cache()
+    # test_resident_mash()
+    # test_path_index()
+    # test_shared_memory_cache()
+    # test_transformer_fitter()
+    # test_ot_assignment()
+    # test_noise_bank()
+    # test_cross_attention()
@@ -0,0 +1,4 @@
+from mash_diffusion.Demo.dataset_validator import demo as demo_validate_dataset
+
+if __name__ == "__main__":
+    demo_validate_dataset()